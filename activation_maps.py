@@ -0,0 +1,76 @@
+"""
+Gradient-free class activation maps
+
+The disease model ends in GlobalAveragePooling2D followed by dense layers.
+For a given image the ReLU in the hidden dense layer is either on or off
+for each unit, so the head is linear at that point and the class logit
+(minus biases) splits exactly into the mean of per-location contributions
+f(x, y) . W1 (mask * W2[:, c]). The map therefore needs only the last conv
+feature map, which the model computes anyway: one forward pass returns
+the prediction and the heatmap, with no backward pass as in Grad-CAM.
+"""
+
+import cv2
+import numpy as np
+
+# Heatmap configuration
+HEATMAP_ALPHA = 0.45  # weight of the heatmap in the overlay
+HEATMAP_JPEG_QUALITY = 85
+
+
+def find_cam_head(model):
+    """(feature tensor, [(kernel, bias, relu), ...]) for a GAP + dense head, or None if unsupported"""
+    import tensorflow as tf
+    layers = model.layers
+    pools = [i for i, layer in enumerate(layers) if isinstance(layer, tf.keras.layers.GlobalAveragePooling2D)]
+    if len(pools) != 1:
+        return None
+    head = []
+    for layer in layers[pools[0] + 1:]:
+        if isinstance(layer, tf.keras.layers.Dropout):
+            continue
+        if not isinstance(layer, tf.keras.layers.Dense):
+            return None
+        activation = getattr(layer.activation, '__name__', '')
+        if layer is not layers[-1] and activation not in ('relu', 'linear'):
+            return None
+        kernel, bias = (np.asarray(w, dtype=np.float32) for w in layer.get_weights())
+        head.append((kernel, bias, activation == 'relu'))
+    return (layers[pools[0]].input, head) if head else None
+
+
+def class_activation_maps(features, head, class_indices):
+    """(N, h, w) maps in [0, 1] of each image's class from (N, h, w, D) feature maps"""
+    features = np.asarray(features, dtype=np.float32)
+    pooled = features.mean(axis=(1, 2))
+    maps = np.empty(features.shape[:3], dtype=np.float32)
+    for n, class_index in enumerate(class_indices):
+        # Walk the head at this image's pooled features to find which ReLUs are on,
+        # then fold the now-linear layers into one weight vector back to the features
+        activations, masks = pooled[n], []
+        for kernel, bias, relu in head[:-1]:
+            hidden = activations @ kernel + bias
+            masks.append(hidden > 0 if relu else np.ones_like(hidden, dtype=bool))
+            activations = np.maximum(hidden, 0) if relu else hidden
+        weights = head[-1][0][:, class_index]
+        for (kernel, _, _), mask in zip(reversed(head[:-1]), reversed(masks)):
+            weights = kernel @ (weights * mask)
+        cam = np.maximum(features[n] @ weights, 0)
+        peak = cam.max()
+        maps[n] = cam / peak if peak > 0 else cam
+    return maps
+
+
+def overlay_heatmap(image, cam, alpha=HEATMAP_ALPHA):
+    """RGB uint8 image with the activation map blended on top (red: most evidence)"""
+    height, width = image.shape[:2]
+    heat = cv2.resize(cam, (width, height), interpolation=cv2.INTER_CUBIC)
+    heat = cv2.applyColorMap(np.clip(heat * 255, 0, 255).astype(np.uint8), cv2.COLORMAP_JET)
+    return cv2.addWeighted(np.ascontiguousarray(image), 1 - alpha, cv2.cvtColor(heat, cv2.COLOR_BGR2RGB), alpha, 0)
+
+
+def encode_overlay(image, cam, quality=HEATMAP_JPEG_QUALITY):
+    """JPEG bytes of overlay_heatmap, small enough to keep with a stored result"""
+    ok, encoded = cv2.imencode('.jpg', cv2.cvtColor(overlay_heatmap(image, cam), cv2.COLOR_RGB2BGR),
+                               [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return encoded.tobytes() if ok else None
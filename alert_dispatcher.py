@@ -0,0 +1,222 @@
+"""
+Scheduled weather-risk alerts for subscribed farmers
+
+Subscriptions live in SQLite. Each cycle evaluates every subscribed location
+once, renders one message per (location, language) with cached translations
+and fans it out to subscribers with a single set-based insert into the
+outbox table, which an SMS gateway consumes.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from functools import lru_cache
+
+from multilingual_support import translate_text
+from weather_alerts import get_bulk_weather_risk
+from weather_client import normalize_location
+
+# Dispatcher configuration
+ALERT_DB_PATH = 'data/alerts.db'
+ALERT_CROP = 'mango'
+ALERT_MIN_FACTORS = 2  # same bar as the 'High risk conditions detected' recommendation
+ALERT_REPEAT_HOURS = 24  # re-send an unchanged alert for a location only after this long
+CYCLE_INTERVAL_SECONDS = 3 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS subscriptions (
+    id INTEGER PRIMARY KEY,
+    phone TEXT NOT NULL,
+    location TEXT NOT NULL,
+    language TEXT NOT NULL DEFAULT 'en',
+    crops TEXT NOT NULL DEFAULT 'mango'
+);
+CREATE INDEX IF NOT EXISTS idx_subscriptions_location ON subscriptions (location, language);
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY,
+    cycle_id TEXT NOT NULL,
+    subscription_id INTEGER NOT NULL,
+    phone TEXT NOT NULL,
+    location TEXT NOT NULL,
+    language TEXT NOT NULL,
+    message TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    sent_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_pending ON outbox (sent_at, id);
+CREATE TABLE IF NOT EXISTS alert_state (
+    location TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    sent_at REAL NOT NULL
+);
+"""
+
+
+def connect(path=ALERT_DB_PATH):
+    """Open the alert database and make sure the schema exists"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def add_subscription(conn, phone, location, language='en', crops=(ALERT_CROP,)):
+    """Register a farmer for alerts"""
+    cursor = conn.execute(
+        'INSERT INTO subscriptions (phone, location, language, crops) VALUES (?, ?, ?, ?)',
+        (phone, normalize_location(location), language, ','.join(c.strip().lower() for c in crops))
+    )
+    conn.commit()
+    return cursor.lastrowid
+
+
+def add_subscriptions(conn, rows):
+    """Register many (phone, location, language, crops) subscriptions at once"""
+    conn.executemany(
+        'INSERT INTO subscriptions (phone, location, language, crops) VALUES (?, ?, ?, ?)',
+        ((phone, normalize_location(location), language, ','.join(c.strip().lower() for c in crops))
+         for phone, location, language, crops in rows)
+    )
+    conn.commit()
+
+
+def remove_subscription(conn, subscription_id):
+    """Unsubscribe a farmer"""
+    conn.execute('DELETE FROM subscriptions WHERE id = ?', (subscription_id,))
+    conn.commit()
+
+
+@lru_cache(maxsize=4096)
+def _translate(text, language_code):
+    return translate_text(text, language_code)
+
+
+def select_alert(risk):
+    """Pick the disease to alert on from a get_weather_risk result, or None if risk is low"""
+    candidates = [
+        (len(info.get('risk_factors', [])), disease, info)
+        for disease, info in risk.get('all_risks', {}).items()
+        if len(info.get('risk_factors', [])) >= ALERT_MIN_FACTORS
+    ]
+    if not candidates:
+        return None
+    count, disease, info = max(candidates, key=lambda c: c[0])
+    return {
+        'disease': disease,
+        'risk_level': info['risk_level'],
+        'risk_factors': info['risk_factors'],
+        'recommendation': info['recommendation']
+    }
+
+
+def render_alert(location, alert, language_code):
+    """Render an alert message in one language"""
+    factors = ', '.join(_translate(f, language_code) for f in alert['risk_factors'])
+    return (f"{_translate('AgriLeaf Doctor', language_code)}: {location.title()} - "
+            f"{_translate(alert['disease'], language_code)} ({_translate(alert['risk_level'], language_code)}). "
+            f"{factors}. {_translate(alert['recommendation'], language_code)}")
+
+
+def run_alert_cycle(conn, risk_fn=get_bulk_weather_risk, now=None):
+    """Evaluate every subscribed location once and queue alerts in the outbox"""
+    now = now if now is not None else time.time()
+    cycle_id = time.strftime('%Y%m%dT%H%M%S', time.gmtime(now))
+    crop_pattern = f"%,{ALERT_CROP},%"
+
+    locations = [row[0] for row in conn.execute(
+        "SELECT DISTINCT location FROM subscriptions WHERE ',' || crops || ',' LIKE ?", (crop_pattern,))]
+    sweep = risk_fn(locations)
+
+    previous = {location: (fingerprint, sent_at) for location, fingerprint, sent_at
+                in conn.execute('SELECT location, fingerprint, sent_at FROM alert_state')}
+    stats = {'locations': len(locations), 'errors': len(sweep['errors']), 'alerting_locations': 0,
+             'skipped_duplicates': 0, 'messages': 0}
+
+    with conn:
+        for location, risk in sweep['results'].items():
+            alert = select_alert(risk)
+            if alert is None:
+                continue
+            fingerprint = hashlib.sha1(json.dumps(alert, sort_keys=True).encode('utf-8')).hexdigest()
+            if location in previous:
+                last_fingerprint, last_sent = previous[location]
+                if last_fingerprint == fingerprint and now - last_sent < ALERT_REPEAT_HOURS * 3600:
+                    stats['skipped_duplicates'] += 1
+                    continue
+
+            stats['alerting_locations'] += 1
+            languages = [row[0] for row in conn.execute(
+                'SELECT DISTINCT language FROM subscriptions WHERE location = ?', (location,))]
+            for language in languages:
+                cursor = conn.execute(
+                    """INSERT INTO outbox (cycle_id, subscription_id, phone, location, language, message, created_at)
+                       SELECT ?, id, phone, location, language, ?, ? FROM subscriptions
+                       WHERE location = ? AND language = ? AND ',' || crops || ',' LIKE ?""",
+                    (cycle_id, render_alert(location, alert, language), now, location, language, crop_pattern)
+                )
+                stats['messages'] += cursor.rowcount
+            conn.execute('INSERT OR REPLACE INTO alert_state (location, fingerprint, sent_at) VALUES (?, ?, ?)',
+                         (location, fingerprint, now))
+
+    stats['cycle_id'] = cycle_id
+    return stats
+
+
+class SmsGatewayStub:
+    """Stand-in SMS gateway that drains the outbox into a JSON-lines file"""
+
+    def __init__(self, conn, log_path=None):
+        self.conn = conn
+        self.log_path = log_path
+        self.sent = 0
+
+    def consume(self, batch_size=1000):
+        """Send one batch of pending messages; returns the number sent"""
+        rows = self.conn.execute(
+            'SELECT id, phone, message FROM outbox WHERE sent_at IS NULL ORDER BY id LIMIT ?', (batch_size,)
+        ).fetchall()
+        if not rows:
+            return 0
+        if self.log_path:
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                for _, phone, message in rows:
+                    f.write(json.dumps({'to': phone, 'text': message}, ensure_ascii=False) + '\n')
+        with self.conn:
+            self.conn.executemany('UPDATE outbox SET sent_at = ? WHERE id = ?',
+                                  ((time.time(), row[0]) for row in rows))
+        self.sent += len(rows)
+        return len(rows)
+
+    def drain(self, batch_size=1000):
+        """Send everything pending"""
+        total = 0
+        while True:
+            sent = self.consume(batch_size)
+            if not sent:
+                return total
+            total += sent
+
+
+def run_scheduler(conn, interval=CYCLE_INTERVAL_SECONDS, cycles=None):
+    """Run alert cycles forever (or a fixed number of times)"""
+    completed = 0
+    while cycles is None or completed < cycles:
+        started = time.time()
+        try:
+            stats = run_alert_cycle(conn)
+            print(f"Alert cycle {stats['cycle_id']}: {stats}")
+        except Exception as e:
+            print(f"Error running alert cycle: {e}")
+        completed += 1
+        if cycles is None or completed < cycles:
+            time.sleep(max(0, interval - (time.time() - started)))
+
+
+if __name__ == "__main__":
+    run_scheduler(connect())
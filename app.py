@@ -1,16 +1,33 @@
 import streamlit as st
-import tensorflow as tf
 import numpy as np
-from PIL import Image
-import cv2
 import os
 from disease_info import get_disease_info
 from treatment_recommender import get_treatment_recommendation
 from weather_alerts import get_weather_risk
 from multilingual_support import translate_text
 from leaf_care_tips import get_care_tips
+import io
 import json
+import hashlib
+import gc
+import tempfile
+import pandas as pd
+from PIL import Image
 from streamlit_lottie import st_lottie
+from image_pipeline import normalize_batch, process_upload, to_model_batch
+from image_quality import REASON_MESSAGES, REJECT, QualityGate
+from augmented_inference import TTA_CONFIDENCE_THRESHOLD, TTA_VIEWS, average_views, tta_batch
+from tiled_inference import aggregate_tiles, draw_regions, load_tiles
+from activation_maps import encode_overlay
+from severity import estimate_severity
+from video_scanner import VIDEO_TYPES, scan_video
+from embedding_index import INDEX_FILE, INDEX_SUBDIR, EmbeddingIndex, thumbnail
+from risk_fusion import fuse_predictions, location_priors
+from risk_engine import get_forecast_risk_timeline, render_risk_timeline
+from feedback_store import RECORD_FIELD_UPLOADS, FeedbackStore
+from model_cascade import ModelCascade
+from model_registry import ModelRegistry
+from model_bundle import DEFAULT_CROP, model_input_size
 
 # Page configuration
 st.set_page_config(
@@ -21,7 +38,7 @@ st.set_page_config(
 )
 
 # Custom CSS
-st.markdown("""
+CUSTOM_CSS = """
 <style>
     .main-header {
         font-size: 3rem;
@@ -39,7 +56,7 @@ st.markdown("""
         background-color: #e8f5e8;
         padding: 1.5rem;
         border-radius: 10px;
-        margin: 1>rem 0;
+        margin: 1rem 0;
     }
     .stButton>button {
         background-color: #4CAF50;
@@ -49,7 +66,75 @@ st.markdown("""
         padding: 0.5rem 2rem;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+# Pages are identified by stable IDs; only their labels are translated
+PAGES = {
+    'detection': "Disease Detection",
+    'care_tips': "Care Tips",
+    'weather': "Weather Alerts",
+    'about': "About"
+}
+
+ABOUT_TEXT = '''
+    **AgriLeaf Doctor** is an AI-powered agricultural application designed to help farmers identify and treat crop leaf diseases effectively.
+    
+    ### Features:
+    - 🦠 **Disease Detection**: Upload leaf images to identify diseases using AI
+    - 💊 **Treatment Recommendations**: Get detailed treatment plans with medicines and organic alternatives
+    - 🌱 **Care Tips**: Learn how to maintain healthy plants
+    - 🌦️ **Weather Alerts**: Receive disease risk alerts based on weather conditions
+    - 🌐 **Multi-language Support**: Available in multiple Indian languages
+    
+    ### Benefits:
+    - Reduce crop losses by early disease detection
+    - Save money on unnecessary treatments
+    - Increase crop yield through timely action
+    - Access expert knowledge at your fingertips
+    
+    ### Technology Stack:
+    - **AI Model**: TensorFlow/Keras for disease classification
+    - **Frontend**: Streamlit for user-friendly interface
+    - **Weather Data**: OpenWeatherMap API
+    - **Translation**: Google Translate API
+    
+    **Made with ❤️ for Indian Farmers**
+    '''
+
+# Static and per-language page fragments, rendered once per language and cached
+@st.cache_data
+def get_css_fragment():
+    return CUSTOM_CSS
+
+@st.cache_data
+def get_header_fragment(language_code):
+    return (
+        f'<h1 class="main-header">🌿 {translate_text("AgriLeaf Doctor", language_code)}</h1>'
+        f"<h3 style='text-align: center; color: #666;'>{translate_text('Smart Crop Disease Detection for Farmers', language_code)}</h3>"
+    )
+
+@st.cache_data
+def get_navigation_labels(language_code):
+    return {
+        'title': translate_text("📱 Navigation", language_code),
+        'prompt': translate_text("Go to", language_code),
+        'crop': translate_text("🌳 Crop", language_code),
+        'pages': {page_id: translate_text(label, language_code) for page_id, label in PAGES.items()}
+    }
+
+@st.cache_data
+def get_about_fragment(language_code):
+    return translate_text("About AgriLeaf Doctor", language_code), translate_text(ABOUT_TEXT, language_code)
+
+@st.cache_data
+def get_care_tips_fragment(language_code):
+    tips = get_care_tips(language_code)
+    return translate_text("🌱 Healthy Leaf Care Tips", language_code), [
+        (translate_text(category, language_code), [translate_text(tip, language_code) for tip in tip_list])
+        for category, tip_list in tips.items()
+    ]
+
+st.markdown(get_css_fragment(), unsafe_allow_html=True)
 
 # Language selection
 languages = {
@@ -65,67 +150,346 @@ def load_lottiefile(filepath: str):
         return json.load(f)
 
 # Header
-st.markdown(f'<h1 class="main-header">🌿 {translate_text("AgriLeaf Doctor", languages[selected_language])}</h1>', unsafe_allow_html=True)
-st.markdown(f"<h3 style='text-align: center; color: #666;'>{translate_text('Smart Crop Disease Detection for Farmers', languages[selected_language])}</h3>", unsafe_allow_html=True)
+st.markdown(get_header_fragment(languages[selected_language]), unsafe_allow_html=True)
+
+def refreeze_gc(changed_model):
+    # Streamlit clears the Keras session after every rerun, which forces a full
+    # garbage collection; freezing the long-lived TF/model objects keeps it cheap.
+    # After a load, swap or eviction, collect once so dropped models can be freed.
+    gc.unfreeze()
+    gc.collect()
+    gc.freeze()
+
+# Models for every crop load on first use; each gets one executor thread shared
+# by all sessions and a reloader that swaps in new versions without a restart
+@st.cache_resource
+def get_model_registry():
+    registry = ModelRegistry(on_change=refreeze_gc)
+    registry.refresh()
+    return registry
+
+# Crops with a fast model answer clear-cut images with it and escalate the rest
+@st.cache_resource
+def get_model_cascade():
+    return ModelCascade(get_model_registry())
+
+# Training images most similar to an upload, from the index built by embedding_index.py;
+# the manifest's mtime is part of the key, so a (re)built index is picked up without a restart
+@st.cache_resource
+def get_reference_index(index_dir, model_version, manifest_mtime):
+    try:
+        index = EmbeddingIndex(index_dir)
+    except FileNotFoundError:
+        return None
+    return index if index.model_version == model_version else None
+
+# Blurry, blank and non-leaf uploads are turned away before they reach a model
+@st.cache_resource
+def get_quality_gate():
+    return QualityGate()
+
+# Analyzed uploads and corrected labels feed the relabel queue and retraining (feedback_store.py)
+@st.cache_resource
+def get_feedback_store():
+    try:
+        return FeedbackStore()
+    except OSError as e:
+        print(f"Feedback store unavailable: {e}")
+        return None
+
+model_registry = get_model_registry()
+model_cascade = get_model_cascade()
+quality_gate = get_quality_gate()
+feedback_store = get_feedback_store() if RECORD_FIELD_UPLOADS else None
+crops = model_registry.crops() or [DEFAULT_CROP]
+if len(crops) > 1:
+    selected_crop = st.sidebar.selectbox(
+        get_navigation_labels(languages[selected_language])['crop'], crops,
+        format_func=lambda crop: translate_text(crop.title(), languages[selected_language]), key='crop'
+    )
+else:
+    selected_crop = crops[0]
 
-# Load model at top level for better performance
 try:
-    model = tf.keras.models.load_model('models/mango_disease_model.h5')
+    model_bundle = model_registry.get(selected_crop).current.bundle
 except Exception as e:
     st.error(f"Error loading model: {e}")
-    model = None
+    model_bundle = None
+
+# Class order, input size and scaling come from the model bundle served at the start of this run
+CLASS_NAMES = model_bundle['class_names'] if model_bundle else []
+MODEL_VERSION = model_bundle['version'] if model_bundle else None
 
 # Image preprocessing
-def preprocess_image(image):
+def preprocess_image(processed):
+    return to_model_batch([processed], model_bundle['normalization'])
+
+# Keep this many analyzed uploads per session (enough for a whole tree)
+MAX_STORED_RESULTS = 200
+
+# Keep the working-resolution decoded image only for the most recent uploads
+MAX_DECODED_IMAGES = 4
+
+# Reference cases shown next to a single-image result
+SIMILAR_CASES = 5
+
+# Multi-image mode: images per forward pass and tiles per grid row
+INFERENCE_BATCH_SIZE = 16
+GRID_COLUMNS = 5
+
+# Forecast risk outlook on the weather page
+FORECAST_DAYS = 3
+FORECAST_OUTLOOK_TTL = 600  # seconds; forecasts are issued every few hours
+
+# Disease prediction
+def run_model(crop, batch):
+    """Predict a batch; class names come from the model version that actually served it"""
+    predictions, class_names, _ = model_cascade.predict(crop, batch)
+    return predictions, class_names
+
+def refine_low_confidence(crop, processed_uploads, predictions, class_names):
+    """Re-predict low-confidence images with test-time augmentation, all views in one batch"""
+    low = [i for i, probabilities in enumerate(predictions) if np.max(probabilities) * 100 < TTA_CONFIDENCE_THRESHOLD]
+    if TTA_VIEWS <= 1 or not low:
+        return predictions
+    future = model_registry.submit(crop, tta_batch([processed_uploads[i] for i in low],
+                                                   model_bundle['normalization'], TTA_VIEWS))
+    averaged = average_views(future.result(), TTA_VIEWS)
+    if future.served_by.bundle['class_names'] != class_names:
+        return predictions  # a new model with a different class order was swapped in meanwhile
+    predictions = np.array(predictions, copy=True)
+    predictions[low] = averaged
+    return predictions
+
+def explain_disease(crop, processed):
+    """Predict with the full model and build its activation heatmap in the same forward pass
+    
+    Returns (predictions, class_names, heatmap JPEG), or None if the model cannot explain.
+    """
+    future = model_registry.submit(crop, preprocess_image(processed), method='explain')
     try:
-        img = Image.open(image)
-        img = img.resize((224, 224))
-        img_array = np.array(img)
-        img_array = img_array / 255.0
-        img_array = np.expand_dims(img_array, axis=0)
-        return img_array
-    except Exception as e:
-        st.error(f"Error processing image: {e}")
+        predictions, maps = future.result()
+    except NotImplementedError:
         return None
+    preview = np.asarray(Image.open(io.BytesIO(processed['preview'])).convert('RGB'))
+    return predictions, future.served_by.bundle['class_names'], encode_overlay(preview, maps[0])
 
-# Disease prediction
-def predict_disease(model, image):
-    processed_image = preprocess_image(image)
-    predictions = model.predict(processed_image)
-    class_names = ['Anthracnose', 'Bacterial Canker', 'Cutting Weevil', 
-                   'Die Back', 'Gall Midge', 'Healthy', 'Powdery Mildew', 
-                   'Sooty Mould']
+def predict_disease(crop, processed, explain=False):
+    """(predicted class, confidence %, probabilities, heatmap JPEG or None)"""
+    explained = explain_disease(crop, processed) if explain else None
+    if explained is not None:
+        # One pass: the heatmap must show evidence for the class reported, so no TTA here
+        predictions, class_names, heatmap = explained
+    else:
+        processed_image = preprocess_image(processed)
+        predictions, class_names = run_model(crop, processed_image)
+        predictions = refine_low_confidence(crop, [processed], predictions, class_names)
+        heatmap = None
     predicted_class = class_names[np.argmax(predictions)]
     confidence = np.max(predictions) * 100
-    return predicted_class, confidence
+    return predicted_class, confidence, predictions[0], heatmap
+
+def find_similar_cases(crop, processed, k=SIMILAR_CASES):
+    """Most similar training images by penultimate-layer embedding, or None without an index"""
+    future = model_registry.submit(crop, preprocess_image(processed), method='embed')
+    try:
+        embedding = future.result()[0]
+    except NotImplementedError:
+        return None
+    version = future.served_by.bundle['version']
+    index_dir = os.path.join(model_registry.resolve(crop, version), INDEX_SUBDIR)
+    try:
+        manifest_mtime = os.path.getmtime(os.path.join(index_dir, INDEX_FILE))
+    except OSError:
+        return None
+    index = get_reference_index(index_dir, version, manifest_mtime)
+    return index.search(embedding, k) if index is not None else None
+
+def predict_batch(crop, processed_uploads):
+    """Predict class probabilities for several images in one forward pass
+    
+    Returns one probability vector per image, or None for images that could
+    not be decoded, plus the class names for those vectors.
+    """
+    valid = [i for i, processed in enumerate(processed_uploads) if processed is not None]
+    outputs = [None] * len(processed_uploads)
+    class_names = CLASS_NAMES
+    if valid:
+        batch = to_model_batch([processed_uploads[i] for i in valid], model_bundle['normalization'])
+        predictions, class_names = run_model(crop, batch)
+        predictions = refine_low_confidence(crop, [processed_uploads[i] for i in valid], predictions, class_names)
+        for i, probabilities in zip(valid, predictions):
+            outputs[i] = probabilities
+    return outputs, class_names
+
+def predict_tiles(crop, data):
+    """Classify each leaf region of a high-resolution photo in one batch and combine the verdicts"""
+    image, boxes, tiles, skipped = load_tiles(data, model_input_size(model_bundle))
+    predictions, class_names = run_model(crop, normalize_batch(tiles, model_bundle['normalization']))
+    tiled = aggregate_tiles(predictions, boxes, class_names)
+    tiled['skipped_regions'] = skipped
+    overlay = io.BytesIO()
+    Image.fromarray(draw_regions(image, tiled['regions'])).save(overlay, format='JPEG', quality=80)
+    tiled['overlay'] = overlay.getvalue()
+    return tiled
+
+def get_upload_key(uploaded_file):
+    """Identify an upload by its content so reruns reuse stored results"""
+    return hashlib.sha1(uploaded_file.getvalue()).hexdigest()
+
+def get_processed_upload(uploaded_file, upload_key):
+    """Decode an upload once per session and return its preview, model input and image"""
+    if 'processed_uploads' not in st.session_state:
+        st.session_state['processed_uploads'] = {}
+    uploads = st.session_state['processed_uploads']
+    size = model_input_size(model_bundle)
+    
+    # Re-decode if a hot-reloaded model expects a different input size
+    if upload_key not in uploads or uploads[upload_key]['model_input'].shape[1::-1] != size:
+        uploads.pop(upload_key, None)
+        try:
+            uploads[upload_key] = process_upload(uploaded_file.getvalue(), size)
+        except Exception as e:
+            st.error(f"Error processing image: {e}")
+            return None
+        uploads[upload_key]['quality'] = quality_gate.check(uploads[upload_key])
+        # Previews and model inputs are small; full decoded images are not
+        for key in list(uploads)[:-MAX_DECODED_IMAGES]:
+            uploads[key].pop('image', None)
+        while len(uploads) > MAX_STORED_RESULTS:
+            uploads.pop(next(iter(uploads)))
+    else:
+        uploads[upload_key] = uploads.pop(upload_key)
+    return uploads[upload_key]
+
+def get_result_store():
+    """Get this session's prediction results, keyed by upload identity
+    
+    Results belong to the model version that produced them and are dropped
+    when a different model is loaded.
+    """
+    store = st.session_state.get('prediction_results')
+    if store is None or store['model_version'] != MODEL_VERSION:
+        store = st.session_state['prediction_results'] = {'model_version': MODEL_VERSION, 'results': {}}
+    return store['results']
+
+def store_result(upload_key, predicted_class, confidence, probabilities, heatmap=None):
+    """Store a prediction, dropping the oldest ones beyond MAX_STORED_RESULTS"""
+    results = get_result_store()
+    results[upload_key] = {
+        'predicted_class': predicted_class,
+        'confidence': float(confidence),
+        'probabilities': np.asarray(probabilities, dtype=np.float32),
+        'heatmap': heatmap,
+        'rendered': {}
+    }
+    while len(results) > MAX_STORED_RESULTS:
+        results.pop(next(iter(results)))
+    return results[upload_key]
+
+def record_upload(crop, upload_key, uploaded_file):
+    """Keep an analyzed upload and the model's probabilities for the relabel queue
+    
+    Only the default crop is recorded: it is the one train_model.py retrains from dataset/archive.
+    """
+    stored = get_result_store().get(upload_key)
+    if feedback_store is None or crop != DEFAULT_CROP or stored is None:
+        return False
+    try:
+        feedback_store.add_upload(upload_key, uploaded_file.getvalue(), stored['probabilities'], CLASS_NAMES,
+                                  MODEL_VERSION, os.path.splitext(uploaded_file.name)[1])
+        return True
+    except Exception as e:
+        print(f"Error recording upload: {e}")
+        return False
+
+def get_severity(result, processed):
+    """Affected leaf area for a stored result, measured once on the already-decoded upload"""
+    if 'severity' not in result:
+        # The full decoded image is dropped for older uploads; the model input still gives an estimate
+        image = processed.get('image', processed['model_input'])
+        result['severity'] = None if result['predicted_class'] == 'Healthy' else estimate_severity(image)
+    return result['severity']
+
+def get_weather_priors(location):
+    """Per-class weather priors for the field location, or None when none is given or weather is unavailable"""
+    if not location:
+        return None
+    return location_priors(location, CLASS_NAMES)
+
+def weather_adjusted(results, priors):
+    """Results reweighted by local weather, fused in one batch and kept on each stored result"""
+    if priors is None:
+        return results
+    key = priors.tobytes()
+    pending = [result for result in results if result.get('adjusted', {}).get('key') != key]
+    if pending:
+        fused = fuse_predictions(np.stack([result['probabilities'] for result in pending]), priors)
+        for result, probabilities in zip(pending, fused):
+            index = int(np.argmax(probabilities))
+            adjusted = {name: value for name, value in result.items() if name not in ('adjusted', 'severity', 'rendered')}
+            adjusted.update(predicted_class=CLASS_NAMES[index], confidence=float(probabilities[index] * 100),
+                            probabilities=probabilities, model_class=result['predicted_class'],
+                            model_confidence=result['confidence'], rendered={})
+            if adjusted['predicted_class'] == result['predicted_class']:
+                # Same disease: reuse what was already built for it
+                adjusted['rendered'] = result['rendered']
+                if 'severity' in result:
+                    adjusted['severity'] = result['severity']
+            result['adjusted'] = {'key': key, 'result': adjusted}
+    return [result['adjusted']['result'] for result in results]
+
+def get_rendered_result(result, language_code):
+    """Get disease info and treatment for a stored result, building them once per language"""
+    if language_code not in result['rendered']:
+        result['rendered'][language_code] = {
+            'info': get_disease_info(result['predicted_class'], language_code),
+            'treatment': get_treatment_recommendation(result['predicted_class'], language_code)
+        }
+    return result['rendered'][language_code]
 
 # Main app
 def main():
     # Model is already loaded at the top level
-    if model is None:
+    if model_bundle is None:
         st.warning("Please upload a trained model file to continue.")
         return
     
     # Sidebar
-    st.sidebar.title(translate_text("📱 Navigation", languages[selected_language]))
-    page = st.sidebar.radio(translate_text("Go to", languages[selected_language]), 
-                             [translate_text("Disease Detection", languages[selected_language]), 
-                              translate_text("Care Tips", languages[selected_language]), 
-                              translate_text("Weather Alerts", languages[selected_language]), 
-                              translate_text("About", languages[selected_language])])
-    
-    if page == translate_text("Disease Detection", languages[selected_language]):
-        show_disease_detection(model)
-    elif page == translate_text("Care Tips", languages[selected_language]):
+    navigation = get_navigation_labels(languages[selected_language])
+    st.sidebar.title(navigation['title'])
+    page = st.sidebar.radio(navigation['prompt'], list(PAGES),
+                            format_func=navigation['pages'].get, key='page')
+    st.sidebar.caption(f"Model {MODEL_VERSION}")
+    
+    if page == 'detection':
+        show_disease_detection(selected_crop)
+    elif page == 'care_tips':
         show_care_tips()
-    elif page == translate_text("Weather Alerts", languages[selected_language]):
+    elif page == 'weather':
         show_weather_alerts()
-    elif page == translate_text("About", languages[selected_language]):
+    elif page == 'about':
         show_about()
 
-def show_disease_detection(model):
+def show_disease_detection(crop):
     st.header(translate_text("🦠 Disease Detection", languages[selected_language]))
     
+    location = st.text_input(
+        translate_text("Field location (optional)", languages[selected_language]), key='field_location',
+        help=translate_text("Current weather at the field makes the diseases it favours more likely in uncertain cases", languages[selected_language])
+    )
+    priors = get_weather_priors(location)
+    if location and priors is None:
+        st.warning(translate_text("Unable to fetch weather data. Predictions are not adjusted for local weather.", languages[selected_language]))
+    
+    if st.checkbox(translate_text("Analyze multiple images (whole tree)", languages[selected_language])):
+        show_tree_analysis(crop, priors)
+        return
+    
+    if st.checkbox(translate_text("Scan a video (walk along a row of trees)", languages[selected_language])):
+        show_video_scan(crop)
+        return
+    
     col1, col2 = st.columns([2, 1])
     
     with col1:
@@ -137,34 +501,308 @@ def show_disease_detection(model):
         st.markdown(f"**{translate_text('Drag and drop file here or click to select', languages[selected_language])}**")
     
     if uploaded_file is not None:
+        upload_key = get_upload_key(uploaded_file)
+        processed = get_processed_upload(uploaded_file, upload_key)
+        if processed is None:
+            return
+        results = get_result_store()
+        
         col1, col2 = st.columns(2)
         
         with col1:
-            st.image(uploaded_file, caption=translate_text("Uploaded Image", languages[selected_language]), use_column_width=True)
+            st.image(processed['preview'], caption=translate_text("Uploaded Image", languages[selected_language]), use_column_width=True)
         
         with col2:
+            show_quality_feedback(processed['quality'])
+            if processed['quality']['status'] == REJECT:
+                return
+            explain = st.checkbox(translate_text("Show where the disease was found", languages[selected_language]), key='explain')
             if st.button(translate_text("🔍 Analyze Disease", languages[selected_language])):
-                with st.spinner(translate_text("Analyzing image...", languages[selected_language])):
-                    predicted_class, confidence = predict_disease(model, uploaded_file)
-                    
-                    st.success(translate_text("Analysis Complete!", languages[selected_language]))
-                    st.metric(
-                        translate_text("Predicted Disease", languages[selected_language]),
-                        translate_text(predicted_class, languages[selected_language])
-                    )
+                # Reruns and repeat clicks reuse the stored result instead of the model
+                stored = results.get(upload_key)
+                if stored is None or (explain and stored['heatmap'] is None):
+                    with st.spinner(translate_text("Analyzing image...", languages[selected_language])):
+                        store_result(upload_key, *predict_disease(crop, processed, explain))
+                        record_upload(crop, upload_key, uploaded_file)
+            
+            if st.button(translate_text("🔬 Scan Leaf Regions", languages[selected_language]),
+                         help=translate_text("Check each leaf in a high-resolution or multi-leaf photo separately", languages[selected_language])):
+                if f"{upload_key}:tiles" not in results:
+                    with st.spinner(translate_text("Scanning leaf regions...", languages[selected_language])):
+                        tiled = predict_tiles(crop, uploaded_file.getvalue())
+                        store_result(f"{upload_key}:tiles", tiled['predicted_class'], tiled['confidence'],
+                                     tiled['probabilities'])
+                        results[f"{upload_key}:tiles"].update(regions=tiled['regions'], overlay=tiled['overlay'],
+                                                              diseased_regions=tiled['diseased_regions'],
+                                                              skipped_regions=tiled['skipped_regions'])
+            
+            result = results.get(upload_key)
+            if result is not None:
+                result = weather_adjusted([result], priors)[0]
+                st.success(translate_text("Analysis Complete!", languages[selected_language]))
+                st.metric(
+                    translate_text("Predicted Disease", languages[selected_language]),
+                    translate_text(result['predicted_class'], languages[selected_language])
+                )
+                st.metric(
+                    translate_text("Confidence", languages[selected_language]),
+                    f"{result['confidence']:.2f}%"
+                )
+                if result.get('model_class', result['predicted_class']) != result['predicted_class']:
+                    st.caption(f"{translate_text('Adjusted for local weather. Image alone', languages[selected_language])}: "
+                               f"{translate_text(result['model_class'], languages[selected_language])} "
+                               f"({result['model_confidence']:.1f}%)")
+                severity = get_severity(result, processed)
+                if severity is not None:
                     st.metric(
-                        translate_text("Confidence", languages[selected_language]),
-                        f"{confidence:.2f}%"
+                        translate_text("Affected Leaf Area", languages[selected_language]),
+                        f"{severity['affected_percent']:.1f}%",
+                        f"{translate_text('Severity', languages[selected_language])}: {translate_text(severity['grade'], languages[selected_language])}",
+                        delta_color='off'
                     )
+                if result.get('heatmap') is not None:
+                    with col1:
+                        st.image(result['heatmap'], use_column_width=True,
+                                 caption=translate_text("Regions that drove the prediction (red: strongest)", languages[selected_language]))
+                show_label_feedback(crop, upload_key, uploaded_file, result['predicted_class'])
+        
+        if result is not None and st.checkbox(translate_text("Show similar confirmed cases", languages[selected_language]), key='similar'):
+            if 'similar' not in result:
+                result['similar'] = find_similar_cases(crop, processed)
+            display_similar_cases(result['similar'])
         
-        if 'predicted_class' in locals():
-            display_disease_info(predicted_class)
-            display_treatment_recommendation(predicted_class)
+        tiled = results.get(f"{upload_key}:tiles")
+        if tiled is not None:
+            display_leaf_regions(tiled)
+            # A lesion found in one region outweighs a healthy whole-image verdict
+            if result is None or tiled['diseased_regions']:
+                result = tiled
+        
+        if result is not None:
+            rendered = get_rendered_result(result, languages[selected_language])
+            display_disease_info(rendered['info'])
+            display_treatment_recommendation(rendered['treatment'])
 
-def display_disease_info(disease_name):
-    st.subheader(translate_text("📋 Disease Information", languages[selected_language]))
+def show_label_feedback(crop, upload_key, uploaded_file, predicted_class):
+    """Let the user confirm or correct a diagnosis; labels go to the feedback store"""
+    if feedback_store is None or crop != DEFAULT_CROP:
+        return
+    with st.expander(translate_text("✏️ Wrong diagnosis? Correct it", languages[selected_language])):
+        label = st.selectbox(
+            translate_text("Actual disease", languages[selected_language]), CLASS_NAMES,
+            index=CLASS_NAMES.index(predicted_class) if predicted_class in CLASS_NAMES else 0,
+            format_func=lambda name: translate_text(name, languages[selected_language]), key=f"label:{upload_key}"
+        )
+        if st.button(translate_text("Save label", languages[selected_language]), key=f"save_label:{upload_key}"):
+            record_upload(crop, upload_key, uploaded_file)
+            try:
+                feedback_store.add_label(upload_key, label)
+                st.success(translate_text("Thank you! This label will be used to improve the model.", languages[selected_language]))
+            except ValueError as e:
+                st.error(f"Error saving label: {e}")
+
+def display_similar_cases(similar):
+    st.subheader(translate_text("🔎 Similar Confirmed Cases", languages[selected_language]))
+    if similar is None:
+        st.info(translate_text("Reference cases are not available for this model yet", languages[selected_language]))
+        return
+    columns = st.columns(len(similar) or 1)
+    for column, case in zip(columns, similar):
+        with column:
+            try:
+                st.image(thumbnail(case['path']), use_column_width=True)
+            except OSError:
+                pass  # the image was removed from the dataset since the index was built
+            st.caption(f"**{translate_text(case['class_name'], languages[selected_language])}** "
+                       f"({case['similarity'] * 100:.0f}%)")
+
+def display_leaf_regions(tiled):
+    st.subheader(translate_text("🔬 Leaf Regions", languages[selected_language]))
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        st.image(tiled['overlay'], use_column_width=True)
+    with col2:
+        st.metric(
+            translate_text("Image Verdict", languages[selected_language]),
+            translate_text(tiled['predicted_class'], languages[selected_language]),
+            f"{tiled['confidence']:.1f}%", delta_color="off"
+        )
+        # Translate the fixed template, not the filled-in text, so one translation serves every count
+        st.caption(translate_text("{diseased} of {total} regions show disease", languages[selected_language]).format(
+            diseased=tiled['diseased_regions'], total=len(tiled['regions'])))
+        if tiled.get('skipped_regions'):
+            st.warning(translate_text("{skipped} smaller leaf areas were not analyzed; photograph them separately",
+                                      languages[selected_language]).format(skipped=tiled['skipped_regions']))
+
+def show_quality_feedback(quality):
+    """Explain why an upload was rejected or may give a less reliable result"""
+    show = st.error if quality['status'] == REJECT else st.warning
+    for reason in quality['reasons']:
+        show(translate_text(REASON_MESSAGES[reason], languages[selected_language]))
+
+def is_rejected(processed):
+    return processed is not None and processed['quality']['status'] == REJECT
+
+def render_result_tile(placeholder, processed, result, priors=None):
+    if result is not None:
+        result = weather_adjusted([result], priors)[0]
+    with placeholder.container():
+        if processed is not None:
+            st.image(processed['preview'], use_column_width=True)
+        if is_rejected(processed):
+            st.caption(translate_text(REASON_MESSAGES[processed['quality']['reasons'][0]], languages[selected_language]))
+        elif result is None:
+            st.caption(translate_text("Unable to process image", languages[selected_language]))
+        else:
+            st.caption(f"**{translate_text(result['predicted_class'], languages[selected_language])}** "
+                       f"({result['confidence']:.1f}%)")
+
+def show_tree_analysis(crop, priors=None):
+    uploaded_files = st.file_uploader(
+        translate_text("Upload leaf images", languages[selected_language]),
+        type=['jpg', 'jpeg', 'png'],
+        accept_multiple_files=True,
+        help=translate_text("Upload photos of several leaves from the same tree", languages[selected_language])
+    )
+    
+    if not uploaded_files:
+        return
+    
+    keys = [get_upload_key(uploaded_file) for uploaded_file in uploaded_files]
+    processed_uploads = [get_processed_upload(f, key) for f, key in zip(uploaded_files, keys)]
+    results = get_result_store()
+    pending = [i for i, key in enumerate(keys) if key not in results and not is_rejected(processed_uploads[i])]
+    
+    analyze = bool(pending) and st.button(translate_text("🔍 Analyze All", languages[selected_language]))
+    progress = st.progress(0.0, text=translate_text("Analyzing images...", languages[selected_language])) if analyze else None
+    
+    # One placeholder per image, filled as soon as its result is known
+    columns = st.columns(GRID_COLUMNS)
+    placeholders = [columns[i % GRID_COLUMNS].empty() for i in range(len(uploaded_files))]
+    for i, key in enumerate(keys):
+        if key in results or is_rejected(processed_uploads[i]):
+            render_result_tile(placeholders[i], processed_uploads[i], results.get(key), priors)
+    
+    if analyze:
+        for start in range(0, len(pending), INFERENCE_BATCH_SIZE):
+            chunk = pending[start:start + INFERENCE_BATCH_SIZE]
+            predictions, class_names = predict_batch(crop, [processed_uploads[i] for i in chunk])
+            for i, probabilities in zip(chunk, predictions):
+                if probabilities is None:
+                    render_result_tile(placeholders[i], processed_uploads[i], None)
+                    continue
+                index = int(np.argmax(probabilities))
+                result = store_result(keys[i], class_names[index], probabilities[index] * 100, probabilities)
+                record_upload(crop, keys[i], uploaded_files[i])
+                render_result_tile(placeholders[i], processed_uploads[i], result, priors)
+            done = min(start + INFERENCE_BATCH_SIZE, len(pending))
+            progress.progress(done / len(pending), text=f"{done}/{len(pending)}")
+        progress.empty()
+    
+    analyzed = weather_adjusted([results[key] for key in keys if key in results], priors)
+    if analyzed:
+        display_tree_summary(analyzed)
+
+def display_tree_summary(analyzed):
+    st.subheader(translate_text("🌳 Tree Summary", languages[selected_language]))
+    
+    counts = pd.Series([result['predicted_class'] for result in analyzed]).value_counts()
+    healthy_share = counts.get('Healthy', 0) / len(analyzed) * 100
+    diseased = counts.drop('Healthy', errors='ignore')
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric(translate_text("Leaves Analyzed", languages[selected_language]), len(analyzed))
+    with col2:
+        st.metric(translate_text("Healthy", languages[selected_language]), f"{healthy_share:.0f}%")
+    with col3:
+        st.metric(
+            translate_text("Most Common Disease", languages[selected_language]),
+            translate_text(diseased.index[0], languages[selected_language]) if len(diseased) else "-"
+        )
+    
+    # Share of each class in the tree, plus the mean probability across leaves
+    mean_probabilities = np.mean([result['probabilities'] for result in analyzed], axis=0)
+    distribution = pd.DataFrame({
+        translate_text("Leaves", languages[selected_language]): counts.reindex(CLASS_NAMES, fill_value=0).values,
+        translate_text("Mean Probability", languages[selected_language]): mean_probabilities
+    }, index=[translate_text(name, languages[selected_language]) for name in CLASS_NAMES])
+    st.bar_chart(distribution[translate_text("Leaves", languages[selected_language])])
+    st.dataframe(distribution, use_container_width=True)
+    
+    if len(diseased):
+        dominant = next(result for result in analyzed if result['predicted_class'] == diseased.index[0])
+        rendered = get_rendered_result(dominant, languages[selected_language])
+        display_disease_info(rendered['info'])
+        display_treatment_recommendation(rendered['treatment'])
+
+def show_video_scan(crop):
+    uploaded_video = st.file_uploader(
+        translate_text("Upload a video", languages[selected_language]),
+        type=VIDEO_TYPES,
+        help=translate_text("Film the leaves while walking slowly along the row", languages[selected_language])
+    )
+    
+    if uploaded_video is None:
+        return
     
-    disease_info = get_disease_info(disease_name, languages[selected_language])
+    scan_key = f"{get_upload_key(uploaded_video)}:video"
+    results = get_result_store()
+    if scan_key not in results and st.button(translate_text("🎥 Scan Video", languages[selected_language])):
+        progress = st.progress(0.0, text=translate_text("Scanning video...", languages[selected_language]))
+        
+        def on_progress(seconds, duration):
+            if duration:
+                progress.progress(min(seconds / duration, 1.0), text=f"{seconds:.0f}/{duration:.0f} s")
+        
+        # OpenCV reads videos from a path, not from memory; the file is closed first
+        # because Windows does not let a second handle open a file that is still open
+        with tempfile.NamedTemporaryFile(suffix=os.path.splitext(uploaded_video.name)[1], delete=False) as video_file:
+            video_file.write(uploaded_video.getvalue())
+        try:
+            results[scan_key] = scan_video(video_file.name, lambda batch: run_model(crop, batch),
+                                           model_input_size(model_bundle), model_bundle['normalization'],
+                                           on_progress=on_progress)
+        except Exception as e:
+            st.error(f"Error scanning video: {e}")
+        finally:
+            os.remove(video_file.name)
+        progress.empty()
+    
+    scan = results.get(scan_key)
+    if scan is not None:
+        display_video_timeline(scan)
+
+def format_seconds(seconds):
+    return f"{int(seconds) // 60}:{int(seconds) % 60:02d}"
+
+def display_video_timeline(scan):
+    st.subheader(translate_text("🎞️ Disease Timeline", languages[selected_language]))
+    
+    if not scan['timeline']:
+        st.warning(translate_text("No frames could be read from the video", languages[selected_language]))
+        return
+    
+    stats = scan['stats']
+    st.caption(f"{stats['classified']}/{stats['frames']} {translate_text('frames analyzed', languages[selected_language])}, "
+               f"{stats['video_seconds']:.0f} s {translate_text('of video in', languages[selected_language])} "
+               f"{stats['elapsed_seconds']:.1f} s")
+    
+    # One row per stretch of the row with the same smoothed prediction
+    timeline = pd.DataFrame([{
+        translate_text("From", languages[selected_language]): format_seconds(segment['start']),
+        translate_text("To", languages[selected_language]): format_seconds(segment['end']),
+        translate_text("Predicted Disease", languages[selected_language]): translate_text(segment['predicted_class'], languages[selected_language]),
+        translate_text("Confidence", languages[selected_language]): f"{segment['confidence']:.1f}%"
+    } for segment in scan['timeline']])
+    st.dataframe(timeline, use_container_width=True, hide_index=True)
+    
+    probabilities = pd.DataFrame(scan['smoothed'], index=pd.Index(scan['timestamps'], name='s'),
+                                 columns=[translate_text(name, languages[selected_language]) for name in scan['class_names']])
+    st.line_chart(probabilities)
+
+def display_disease_info(disease_info):
+    st.subheader(translate_text("📋 Disease Information", languages[selected_language]))
     
     with st.container():
         st.markdown('<div class="disease-card">', unsafe_allow_html=True)
@@ -189,11 +827,9 @@ def display_disease_info(disease_name):
         
         st.markdown('</div>', unsafe_allow_html=True)
 
-def display_treatment_recommendation(disease_name):
+def display_treatment_recommendation(treatment):
     st.subheader(translate_text("💊 Treatment Recommendations", languages[selected_language]))
     
-    treatment = get_treatment_recommendation(disease_name, languages[selected_language])
-    
     with st.container():
         st.markdown('<div class="treatment-card">', unsafe_allow_html=True)
         
@@ -218,14 +854,12 @@ def display_treatment_recommendation(disease_name):
         st.markdown('</div>', unsafe_allow_html=True)
 
 def show_care_tips():
-    st.header(translate_text("🌱 Healthy Leaf Care Tips", languages[selected_language]))
-    
-    tips = get_care_tips(languages[selected_language])
+    header, tips = get_care_tips_fragment(languages[selected_language])
+    st.header(header)
     
-    for category, tip_list in tips.items():
-        with st.expander(translate_text(category, languages[selected_language])):
-            for tip in tip_list:
-                st.write(f"• {translate_text(tip, languages[selected_language])}")
+    for category, tip_list in tips:
+        with st.expander(category):
+            st.markdown('\n'.join(f"- {tip}" for tip in tip_list))
 
 def show_weather_alerts():
     st.header(translate_text("🌦️ Weather-Based Disease Risk Alerts", languages[selected_language]))
@@ -263,36 +897,45 @@ def show_weather_alerts():
                 st.info(translate_text(weather_data['recommendation'], languages[selected_language]))
             else:
                 st.error(translate_text("Unable to fetch weather data. Please check your location.", languages[selected_language]))
+        
+        with st.spinner(translate_text("Fetching forecast...", languages[selected_language])):
+            display_forecast_outlook(location)
 
-def show_about():
-    st.header(translate_text("About AgriLeaf Doctor", languages[selected_language]))
-    
-    st.markdown(f"""
-    {translate_text('''
-    **AgriLeaf Doctor** is an AI-powered agricultural application designed to help farmers identify and treat crop leaf diseases effectively.
-    
-    ### Features:
-    - 🦠 **Disease Detection**: Upload leaf images to identify diseases using AI
-    - 💊 **Treatment Recommendations**: Get detailed treatment plans with medicines and organic alternatives
-    - 🌱 **Care Tips**: Learn how to maintain healthy plants
-    - 🌦️ **Weather Alerts**: Receive disease risk alerts based on weather conditions
-    - 🌐 **Multi-language Support**: Available in multiple Indian languages
-    
-    ### Benefits:
-    - Reduce crop losses by early disease detection
-    - Save money on unnecessary treatments
-    - Increase crop yield through timely action
-    - Access expert knowledge at your fingertips
+# The forecast timeline for one location, rendered in one language
+@st.cache_data(ttl=FORECAST_OUTLOOK_TTL)
+def get_forecast_outlook(location, language_code):
+    timeline = get_forecast_risk_timeline([location], FORECAST_DAYS)
+    if not timeline['times'].shape[-1]:
+        return None
+    return render_risk_timeline(timeline, language_code)[location]
+
+def display_forecast_outlook(location):
+    st.subheader(translate_text("📅 Risk Outlook", languages[selected_language]))
+    outlook = get_forecast_outlook(location, languages[selected_language])
+    if outlook is None:
+        st.warning(translate_text("Forecast unavailable for this location.", languages[selected_language]))
+        return
     
-    ### Technology Stack:
-    - **AI Model**: TensorFlow/Keras for disease classification
-    - **Frontend**: Streamlit for user-friendly interface
-    - **Weather Data**: OpenWeatherMap API
-    - **Translation**: Google Translate API
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric(translate_text("Longest humid spell", languages[selected_language]), f"{outlook['max_humid_hours']} h")
+    with col2:
+        st.metric(translate_text("Most rain in 24 h", languages[selected_language]), f"{outlook['max_rain_window']:.1f} mm")
     
-    **Made with ❤️ for Indian Farmers**
-    ''', languages[selected_language])}
-    """)
+    # One row per disease, most favourable conditions first
+    diseases = sorted(outlook['diseases'].items(), key=lambda item: -item[1]['peak_factors'])
+    st.dataframe(pd.DataFrame([{
+        translate_text("Disease", languages[selected_language]): translate_text(disease, languages[selected_language]),
+        translate_text("Risk Level", languages[selected_language]): risk['risk_level'],
+        translate_text("Peak", languages[selected_language]): risk['peak_time'].strftime('%d %b %H:%M'),
+        translate_text("Risk Factors", languages[selected_language]): ', '.join(risk['risk_factors']),
+        translate_text("Recommendation", languages[selected_language]): risk['recommendation']
+    } for disease, risk in diseases]), use_container_width=True, hide_index=True)
+
+def show_about():
+    header, body = get_about_fragment(languages[selected_language])
+    st.header(header)
+    st.markdown(body)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,142 @@
+"""
+Batched test-time augmentation (TTA)
+
+For borderline predictions, the model input is re-sampled into several
+views (flips, small rotations, zoomed crops), all views go through the
+model as one stacked batch, and their probabilities are averaged. Each
+view is a single cached affine warp of the model input, written straight
+into the view array.
+"""
+
+import functools
+import os
+import time
+
+import cv2
+import numpy as np
+
+from image_pipeline import normalize_batch
+from model_bundle import DEFAULT_NORMALIZATION
+
+# TTA configuration
+TTA_VIEWS = int(os.environ.get('AGRILEAF_TTA_VIEWS', 8))  # views per image, including the original; 1 disables TTA
+TTA_CONFIDENCE_THRESHOLD = 70.0  # only re-check predictions below this confidence (%)
+
+# (horizontal flip, rotation in degrees, zoom, x shift, y shift), most useful first
+VIEW_TRANSFORMS = [
+    (False, 0, 1.0, 0.0, 0.0),
+    (True, 0, 1.0, 0.0, 0.0),
+    (False, 10, 1.0, 0.0, 0.0),
+    (False, -10, 1.0, 0.0, 0.0),
+    (False, 0, 1.15, 0.0, 0.0),
+    (True, 0, 1.15, 0.0, 0.0),
+    (False, 0, 1.15, -0.05, -0.05),
+    (False, 0, 1.15, 0.05, 0.05),
+    (True, 10, 1.0, 0.0, 0.0),
+    (True, -10, 1.0, 0.0, 0.0),
+    (False, 0, 1.15, 0.05, -0.05),
+    (False, 0, 1.15, -0.05, 0.05),
+]
+
+
+@functools.lru_cache(maxsize=8)
+def _view_matrices(height, width, num_views):
+    """2x3 affine matrix per view, mapping source pixels to view pixels"""
+    center = ((width - 1) / 2, (height - 1) / 2)
+    matrices = []
+    for flip, angle, zoom, dx, dy in VIEW_TRANSFORMS[:num_views]:
+        matrix = np.vstack([cv2.getRotationMatrix2D(center, angle, zoom), [0, 0, 1]])
+        if flip:
+            matrix = np.array([[-1, 0, width - 1], [0, 1, 0], [0, 0, 1]]) @ matrix
+        matrix[:2, 2] += (dx * width, dy * height)
+        matrices.append(matrix[:2])
+    return matrices
+
+
+def augment_views(images, num_views=TTA_VIEWS):
+    """(N, H, W, C) uint8 images -> (N, V, H, W, C) uint8 views, view 0 being the original"""
+    images = np.asarray(images)
+    count, height, width, channels = images.shape
+    num_views = max(1, min(num_views, len(VIEW_TRANSFORMS)))
+    views = np.empty((count, num_views, height, width, channels), dtype=np.uint8)
+    for i, image in enumerate(images):
+        views[i, 0] = image
+        for v, matrix in enumerate(_view_matrices(height, width, num_views)[1:], start=1):
+            # Rotated corners are filled by reflection rather than black wedges the model never saw
+            cv2.warpAffine(image, matrix, (width, height), dst=views[i, v], flags=cv2.INTER_LINEAR,
+                           borderMode=cv2.BORDER_REFLECT_101)
+    return views
+
+
+def tta_batch(processed_uploads, normalization=DEFAULT_NORMALIZATION, num_views=TTA_VIEWS):
+    """One normalized float32 batch holding every view of every upload, image-major"""
+    images = np.stack([processed['model_input'] for processed in processed_uploads])
+    views = augment_views(images, num_views)
+    return normalize_batch(views.reshape((-1,) + views.shape[2:]), normalization)
+
+
+def average_views(predictions, num_views):
+    """(N * V, C) view predictions -> (N, C) mean probabilities"""
+    predictions = np.asarray(predictions)
+    return predictions.reshape(-1, num_views, predictions.shape[-1]).mean(axis=1)
+
+
+def evaluate_tta(predict_fn, images, labels, view_counts=(1, 2, 4, 8), confidence_threshold=TTA_CONFIDENCE_THRESHOLD,
+                 normalization=DEFAULT_NORMALIZATION, batch_size=8):
+    """Accuracy and latency of each view count, overall and on low-confidence images
+
+    images are uint8 model inputs; predict_fn takes a normalized batch.
+    Returns {num_views: {...}}; 'gated' applies TTA only where the single
+    view's confidence is below the threshold, as the app does.
+    """
+    images, labels = np.asarray(images), np.asarray(labels)
+    report = {}
+    single = None
+    for num_views in view_counts:
+        predictions, elapsed = [], 0.0
+        for start in range(0, len(images), batch_size):
+            chunk = images[start:start + batch_size]
+            begin = time.perf_counter()
+            batch = tta_batch([{'model_input': image} for image in chunk], normalization, num_views)
+            predictions.append(average_views(predict_fn(batch), num_views))
+            elapsed += time.perf_counter() - begin
+        predictions = np.concatenate(predictions)
+        if single is None:
+            single = predictions
+        low = single.max(axis=1) * 100 < confidence_threshold
+        gated = np.where(low[:, None], predictions, single)
+        report[num_views] = {
+            'accuracy': float((predictions.argmax(axis=1) == labels).mean()),
+            'gated_accuracy': float((gated.argmax(axis=1) == labels).mean()),
+            'low_confidence_share': float(low.mean()),
+            'low_confidence_accuracy': (float((predictions[low].argmax(axis=1) == labels[low]).mean())
+                                        if low.any() else None),
+            'ms_per_image': elapsed * 1000 / len(images)
+        }
+    return report
+
+
+def print_report(report):
+    base = report[min(report)]
+    print(f"{'views':>5} {'accuracy':>9} {'gated':>9} {'low-conf':>9} {'ms/image':>9} {'gated ms':>9}")
+    for num_views, row in report.items():
+        # Gated TTA costs the extra views only for the low-confidence share
+        gated_ms = base['ms_per_image'] + row['low_confidence_share'] * row['ms_per_image']
+        low = f"{row['low_confidence_accuracy']:.2%}" if row['low_confidence_accuracy'] is not None else '-'
+        print(f"{num_views:>5} {row['accuracy']:>9.2%} {row['gated_accuracy']:>9.2%} {low:>9} "
+              f"{row['ms_per_image']:>9.1f} {gated_ms if num_views > 1 else base['ms_per_image']:>9.1f}")
+    print(f"{base['low_confidence_share']:.1%} of images are below {TTA_CONFIDENCE_THRESHOLD:.0f}% confidence")
+
+
+if __name__ == "__main__":
+    # Accuracy gain versus latency cost on the validation split
+    from inference_backends import load_backend
+    from train_model import DATASET_PATH, create_data_generators
+
+    backend = load_backend()
+    _, val_gen = create_data_generators(DATASET_PATH)
+    # The generator rescales; undo it to get the uint8 model inputs the app feeds in
+    scale = backend.bundle['normalization']['scale']
+    images = np.concatenate([np.round(val_gen[i][0] / scale) for i in range(len(val_gen))]).astype(np.uint8)
+    print_report(evaluate_tta(backend.predict, images, val_gen.classes,
+                              normalization=backend.bundle['normalization']))
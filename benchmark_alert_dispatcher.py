@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Benchmark one alert cycle for 100k subscribers against the local stub server
+"""
+
+import os
+import random
+import tempfile
+import time
+
+import weather_alerts
+from alert_dispatcher import SmsGatewayStub, add_subscriptions, connect, run_alert_cycle
+from weather_client import WeatherClient
+from weather_stub_server import StubWeatherServer
+
+SUBSCRIBERS = 100_000
+LOCATIONS = 2_000
+LANGUAGES = ['en', 'hi', 'mr']
+
+
+def seed_subscriptions(conn):
+    rng = random.Random(0)
+    rows = (
+        (f"+9190{i:08d}", f"Village {rng.randrange(LOCATIONS)}, Maharashtra", rng.choice(LANGUAGES),
+         ('mango',) if rng.random() < 0.9 else ('cashew',))
+        for i in range(SUBSCRIBERS)
+    )
+    add_subscriptions(conn, rows)
+
+
+if __name__ == "__main__":
+    with StubWeatherServer() as server, tempfile.TemporaryDirectory() as tmp:
+        weather_alerts.set_location_resolver(None)
+        weather_alerts.set_observation_store(None)
+        weather_alerts.set_weather_client(WeatherClient('bench-key', server.weather_url, server.forecast_url))
+        conn = connect(os.path.join(tmp, 'alerts.db'))
+
+        start = time.perf_counter()
+        seed_subscriptions(conn)
+        seeded = time.perf_counter() - start
+
+        start = time.perf_counter()
+        stats = run_alert_cycle(conn, risk_fn=lambda locations: weather_alerts.get_bulk_weather_risk(
+            locations, max_workers=16, rate_limit=None))
+        cycle = time.perf_counter() - start
+
+        start = time.perf_counter()
+        repeat = run_alert_cycle(conn, risk_fn=lambda locations: weather_alerts.get_bulk_weather_risk(
+            locations, max_workers=16, rate_limit=None))
+        repeat_cycle = time.perf_counter() - start
+
+        start = time.perf_counter()
+        sent = SmsGatewayStub(conn).drain(batch_size=5000)
+        drained = time.perf_counter() - start
+
+        weather_alerts.set_weather_client(None)
+        conn.close()
+
+    print("=" * 50)
+    print(f"Subscribers: {SUBSCRIBERS}, locations: {LOCATIONS}, languages: {len(LANGUAGES)}")
+    print(f"Seed subscriptions: {seeded:.2f}s")
+    print(f"First cycle:  {cycle:.2f}s, {stats['messages']} messages, upstream calls: {server.request_count}")
+    print(f"Repeat cycle: {repeat_cycle:.2f}s, {repeat['skipped_duplicates']} duplicate locations skipped")
+    print(f"Gateway drain: {drained:.2f}s for {sent} messages")
+    print("=" * 50)
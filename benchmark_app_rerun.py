@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Measure Streamlit script rerun time for app.py, alone and with concurrent sessions
+"""
+
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from streamlit.testing.v1 import AppTest
+
+RERUNS = 20
+PAGES = ['detection', 'care_tips', 'weather', 'about']
+SESSIONS = 4
+LANGUAGE = 'हिंदी'
+
+
+def session_reruns(reruns=RERUNS):
+    """Open one session, then time reruns while cycling through every page"""
+    at = AppTest.from_file('app.py', default_timeout=300).run()
+    at.sidebar.selectbox[0].set_value(LANGUAGE).run()
+    timings = []
+    for i in range(reruns):
+        at.sidebar.radio[0].set_value(PAGES[i % len(PAGES)])
+        start = time.perf_counter()
+        at.run()
+        timings.append(time.perf_counter() - start)
+        assert not at.exception, at.exception
+    return timings
+
+
+def summarize(label, timings):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label}: median {statistics.median(timings) * 1000:.1f} ms, p95 {p95 * 1000:.1f} ms over {len(timings)} reruns")
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    summarize("Single session", session_reruns())
+    with ThreadPoolExecutor(SESSIONS) as pool:
+        results = list(pool.map(lambda _: session_reruns(), range(SESSIONS)))
+    summarize(f"{SESSIONS} concurrent sessions", [t for timings in results for t in timings])
+    print("=" * 50)
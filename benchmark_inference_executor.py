@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent sessions calling the model directly vs. through the shared executor
+"""
+
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from inference_backends import KerasBackend
+from inference_executor import InferenceExecutor, configure_tf_threads
+
+SESSIONS = 8  # concurrent Streamlit sessions
+REQUESTS = 8  # single-image predictions per session
+
+
+def build_model():
+    """Same architecture as train_model.build_model, with random weights"""
+    import tensorflow as tf
+    base = tf.keras.applications.MobileNetV2(weights=None, include_top=False, input_shape=(224, 224, 3))
+    x = tf.keras.layers.GlobalAveragePooling2D()(base.output)
+    x = tf.keras.layers.Dense(128, activation='relu')(x)
+    outputs = tf.keras.layers.Dense(8, activation='softmax')(x)
+    return tf.keras.Model(base.input, outputs)
+
+
+def run_sessions(predict):
+    image = np.random.default_rng(0).random((1, 224, 224, 3), dtype=np.float32)
+    latencies = []
+
+    def session(_):
+        for _ in range(REQUESTS):
+            start = time.perf_counter()
+            predict(image)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(SESSIONS) as pool:
+        list(pool.map(session, range(SESSIONS)))
+    elapsed = time.perf_counter() - start
+    return SESSIONS * REQUESTS / elapsed, statistics.median(latencies), sorted(latencies)[int(len(latencies) * 0.95) - 1]
+
+
+def report(label, result):
+    throughput, median, p95 = result
+    print(f"{label}: {throughput:.1f} images/s, median latency {median * 1000:.0f} ms, p95 {p95 * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    configure_tf_threads()
+    backend = KerasBackend(model=build_model())
+    model = backend.model
+    model.predict(np.zeros((1, 224, 224, 3), np.float32), verbose=0)
+
+    print("=" * 50)
+    report("Direct model.predict per session", run_sessions(lambda batch: model.predict(batch, verbose=0)))
+    executor = InferenceExecutor(backend)
+    executor.predict(np.zeros((1, 224, 224, 3), np.float32))
+    report("Shared executor", run_sessions(executor.predict))
+    print(f"Executor batches: {executor.stats['batches']} for {executor.stats['images']} images")
+    executor.close()
+    print("=" * 50)
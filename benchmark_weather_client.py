@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Benchmark the pooled weather client against the local stub server
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from weather_client import WeatherClient
+from weather_stub_server import StubWeatherServer
+
+LOCATIONS = ['Ratnagiri', 'Pune', 'Nashik', 'Dapoli', 'Sindhudurg']
+SESSIONS = 32  # concurrent Streamlit sessions
+RERUNS = 10  # reruns per session
+
+
+def run_unpooled(server):
+    """Baseline: new connection per call, no cache (the old get_weather_data behaviour)"""
+    def session(i):
+        for _ in range(RERUNS):
+            requests.get(server.weather_url, params={'q': LOCATIONS[i % len(LOCATIONS)], 'units': 'metric'})
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(SESSIONS) as pool:
+        list(pool.map(session, range(SESSIONS)))
+    return time.perf_counter() - start
+
+
+def run_client(server):
+    """Shared client: pooled session, TTL cache and single-flight coalescing"""
+    client = WeatherClient('bench-key', server.weather_url, server.forecast_url)
+
+    def session(i):
+        for _ in range(RERUNS):
+            client.get_current(LOCATIONS[i % len(LOCATIONS)])
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(SESSIONS) as pool:
+        list(pool.map(session, range(SESSIONS)))
+    elapsed = time.perf_counter() - start
+    client.close()
+    return elapsed, client.stats
+
+
+if __name__ == "__main__":
+    with StubWeatherServer(latency=0.05) as server:
+        baseline = run_unpooled(server)
+        baseline_calls = server.request_count
+
+    with StubWeatherServer(latency=0.05) as server:
+        elapsed, stats = run_client(server)
+        client_calls = server.request_count
+
+    print("=" * 50)
+    print(f"Sessions: {SESSIONS}, reruns per session: {RERUNS}")
+    print(f"Unpooled requests.get: {baseline:.3f}s, {baseline_calls} upstream calls")
+    print(f"WeatherClient:         {elapsed:.3f}s, {client_calls} upstream calls")
+    print(f"Client stats: {stats}")
+    print("=" * 50)
@@ -0,0 +1,265 @@
+"""
+Reference-case retrieval over training-image embeddings
+
+Every dataset image is run through the model once and its penultimate-layer
+activation (the 128-unit dense layer of build_model) is stored, L2-normalized,
+as a row of a memory-mapped float16 matrix next to the model bundle. Pages
+are only read when searched, so the index costs little memory however large
+the dataset grows.
+
+Search is a vectorized cosine top-k. Small indexes score every row. Larger
+ones are an inverted file: rows are clustered with spherical k-means and
+stored grouped by cluster, and a query scores only the rows of the
+clusters nearest to it. Rebuilding is incremental: images whose size and
+modification time are unchanged keep their embeddings, and only new or
+changed images go through the model. A new model version rebuilds
+everything, since its embeddings live in a different space.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+
+import numpy as np
+
+from image_pipeline import decode_image, make_model_input, make_preview, normalize_batch
+from model_bundle import MODEL_BUNDLE_DIR, model_input_size
+
+# Embedding index configuration
+REFERENCE_DATASET_DIR = 'dataset/archive'  # one folder per class, as for training
+INDEX_SUBDIR = 'embeddings'  # inside the model bundle the embeddings come from
+INDEX_FILE = 'index.json'
+INDEX_FORMAT = 1
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+EMBED_BATCH_SIZE = 32
+EXACT_SEARCH_LIMIT = 16384  # up to this many images every row is scored
+SEARCH_PROBES = 32  # clusters scored per query in the inverted file
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE = 32768  # rows the clusters are trained on
+RECLUSTER_GROWTH = 2.0  # re-cluster once the index has grown or shrunk by this factor
+SEARCH_CHUNK_ROWS = 8192  # float16 rows converted to float32 at a time
+THUMBNAIL_SIDE = 160
+
+
+def scan_dataset(dataset_dir=REFERENCE_DATASET_DIR):
+    """[(relative path, class name, size, mtime_ns)] of every image, sorted by path"""
+    entries = []
+    for class_name in sorted(os.listdir(dataset_dir)):
+        class_dir = os.path.join(dataset_dir, class_name)
+        if not os.path.isdir(class_dir):
+            continue
+        for filename in sorted(os.listdir(class_dir)):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                stat = os.stat(os.path.join(class_dir, filename))
+                entries.append((os.path.join(class_name, filename), class_name, stat.st_size, stat.st_mtime_ns))
+    return entries
+
+
+def normalize_rows(vectors):
+    """Scale rows to unit length (zero rows stay zero)"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def embed_images(backend, paths, batch_size=EMBED_BATCH_SIZE):
+    """(N, D) normalized embeddings of image files, preprocessed exactly as uploads are"""
+    size, normalization = model_input_size(backend.bundle), backend.bundle['normalization']
+    embeddings = []
+    for start in range(0, len(paths), batch_size):
+        images = []
+        for path in paths[start:start + batch_size]:
+            with open(path, 'rb') as f:
+                images.append(make_model_input(decode_image(f.read()), size))
+        embeddings.append(normalize_rows(backend.embed(normalize_batch(np.stack(images), normalization))))
+    return np.concatenate(embeddings) if embeddings else None
+
+
+def train_clusters(embeddings, num_clusters, iterations=KMEANS_ITERATIONS, seed=0):
+    """(num_clusters, D) unit centroids from spherical k-means on a sample of the rows"""
+    rng = np.random.default_rng(seed)
+    sample = embeddings[rng.permutation(len(embeddings))[:max(num_clusters, KMEANS_SAMPLE)]]
+    centroids = sample[rng.choice(len(sample), num_clusters, replace=False)]
+    for _ in range(iterations):
+        labels = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        empty = np.bincount(labels, minlength=num_clusters) == 0
+        # An empty cluster restarts at a random row rather than staying dead
+        sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+def assign_clusters(embeddings, centroids, chunk=SEARCH_CHUNK_ROWS):
+    return np.concatenate([np.argmax(embeddings[start:start + chunk] @ centroids.T, axis=1)
+                           for start in range(0, len(embeddings), chunk)])
+
+
+def read_manifest(index_dir):
+    try:
+        with open(os.path.join(index_dir, INDEX_FILE), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get('format') == INDEX_FORMAT else None
+
+
+def write_index(index_dir, model_version, entries, embeddings, previous=None):
+    """Store rows (clustered once there are enough of them) and swap in a new manifest
+
+    previous is the manifest being replaced; its clusters are reused until the
+    index has grown or shrunk by RECLUSTER_GROWTH. Returns whether it re-clustered.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    centroids, reclustered = None, False
+    if len(entries) > EXACT_SEARCH_LIMIT:
+        clustered = previous.get('clustered_count', 0) if previous is not None and previous['centroids_file'] else 0
+        if clustered and 1 / RECLUSTER_GROWTH < len(entries) / clustered < RECLUSTER_GROWTH:
+            centroids = np.load(os.path.join(index_dir, previous['centroids_file']))
+        else:
+            centroids, clustered, reclustered = train_clusters(embeddings, int(np.sqrt(len(entries)))), len(entries), True
+        labels = assign_clusters(embeddings, centroids)
+        order = np.argsort(labels, kind='stable')
+        embeddings, entries = embeddings[order], [entries[i] for i in order]
+        offsets = np.searchsorted(labels[order], np.arange(len(centroids) + 1))
+
+    # New files under fresh names, then the manifest swapped in one rename:
+    # a reader sees either the old index or the new one, never a mix
+    token = uuid.uuid4().hex[:12]
+    manifest = {
+        'format': INDEX_FORMAT,
+        'model_version': model_version,
+        'dim': int(embeddings.shape[1]) if len(entries) else 0,
+        'count': len(entries),
+        'data_file': f'embeddings-{token}.f16',
+        'entries': [list(entry) for entry in entries],
+        'centroids_file': None,
+        'built_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+    np.asarray(embeddings, dtype=np.float16).tofile(os.path.join(index_dir, manifest['data_file']))
+    if centroids is not None:
+        manifest.update(centroids_file=f'centroids-{token}.npy', clustered_count=clustered, offsets=offsets.tolist())
+        np.save(os.path.join(index_dir, manifest['centroids_file']), centroids)
+    temp_path = os.path.join(index_dir, INDEX_FILE + '.tmp')
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(temp_path, os.path.join(index_dir, INDEX_FILE))
+    # Open memory maps keep their (unlinked) old files until they are closed
+    for name in os.listdir(index_dir):
+        if name.startswith(('embeddings-', 'centroids-')) and name not in (manifest['data_file'],
+                                                                         manifest['centroids_file']):
+            os.remove(os.path.join(index_dir, name))
+    return reclustered
+
+
+def build_index(backend, bundle_dir=MODEL_BUNDLE_DIR, dataset_dir=REFERENCE_DATASET_DIR):
+    """Create or incrementally update a bundle's embedding index; returns what changed"""
+    index_dir = os.path.join(bundle_dir, INDEX_SUBDIR)
+    files = scan_dataset(dataset_dir)
+    manifest = read_manifest(index_dir)
+    if manifest is not None and manifest['model_version'] != backend.bundle['version']:
+        manifest = None  # embeddings from another model are not comparable
+
+    previous = {}
+    if manifest is not None and manifest['count']:
+        matrix = np.memmap(os.path.join(index_dir, manifest['data_file']), dtype=np.float16, mode='r',
+                           shape=(manifest['count'], manifest['dim']))
+        previous = {path: (row, size, mtime) for row, (path, _, size, mtime) in enumerate(manifest['entries'])}
+    # An image is unchanged if its size and modification time are
+    kept = [entry for entry in files if previous.get(entry[0], (None,))[1:] == tuple(entry[2:])]
+    changed = [entry for entry in files if previous.get(entry[0], (None,))[1:] != tuple(entry[2:])]
+    stats = {'kept': len(kept), 'embedded': len(changed),
+             'removed': len(set(previous) - {path for path, _, _, _ in files}), 'reclustered': False,
+             'count': len(files)}
+    if manifest is not None and not changed and not stats['removed']:
+        return stats
+
+    parts = []
+    if kept:
+        parts.append(np.asarray(matrix[[previous[path][0] for path, _, _, _ in kept]], dtype=np.float32))
+    if changed:
+        parts.append(embed_images(backend, [os.path.join(dataset_dir, path) for path, _, _, _ in changed]))
+    embeddings = np.concatenate(parts) if parts else np.zeros((0, 0), np.float32)
+    stats['reclustered'] = write_index(index_dir, backend.bundle['version'], kept + changed, embeddings, manifest)
+    return stats
+
+
+class EmbeddingIndex:
+    """Read-only, memory-mapped view of one embedding index"""
+
+    def __init__(self, index_dir, dataset_dir=REFERENCE_DATASET_DIR):
+        manifest = read_manifest(index_dir)
+        if manifest is None:
+            raise FileNotFoundError(f"No embedding index in {index_dir}")
+        self.dataset_dir = dataset_dir
+        self.model_version = manifest['model_version']
+        self.entries = manifest['entries']
+        self.matrix = np.memmap(os.path.join(index_dir, manifest['data_file']), dtype=np.float16, mode='r',
+                                shape=(manifest['count'], manifest['dim'])) if manifest['count'] else None
+        self.centroids = None
+        if manifest['centroids_file']:
+            self.centroids = np.load(os.path.join(index_dir, manifest['centroids_file']))
+            self.offsets = np.asarray(manifest['offsets'])
+        self._buffer = np.empty((SEARCH_CHUNK_ROWS, manifest['dim']), np.float32)
+        self._lock = threading.Lock()  # searches share the conversion buffer
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _candidate_ranges(self, query, probes):
+        if self.centroids is None:
+            return [(0, len(self.entries))]
+        scores = self.centroids @ query
+        nearest = np.argpartition(-scores, probes - 1)[:probes] if probes < len(scores) else range(len(scores))
+        return [(self.offsets[c], self.offsets[c + 1]) for c in nearest if self.offsets[c + 1] > self.offsets[c]]
+
+    def _score(self, query, start, end):
+        """Cosine similarities of rows [start, end), converted to float32 a chunk at a time"""
+        scores = np.empty(end - start, np.float32)
+        for chunk in range(start, end, SEARCH_CHUNK_ROWS):
+            rows = self.matrix[chunk:min(end, chunk + SEARCH_CHUNK_ROWS)]
+            buffer = self._buffer[:len(rows)]
+            buffer[...] = rows
+            np.dot(buffer, query, out=scores[chunk - start:chunk - start + len(rows)])
+        return scores
+
+    def search(self, embedding, k=5, probes=SEARCH_PROBES):
+        """The k most similar images: [{'path', 'class_name', 'similarity'}], most similar first"""
+        if self.matrix is None:
+            return []
+        query = normalize_rows(embedding).reshape(-1)
+        ranges = self._candidate_ranges(query, probes)
+        with self._lock:
+            scores = np.concatenate([self._score(query, start, end) for start, end in ranges])
+        rows = np.concatenate([np.arange(start, end) for start, end in ranges])
+        top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k] if len(scores) > k else np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        return [{'path': os.path.join(self.dataset_dir, self.entries[rows[i]][0]),
+                 'class_name': self.entries[rows[i]][1], 'similarity': min(1.0, float(scores[i]))} for i in top]
+
+
+@functools.lru_cache(maxsize=256)
+def thumbnail(path, side=THUMBNAIL_SIDE):
+    """Small JPEG of a reference image, decoded at reduced size"""
+    with open(path, 'rb') as f:
+        return make_preview(decode_image(f.read(), side), side)
+
+
+if __name__ == "__main__":
+    # Build or update the index for the current model, then time a search
+    from inference_backends import load_backend
+
+    backend = load_backend('keras')
+    begin = time.perf_counter()
+    stats = build_index(backend)
+    print(f"Index updated in {time.perf_counter() - begin:.1f}s: {stats}")
+    index = EmbeddingIndex(os.path.join(MODEL_BUNDLE_DIR, INDEX_SUBDIR))
+    query = np.asarray(index.matrix[0], dtype=np.float32)
+    begin = time.perf_counter()
+    for _ in range(100):
+        index.search(query)
+    print(f"{len(index)} images, {(time.perf_counter() - begin) * 10:.2f} ms per search")
@@ -0,0 +1,286 @@
+"""
+Field feedback store and uncertainty-ranked relabel queue
+
+Every analyzed upload is kept with the class probabilities the model gave
+it; corrected or confirmed labels are recorded next to it. Both tables are
+append-only raw column files, read memory-mapped, so ranking scores every
+stored upload at once in a few vectorized passes.
+
+The review loop:
+
+1. export_for_review copies the unlabeled uploads the model is least sure
+   of (smallest top-two margin, or highest entropy) into a review folder
+   laid out like dataset/archive/<class>/, filed under the predicted class.
+2. Reviewers move misfiled images into the right class folder.
+3. import_review records each image's folder as its label.
+4. export_labeled copies every labeled upload into the training dataset,
+   so train_model.py learns from the field data that mattered most.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+# Feedback configuration
+RECORD_FIELD_UPLOADS = True  # keep analyzed uploads in the app for relabeling and retraining
+FEEDBACK_STORE_PATH = 'data/feedback'
+REVIEW_DIR = 'data/feedback/review'
+TRAINING_DATASET_DIR = 'dataset/archive'  # train_model.DATASET_PATH
+REVIEW_BATCH_SIZE = 50
+EXPORT_PREFIX = 'field_'  # marks exported uploads among the original training images
+USER = 0  # label given in the app
+REVIEW = 1  # label given by moving the image during review
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+KEY_DTYPE = 'S40'  # upload keys are SHA-1 hex digests
+UPLOAD_COLUMNS = {'key': KEY_DTYPE, 'timestamp': np.int64, 'model_id': np.int32}
+LABEL_COLUMNS = {'key': KEY_DTYPE, 'timestamp': np.int64, 'label': np.int16, 'source': np.int8}
+
+
+def margin_scores(probabilities):
+    """1 - (top-1 minus top-2 probability): close calls score near 1"""
+    top_two = -np.partition(-np.asarray(probabilities, dtype=np.float32), 1, axis=1)[:, :2]
+    return 1.0 - (top_two[:, 0] - top_two[:, 1])
+
+
+def entropy_scores(probabilities):
+    """Shannon entropy of each probability row, in nats"""
+    probabilities = np.asarray(probabilities, dtype=np.float32)
+    logs = np.log(np.maximum(probabilities, np.finfo(np.float32).tiny))
+    return -np.einsum('ij,ij->i', probabilities, logs)
+
+
+UNCERTAINTY_STRATEGIES = {'margin': margin_scores, 'entropy': entropy_scores}
+
+
+def _latest(keys):
+    """Index of the last row for each distinct key"""
+    _, first_from_end = np.unique(keys[::-1], return_index=True)
+    return np.sort(len(keys) - 1 - first_from_end)
+
+
+class FeedbackStore:
+    """Append-only store of field uploads, their probabilities and their corrected labels"""
+
+    def __init__(self, path=FEEDBACK_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._images = os.path.join(path, 'images')
+        os.makedirs(self._images, exist_ok=True)
+        for table in ('uploads', 'labels'):
+            os.makedirs(os.path.join(path, table), exist_ok=True)
+        self._meta_path = os.path.join(path, 'meta.json')
+        self._meta = {'class_names': None, 'models': []}
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, 'r', encoding='utf-8') as f:
+                self._meta = json.load(f)
+        self._seen = None
+
+    @property
+    def class_names(self):
+        return self._meta['class_names']
+
+    def _save_meta(self):
+        tmp_path = f"{self._meta_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._meta, f, ensure_ascii=False)
+        os.replace(tmp_path, self._meta_path)
+
+    def _complete_rows(self, table, row_bytes):
+        """Number of rows present in every column file, given each column's bytes per row"""
+        sizes = []
+        for name, itemsize in row_bytes.items():
+            file_path = os.path.join(self.path, table, f"{name}.bin")
+            sizes.append(os.path.getsize(file_path) // itemsize if os.path.exists(file_path) else 0)
+        return min(sizes)
+
+    def _append(self, table, row):
+        """Append one row ({column: values}); call with the lock held"""
+        # Drop the tail of a torn append first, or the new row would land out of line
+        complete = self._complete_rows(table, {name: values.nbytes for name, values in row.items()})
+        for name, values in row.items():
+            with open(os.path.join(self.path, table, f"{name}.bin"), 'ab') as f:
+                f.truncate(complete * values.nbytes)
+                f.write(values.tobytes())
+
+    def _read(self, table, dtypes, width=None):
+        # A crash mid-append can leave columns uneven; only complete rows are visible
+        rows = self._complete_rows(table, {name: np.dtype(dtype).itemsize * (width if name == 'probabilities' else 1)
+                                           for name, dtype in dtypes.items()})
+        if rows == 0:
+            return {name: np.empty((0, width) if name == 'probabilities' else 0, dtype=dtype)
+                    for name, dtype in dtypes.items()}
+        return {name: np.memmap(os.path.join(self.path, table, f"{name}.bin"), dtype=dtype, mode='r',
+                                shape=(rows, width) if name == 'probabilities' else (rows,))
+                for name, dtype in dtypes.items()}
+
+    def image_path(self, key):
+        """Path of a stored upload's original image, or None"""
+        for extension in IMAGE_EXTENSIONS:
+            path = os.path.join(self._images, f"{key}{extension}")
+            if os.path.exists(path):
+                return path
+        return None
+
+    def add_upload(self, key, data, probabilities, class_names, model_version=None, extension='.jpg',
+                   timestamp=None):
+        """Keep an analyzed upload and its probabilities; returns False for a repeat or an unknown class order"""
+        extension = extension.lower() if extension and extension.lower() in IMAGE_EXTENSIONS else '.jpg'
+        with self._lock:
+            if self._meta['class_names'] is None:
+                self._meta['class_names'] = list(class_names)
+                self._save_meta()
+            if sorted(class_names) != sorted(self._meta['class_names']):
+                print(f"Not recording upload {key}: model classes differ from the feedback store's")
+                return False
+            if model_version not in self._meta['models']:
+                self._meta['models'].append(model_version)
+                self._save_meta()
+            model_id = self._meta['models'].index(model_version)
+            if self._seen is None:
+                uploads = self._read('uploads', UPLOAD_COLUMNS)
+                self._seen = set(zip(uploads['key'].tolist(), uploads['model_id'].tolist()))
+            if (key.encode(), model_id) in self._seen:
+                return False
+            self._seen.add((key.encode(), model_id))
+
+            if self.image_path(key) is None:
+                tmp_path = os.path.join(self._images, f"{key}.tmp")
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, os.path.join(self._images, f"{key}{extension}"))
+
+            # Rows follow the store's class order whatever order the model used
+            order = [list(class_names).index(name) for name in self._meta['class_names']]
+            row = np.asarray(probabilities, dtype=np.float32)[order]
+            self._append('uploads', {
+                'probabilities': row,
+                'key': np.array([key], dtype=KEY_DTYPE),
+                'timestamp': np.array([timestamp if timestamp is not None else time.time()], dtype=np.int64),
+                'model_id': np.array([model_id], dtype=np.int32)
+            })
+        return True
+
+    def add_label(self, key, label, source=USER, timestamp=None):
+        """Record the true class of an upload; the latest label wins"""
+        with self._lock:
+            if self._meta['class_names'] is None or label not in self._meta['class_names']:
+                raise ValueError(f"Unknown class '{label}'")
+            self._append('labels', {
+                'key': np.array([key], dtype=KEY_DTYPE),
+                'timestamp': np.array([timestamp if timestamp is not None else time.time()], dtype=np.int64),
+                'label': np.array([self._meta['class_names'].index(label)], dtype=np.int16),
+                'source': np.array([source], dtype=np.int8)
+            })
+
+    def uploads(self):
+        """Latest row per upload: {'key', 'timestamp', 'model_id', 'probabilities'} arrays"""
+        width = len(self.class_names or [])
+        if not width:
+            return {'key': np.empty(0, dtype=KEY_DTYPE), 'timestamp': np.empty(0, dtype=np.int64),
+                    'model_id': np.empty(0, dtype=np.int32), 'probabilities': np.empty((0, 0), dtype=np.float32)}
+        with self._lock:
+            columns = self._read('uploads', dict(UPLOAD_COLUMNS, probabilities=np.float32), width)
+        rows = _latest(columns['key'])
+        return {name: np.asarray(values[rows]) for name, values in columns.items()}
+
+    def labels(self):
+        """{upload key: class name} from the latest label of each upload"""
+        with self._lock:
+            columns = self._read('labels', LABEL_COLUMNS)
+        rows = _latest(columns['key'])
+        return {key.decode(): self.class_names[label]
+                for key, label in zip(columns['key'][rows].tolist(), columns['label'][rows].tolist())}
+
+
+def relabel_queue(store, n=REVIEW_BATCH_SIZE, strategy='margin'):
+    """The n unlabeled uploads the model is least sure of, most uncertain first"""
+    uploads = store.uploads()
+    labeled = np.array(list(store.labels()), dtype=KEY_DTYPE)
+    candidates = np.flatnonzero(~np.isin(uploads['key'], labeled))
+    if not len(candidates) or n <= 0:
+        return []
+    scores = UNCERTAINTY_STRATEGIES[strategy](uploads['probabilities'][candidates])
+    top = np.argpartition(-scores, n - 1)[:n] if n < len(scores) else np.arange(len(scores))
+    top = top[np.argsort(-scores[top], kind='stable')]
+    predicted = uploads['probabilities'][candidates[top]].argmax(axis=1)
+    return [{'key': uploads['key'][candidates[i]].decode(), 'predicted_class': store.class_names[label],
+             'score': float(scores[i])} for i, label in zip(top, predicted)]
+
+
+def export_for_review(store, review_dir=REVIEW_DIR, n=REVIEW_BATCH_SIZE, strategy='margin'):
+    """Copy the relabel queue into review_dir/<predicted class>/ for reviewers to sort"""
+    queue = relabel_queue(store, n, strategy)
+    # Every class gets a folder, so a misfiled image can be moved to any of them
+    for class_name in store.class_names or []:
+        os.makedirs(os.path.join(review_dir, class_name), exist_ok=True)
+    for item in queue:
+        source = store.image_path(item['key'])
+        shutil.copyfile(source, os.path.join(review_dir, item['predicted_class'], os.path.basename(source)))
+    return queue
+
+
+def import_review(store, review_dir=REVIEW_DIR):
+    """Record each reviewed image's class folder as its label; returns the number of labels added"""
+    if not os.path.isdir(review_dir):
+        return 0
+    current = store.labels()
+    added = 0
+    for class_name in sorted(os.listdir(review_dir)):
+        folder = os.path.join(review_dir, class_name)
+        if not os.path.isdir(folder) or class_name not in (store.class_names or []):
+            continue
+        for name in sorted(os.listdir(folder)):
+            key = os.path.splitext(name)[0]
+            if store.image_path(key) is not None and current.get(key) != class_name:
+                store.add_label(key, class_name, source=REVIEW)
+                current[key] = class_name
+                added += 1
+    return added
+
+
+def export_labeled(store, dataset_dir=TRAINING_DATASET_DIR):
+    """Copy labeled uploads into dataset_dir/<class>/, moving any whose label changed"""
+    stats = {'added': 0, 'moved': 0}
+    class_names = store.class_names or []
+    for key, label in store.labels().items():
+        source = store.image_path(key)
+        if source is None or not os.path.exists(source):
+            continue
+        name = f"{EXPORT_PREFIX}{os.path.basename(source)}"
+        target = os.path.join(dataset_dir, label, name)
+        stale = [os.path.join(dataset_dir, other, name) for other in class_names if other != label]
+        stale = [path for path in stale if os.path.exists(path)]
+        for path in stale:
+            os.remove(path)
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(source, target)
+            stats['moved' if stale else 'added'] += 1
+    return stats
+
+
+if __name__ == "__main__":
+    # python feedback_store.py [review [N] [margin|entropy] | import | export]
+    import sys
+
+    store = FeedbackStore()
+    command = sys.argv[1] if len(sys.argv) > 1 else 'review'
+    if command == 'review':
+        n = int(sys.argv[2]) if len(sys.argv) > 2 else REVIEW_BATCH_SIZE
+        strategy = sys.argv[3] if len(sys.argv) > 3 else 'margin'
+        begin = time.perf_counter()
+        queue = export_for_review(store, n=n, strategy=strategy)
+        print(f"Copied {len(queue)} of {len(store.uploads()['key'])} uploads to {REVIEW_DIR} "
+              f"in {time.perf_counter() - begin:.2f}s; move misfiled images to the right class folder, "
+              f"then run 'python feedback_store.py import'")
+    elif command == 'import':
+        print(f"Recorded {import_review(store)} labels from {REVIEW_DIR}")
+    elif command == 'export':
+        print(f"Exported labeled uploads to {TRAINING_DATASET_DIR}: {export_labeled(store)}")
+    else:
+        raise SystemExit(f"Unknown command '{command}'")
@@ -5,8 +5,7 @@ Script to fix model prediction issues and multilingual support
 import os
 import json
 import numpy as np
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
+from model_bundle import BUNDLE_FILE, MODEL_BUNDLE_DIR, read_bundle, verify_bundle
 import matplotlib.pyplot as plt
 from sklearn.utils.class_weight import compute_class_weight
 from collections import Counter
@@ -28,23 +27,15 @@ def analyze_dataset_balance(dataset_path):
     return class_counts
 
 def create_balanced_model():
-    """Create model with class balancing"""
+    """Write the class mapping of the current model bundle"""
     
-    # Load existing model
-    model = load_model('models/mango_disease_model.h5')
+    # The bundle records the class order the model was trained with
+    bundle = read_bundle()
+    if not verify_bundle():
+        print(f"Warning: model bundle {bundle['version']} does not match its content hash")
     
-    # Get class indices
-    datagen = ImageDataGenerator(rescale=1./255, validation_split=0.2)
-    generator = datagen.flow_from_directory(
-        'dataset',
-        target_size=(224, 224),
-        batch_size=32,
-        class_mode='categorical',
-        subset='training'
-    )
-    
-    class_indices = generator.class_indices
-    class_names = list(class_indices.keys())
+    class_names = bundle['class_names']
+    class_indices = {class_name: index for index, class_name in enumerate(class_names)}
     
     # Save class mapping
     with open('models/class_mapping.json', 'w') as f:
@@ -118,7 +109,7 @@ if __name__ == "__main__":
         analyze_dataset_balance('dataset')
     
     # Create balanced model
-    if os.path.exists('models/mango_disease_model.h5'):
+    if os.path.exists(os.path.join(MODEL_BUNDLE_DIR, BUNDLE_FILE)):
         class_names = create_balanced_model()
         print(f"Model classes: {class_names}")
     
@@ -0,0 +1,241 @@
+"""
+Location normalization, persistent geocode cache and lat/lon grid bucketing
+
+Free-text locations are normalized, geocoded once and snapped to a grid cell
+so that every farm in the same cell shares one weather fetch.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from weather_client import RateLimiter, normalize_location
+
+# Geocoding configuration
+GEOCODE_CACHE_PATH = 'cache/geocode_cache.json'
+GRID_CELL_DEG = 0.1  # roughly 11 km at Indian latitudes
+GEOCODER_USER_AGENT = 'agrileaf-doctor'
+DEFAULT_COUNTRY = 'india'
+GEOCODER_MAX_RATE = 1.0  # requests per second; Nominatim's usage policy allows at most one
+GEOCODE_MISS_TTL = 7 * 86400  # places not found are asked about again after this long
+CELL_CACHE_TTL = 600
+CELL_CACHE_MAX_ENTRIES = 4096
+
+STATE_ABBREVIATIONS = {
+    'ap': 'andhra pradesh',
+    'br': 'bihar',
+    'ga': 'goa',
+    'gj': 'gujarat',
+    'ka': 'karnataka',
+    'kl': 'kerala',
+    'mh': 'maharashtra',
+    'mp': 'madhya pradesh',
+    'od': 'odisha',
+    'tn': 'tamil nadu',
+    'ts': 'telangana',
+    'tg': 'telangana',
+    'up': 'uttar pradesh',
+    'wb': 'west bengal'
+}
+
+
+def normalize_location_query(location):
+    """Normalize a location string: lowercase, expand state codes, drop the country"""
+    parts = [STATE_ABBREVIATIONS.get(part, part) for part in normalize_location(location).split(', ') if part]
+    if len(parts) > 1 and parts[-1] == DEFAULT_COUNTRY:
+        parts = parts[:-1]
+    return ', '.join(dict.fromkeys(parts))
+
+
+def snap_to_cell(lat, lon, cell_deg=GRID_CELL_DEG):
+    """Snap a coordinate to its grid cell index"""
+    return (int(math.floor(lat / cell_deg)), int(math.floor(lon / cell_deg)))
+
+
+def cell_center(cell, cell_deg=GRID_CELL_DEG):
+    """Get the coordinate at the center of a grid cell"""
+    return (round((cell[0] + 0.5) * cell_deg, 4), round((cell[1] + 0.5) * cell_deg, 4))
+
+
+class GeopyGeocoder:
+    """Online geocoder backed by geopy's Nominatim client"""
+
+    def __init__(self, user_agent=GEOCODER_USER_AGENT, timeout=5):
+        from geopy.geocoders import Nominatim
+        self._geocoder = Nominatim(user_agent=user_agent, timeout=timeout)
+
+    def geocode(self, query):
+        """Get (lat, lon) for a normalized query, or None if not found"""
+        result = self._geocoder.geocode(f"{query}, {DEFAULT_COUNTRY}", country_codes='in')
+        if result is None:
+            return None
+        return (result.latitude, result.longitude)
+
+
+class OfflineGazetteer:
+    """Geocoder backed by an in-memory place table, for tests and offline use"""
+
+    def __init__(self, places):
+        self.places = {normalize_location_query(name): tuple(coords) for name, coords in places.items()}
+        self.names = {}
+        for query, coords in self.places.items():
+            self.names.setdefault(query.split(', ')[0], coords)
+        self.calls = 0
+
+    def geocode(self, query):
+        """Get (lat, lon) for a normalized query, falling back to the place name alone"""
+        self.calls += 1
+        if query in self.places:
+            return self.places[query]
+        return self.names.get(query.split(', ')[0])
+
+
+class GeocodeCache:
+    """Thread-safe geocode cache persisted to a JSON file
+
+    Hits are kept for good; a miss is stored with the time it was seen
+    and expires after miss_ttl, since a query can fail to resolve today
+    and succeed once the place is mapped or the service recovers.
+    """
+
+    def __init__(self, path=GEOCODE_CACHE_PATH, miss_ttl=GEOCODE_MISS_TTL):
+        self.path = path
+        self.miss_ttl = miss_ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Error reading geocode cache: {e}")
+
+    def _live(self, entry):
+        # Coordinates are a list, a miss is {'missed_at': epoch seconds}; older caches stored misses as null
+        if isinstance(entry, dict):
+            return time.time() - entry.get('missed_at', 0) < self.miss_ttl
+        return entry is not None
+
+    def __contains__(self, query):
+        with self._lock:
+            return self._live(self._entries.get(query))
+
+    def get(self, query):
+        """Get cached coordinates (None for misses and unknown queries)"""
+        with self._lock:
+            coords = self._entries.get(query)
+        return tuple(coords) if isinstance(coords, list) else None
+
+    def put(self, query, coords):
+        """Store coordinates (or None for a miss) and persist the cache"""
+        with self._lock:
+            self._entries[query] = list(coords) if coords else {'missed_at': time.time()}
+            snapshot = dict(self._entries)
+        self._save(snapshot)
+
+    def _save(self, entries):
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error writing geocode cache: {e}")
+
+
+class CellCache:
+    """Small TTL + LRU cache for per-cell results"""
+
+    def __init__(self, ttl=CELL_CACHE_TTL, max_entries=CELL_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Get a live entry or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, value):
+        """Store an entry, evicting the least recently used beyond the cap"""
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class LocationResolver:
+    """Resolve free-text locations to grid cells through a cached geocoder"""
+
+    def __init__(self, geocoder, cache=None, cell_deg=GRID_CELL_DEG, rate_limiter=None):
+        self.geocoder = geocoder
+        self.cache = cache if cache is not None else GeocodeCache(None)
+        self.cell_deg = cell_deg
+        # One limiter for every thread using the resolver (bulk sweeps geocode from a pool)
+        self.rate_limiter = rate_limiter
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def geocode(self, location):
+        """Get (lat, lon) for a location, geocoding each normalized query only once"""
+        query = normalize_location_query(location)
+        if not query:
+            return None
+        if query in self.cache:
+            return self.cache.get(query)
+
+        with self._locks_lock:
+            lock = self._locks.setdefault(query, threading.Lock())
+        try:
+            with lock:
+                if query not in self.cache:
+                    if self.rate_limiter is not None:
+                        self.rate_limiter.acquire()
+                    # A geocoder error propagates uncached, so the next lookup tries again
+                    self.cache.put(query, self.geocoder.geocode(query))
+        finally:
+            with self._locks_lock:
+                self._locks.pop(query, None)
+        return self.cache.get(query)
+
+    def resolve(self, location):
+        """Get the grid cell and its center coordinate for a location, or None"""
+        coords = self.geocode(location)
+        if coords is None:
+            return None
+        cell = snap_to_cell(coords[0], coords[1], self.cell_deg)
+        return {
+            'query': normalize_location_query(location),
+            'lat': coords[0],
+            'lon': coords[1],
+            'cell': cell,
+            'center': cell_center(cell, self.cell_deg)
+        }
+
+
+def create_default_resolver():
+    """Create the geopy-backed resolver, or None if geopy is not installed"""
+    try:
+        geocoder = GeopyGeocoder()
+    except ImportError:
+        print("geopy not installed; weather lookups fall back to free-text queries")
+        return None
+    return LocationResolver(geocoder, GeocodeCache(GEOCODE_CACHE_PATH),
+                            rate_limiter=RateLimiter(GEOCODER_MAX_RATE, burst=1))
@@ -0,0 +1,69 @@
+"""
+Single-decode upload processing
+
+Each upload is decoded once, orientation-corrected and turned into everything
+the app needs: a small JPEG preview for the browser, the model input and a
+working-resolution RGB image for later analysis stages.
+"""
+
+import io
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from model_bundle import DEFAULT_INPUT_SIZE, DEFAULT_NORMALIZATION
+
+# Pipeline configuration
+MODEL_INPUT_SIZE = DEFAULT_INPUT_SIZE[::-1]  # (width, height); a loaded model bundle overrides this
+PREVIEW_MAX_SIDE = 512
+PREVIEW_JPEG_QUALITY = 80
+WORKING_MAX_SIDE = 1280  # resolution kept for analysis stages that need more detail than the model input
+
+
+def decode_image(data, max_side=WORKING_MAX_SIDE):
+    """Decode image bytes to an upright RGB image no larger than max_side"""
+    img = Image.open(io.BytesIO(data))
+    # Let the JPEG decoder skip detail we would throw away (DCT scaling)
+    if img.format == 'JPEG':
+        img.draft('RGB', (max_side, max_side))
+    img = ImageOps.exif_transpose(img)
+    img = img.convert('RGB')
+    if max(img.size) > max_side:
+        img.thumbnail((max_side, max_side), Image.BILINEAR)
+    return img
+
+
+def make_preview(img, max_side=PREVIEW_MAX_SIDE, quality=PREVIEW_JPEG_QUALITY):
+    """Encode a downscaled JPEG preview of a decoded image"""
+    preview = img.copy()
+    preview.thumbnail((max_side, max_side), Image.BILINEAR)
+    buffer = io.BytesIO()
+    preview.save(buffer, format='JPEG', quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def make_model_input(img, size=MODEL_INPUT_SIZE):
+    """Resize a decoded image to the model input as uint8 (H, W, 3)"""
+    return np.asarray(img.resize(size, Image.BILINEAR), dtype=np.uint8)
+
+
+def process_upload(data, model_input_size=MODEL_INPUT_SIZE):
+    """Decode upload bytes once and derive the preview, model input and working image"""
+    img = decode_image(data)
+    return {
+        'size': img.size,
+        'preview': make_preview(img),
+        'model_input': make_model_input(img, model_input_size),
+        'image': np.asarray(img)
+    }
+
+
+def normalize_batch(images, normalization=DEFAULT_NORMALIZATION):
+    """uint8 (N, H, W, 3) model inputs -> float32 batch normalized as the model expects"""
+    batch = np.asarray(images, dtype=np.float32)
+    return batch * np.float32(normalization['scale']) + np.float32(normalization['offset'])
+
+
+def to_model_batch(processed_uploads, normalization=DEFAULT_NORMALIZATION):
+    """Stack processed uploads into a float32 batch normalized as the model expects"""
+    return normalize_batch(np.stack([processed['model_input'] for processed in processed_uploads]), normalization)
@@ -0,0 +1,177 @@
+"""
+Image quality gate
+
+Cheap OpenCV/NumPy checks that run on the small model input before the CNN:
+image size, blank frames, exposure, blur (variance of the Laplacian) and the
+share of leaf-coloured pixels. Unusable images are rejected with reasons
+instead of being forced into one of the disease classes; borderline ones
+are flagged so the result can carry a warning.
+"""
+
+import threading
+from collections import Counter
+
+import cv2
+import numpy as np
+
+# Quality gate configuration
+MIN_IMAGE_SIDE = 64  # smaller uploads carry too little detail to classify
+LOW_RESOLUTION_SIDE = 160  # the training photos are 240-320 px; well below that: flag
+BLANK_STD = 4.0  # grey-level standard deviation of a featureless frame
+DARK_MEAN, BRIGHT_MEAN = 30, 230  # mean grey level outside this range: reject
+CLIPPED_FRACTION = 0.35  # share of pixels at black or white before flagging exposure
+BLUR_REJECT, BLUR_WARN = 6.0, 20.0  # Laplacian variance at the model input size
+# White balance is estimated from near-neutral pixels (the background), so a frame filled by one
+# colour is not pulled to grey; without enough of them the image is left as it is
+NEUTRAL_MAX_SATURATION = 120  # the bluish backgrounds of the training photos reach about 110
+NEUTRAL_MIN_FRACTION = 0.1
+MAX_BALANCE_GAIN = 1.6
+GREEN_HUE_RANGE = (25, 95)  # OpenCV hue (0-179): yellow-green to green
+GREEN_MIN_SATURATION = 35  # fainter tints are noise on a grey background
+BROWN_HUE_RANGES = ((0, 24), (160, 179))  # reddish brown to orange-brown
+LEAF_MIN_SATURATION, LEAF_MIN_VALUE = 20, 20
+# Brown alone is also skin, ripe fruit, clothes and brick. It counts as leaf next to enough
+# green (lesions), or when it looks like a dried leaf: dull or orange-brown, and not bright
+BROWN_NEEDS_GREEN_RATIO = 0.02
+DRY_LEAF_MAX_SATURATION = 80
+DRY_LEAF_HUE_RANGE = (10, 22)
+DRY_LEAF_MAX_VALUE = 180  # ripe mango, light skin and orange cloth are brighter
+# Share of leaf-coloured pixels; a dry Die Back leaf on a plain background can be under 2%
+LEAF_REJECT_RATIO, LEAF_WARN_RATIO = 0.005, 0.02
+
+REJECT, WARN, OK = 'reject', 'warn', 'ok'
+
+# Shown to users (translated by the app); keys are the reason codes in a report
+REASON_MESSAGES = {
+    'too_small': "The image is too small to analyze. Please upload a larger photo.",
+    'low_resolution': "The image resolution is low; results may be less reliable.",
+    'blank': "The image appears to be blank.",
+    'too_dark': "The image is too dark. Please retake it in better light.",
+    'too_bright': "The image is overexposed. Please avoid direct sunlight or flash.",
+    'poor_exposure': "Parts of the image are over- or underexposed.",
+    'blurry': "The image is blurry. Please hold the camera steady and focus on the leaf.",
+    'slightly_blurry': "The image is slightly blurry; results may be less reliable.",
+    'not_a_leaf': "No leaf was found in the image. Please photograph a single leaf.",
+    'little_leaf': "The leaf fills little of the image. Move closer to the leaf."
+}
+
+
+def gray_world(rgb):
+    """White-balance an RGB uint8 image so its near-neutral pixels average to grey"""
+    rgb = np.ascontiguousarray(rgb)
+    neutral = cv2.inRange(cv2.cvtColor(rgb, cv2.COLOR_RGB2HSV), (0, 0, 0), (179, NEUTRAL_MAX_SATURATION, 255))
+    if np.count_nonzero(neutral) < NEUTRAL_MIN_FRACTION * neutral.size:
+        return rgb
+    means = np.array(cv2.mean(rgb, neutral)[:3])
+    gains = np.clip(means.mean() / np.maximum(means, 1.0), 1 / MAX_BALANCE_GAIN, MAX_BALANCE_GAIN)
+    # A per-channel lookup table instead of float arithmetic on every pixel
+    lut = np.clip(np.round(np.arange(256)[:, None] * gains), 0, 255).astype(np.uint8)
+    return cv2.LUT(rgb, lut.reshape(256, 1, 3))
+
+
+def leaf_mask(rgb):
+    """Pixels with leaf colours, judged after white balance so a bluish cast does not hide brown leaves"""
+    return leaf_colour_mask(cv2.cvtColor(gray_world(rgb), cv2.COLOR_RGB2HSV))
+
+
+def leaf_colour_mask(hsv):
+    """leaf_mask of an already white-balanced HSV image"""
+    # Opening drops isolated pixels: sensor noise in dark or grey areas takes every hue, a leaf is a region
+    kernel = np.ones((3, 3), np.uint8)
+    green = cv2.morphologyEx(cv2.inRange(hsv, (GREEN_HUE_RANGE[0], GREEN_MIN_SATURATION, LEAF_MIN_VALUE),
+                                         (GREEN_HUE_RANGE[1], 255, 255)), cv2.MORPH_OPEN, kernel)
+    has_green = np.count_nonzero(green) >= BROWN_NEEDS_GREEN_RATIO * green.size
+    if has_green:
+        brown = brown_mask(hsv)
+    else:
+        low, high = DRY_LEAF_HUE_RANGE
+        brown = brown_mask(hsv, DRY_LEAF_MAX_SATURATION, DRY_LEAF_MAX_VALUE) | cv2.inRange(
+            hsv, (low, LEAF_MIN_SATURATION, LEAF_MIN_VALUE), (high, 255, DRY_LEAF_MAX_VALUE))
+    return green | cv2.morphologyEx(brown, cv2.MORPH_OPEN, kernel)
+
+
+def brown_mask(hsv, max_saturation=255, max_value=255):
+    """Reddish- to orange-brown pixels up to a saturation and brightness"""
+    mask = None
+    for low, high in BROWN_HUE_RANGES:
+        part = cv2.inRange(hsv, (low, LEAF_MIN_SATURATION, LEAF_MIN_VALUE), (high, max_saturation, max_value))
+        mask = part if mask is None else mask | part
+    return mask
+
+
+def plant_colour_mask(hsv):
+    """Green and any brown, for images already known to show a leaf (e.g. a fully necrotic one)"""
+    green = cv2.inRange(hsv, (GREEN_HUE_RANGE[0], GREEN_MIN_SATURATION, LEAF_MIN_VALUE),
+                        (GREEN_HUE_RANGE[1], 255, 255))
+    return green | brown_mask(hsv)
+
+
+def measure_image(rgb):
+    """Quality metrics of an RGB uint8 image (use the model input for stable, fast numbers)"""
+    gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+    leaf = leaf_mask(rgb)
+    return {
+        'mean': float(gray.mean()),
+        'std': float(gray.std()),
+        'clipped': float(np.count_nonzero((gray <= 5) | (gray >= 250)) / gray.size),
+        'sharpness': float(cv2.Laplacian(gray, cv2.CV_64F).var()),
+        'leaf_ratio': float(np.count_nonzero(leaf) / leaf.size)
+    }
+
+
+def assess_image(rgb, image_size=None):
+    """Check an image; returns {'status', 'reasons', 'metrics'}
+
+    status is 'reject' if any check fails outright, 'warn' if any is
+    borderline and 'ok' otherwise. image_size is the (width, height) of the
+    decoded upload, when rgb has already been resized.
+    """
+    metrics = measure_image(rgb)
+    width, height = image_size or rgb.shape[1::-1]
+    rejected, warned = [], []
+
+    if min(width, height) < MIN_IMAGE_SIDE:
+        rejected.append('too_small')
+    elif min(width, height) < LOW_RESOLUTION_SIDE:
+        warned.append('low_resolution')
+
+    if metrics['std'] < BLANK_STD:
+        # Nothing else is meaningful on a featureless frame
+        rejected.append('blank')
+    else:
+        if metrics['mean'] < DARK_MEAN:
+            rejected.append('too_dark')
+        elif metrics['mean'] > BRIGHT_MEAN:
+            rejected.append('too_bright')
+        elif metrics['clipped'] > CLIPPED_FRACTION:
+            warned.append('poor_exposure')
+
+        if metrics['sharpness'] < BLUR_REJECT:
+            rejected.append('blurry')
+        elif metrics['sharpness'] < BLUR_WARN:
+            warned.append('slightly_blurry')
+
+        if metrics['leaf_ratio'] < LEAF_REJECT_RATIO:
+            rejected.append('not_a_leaf')
+        elif metrics['leaf_ratio'] < LEAF_WARN_RATIO:
+            warned.append('little_leaf')
+
+    status = REJECT if rejected else WARN if warned else OK
+    return {'status': status, 'reasons': rejected + warned, 'metrics': metrics}
+
+
+class QualityGate:
+    """assess_image plus counters of outcomes and reasons across all uploads"""
+
+    def __init__(self):
+        self.stats = {'checked': 0, REJECT: 0, WARN: 0, OK: 0, 'reasons': Counter()}
+        self._lock = threading.Lock()
+
+    def check(self, processed):
+        """Assess a processed upload (see image_pipeline.process_upload)"""
+        report = assess_image(processed['model_input'], processed['size'])
+        with self._lock:
+            self.stats['checked'] += 1
+            self.stats[report['status']] += 1
+            self.stats['reasons'].update(report['reasons'])
+        return report
@@ -0,0 +1,279 @@
+"""
+Pluggable inference backends
+
+Every backend loads the disease model from its own artifact and exposes the
+same contract: predict(batch) takes a float32 (N, H, W, 3) batch normalized
+as the model bundle specifies and returns (N, num_classes) float32
+probabilities. Backends are
+callables, so any of them can be handed to the inference executor. Which one
+the app uses is chosen by config, so the fastest runtime available on a
+machine can be deployed without code changes.
+"""
+
+import os
+import threading
+
+import numpy as np
+
+from activation_maps import class_activation_maps, find_cam_head
+from inference_executor import INTRA_OP_THREADS, configure_tf_threads
+from model_bundle import ARTIFACT_FILES, MODEL_BUNDLE_DIR, artifact_path, read_bundle, record_artifacts
+
+# Backend configuration
+INFERENCE_BACKEND = os.environ.get('AGRILEAF_BACKEND', 'keras')
+MODEL_PATHS = {backend: artifact_path(MODEL_BUNDLE_DIR, backend) for backend in ARTIFACT_FILES}
+
+
+class InferenceBackend:
+    """Common interface: batched predict() plus capability metadata"""
+
+    name = None
+
+    def __init__(self, path):
+        self.path = path
+        self.bundle = None
+        self.capabilities = {'backend': self.name, 'path': path}
+
+    @classmethod
+    def initialize_runtime(cls, num_threads=INTRA_OP_THREADS):
+        """Import and set up the runtime so its one-time cost is paid before any model loads"""
+
+    def predict(self, batch):
+        raise NotImplementedError
+
+    def explain(self, batch):
+        """(predictions, (N, h, w) activation maps of each image's predicted class) in one pass"""
+        raise NotImplementedError(f"The {self.name} backend cannot explain predictions")
+
+    def embed(self, batch):
+        """(N, D) penultimate-layer activations, the input of the classification layer"""
+        raise NotImplementedError(f"The {self.name} backend cannot compute embeddings")
+
+    def __call__(self, batch):
+        return self.predict(batch)
+
+    def close(self):
+        """Drop the loaded model so its memory can be reclaimed; the backend is unusable afterwards"""
+
+
+class KerasBackend(InferenceBackend):
+    """Full Keras model from the .h5 file (training-time runtime)"""
+
+    name = 'keras'
+
+    @classmethod
+    def initialize_runtime(cls, num_threads=INTRA_OP_THREADS):
+        configure_tf_threads(num_threads)
+
+    def __init__(self, path=MODEL_PATHS['keras'], num_threads=INTRA_OP_THREADS, model=None):
+        super().__init__(path)
+        configure_tf_threads(num_threads)
+        if model is None:
+            import tensorflow as tf
+            model = tf.keras.models.load_model(path)
+        self.model = model
+        self._cam_head = find_cam_head(model)
+        self.capabilities.update(runtime='tensorflow', dynamic_batch=True, threads=num_threads,
+                                 input_shape=tuple(model.input_shape[1:]), explain=self._cam_head is not None,
+                                 embed=True)
+        # Eager calls dispatch layer by layer, which costs more than the math for
+        # small models; one graph traced with a dynamic batch dimension serves every size
+        import tensorflow as tf
+        signature = [tf.TensorSpec((None,) + tuple(model.input_shape[1:]), tf.float32)]
+        self._forward = tf.function(lambda batch: model(batch, training=False), input_signature=signature)
+        self._explain_forward = None
+        if self._cam_head is not None:
+            # Same weights, one more output: the feature map the pooling layer reads
+            explain_model = tf.keras.Model(model.inputs, [self._cam_head[0], model.outputs[0]])
+            self._explain_forward = tf.function(lambda batch: explain_model(batch, training=False),
+                                                input_signature=signature)
+        # Dropout is the identity at inference, so the last layer's input is the penultimate activation
+        embed_model = tf.keras.Model(model.inputs, model.layers[-1].input)
+        self._embed_forward = tf.function(lambda batch: embed_model(batch, training=False), input_signature=signature)
+
+    def predict(self, batch):
+        return self._forward(np.asarray(batch, dtype=np.float32)).numpy()
+
+    def explain(self, batch):
+        if self._explain_forward is None:
+            return super().explain(batch)
+        features, predictions = self._explain_forward(np.asarray(batch, dtype=np.float32))
+        predictions = predictions.numpy()
+        return predictions, class_activation_maps(features.numpy(), self._cam_head[1], predictions.argmax(axis=1))
+
+    def embed(self, batch):
+        return self._embed_forward(np.asarray(batch, dtype=np.float32)).numpy()
+
+    def close(self):
+        self.model = self._forward = self._explain_forward = self._embed_forward = None
+
+
+class SavedModelBackend(InferenceBackend):
+    """Exported SavedModel serving signature (no Keras layers at load time)"""
+
+    name = 'savedmodel'
+
+    @classmethod
+    def initialize_runtime(cls, num_threads=INTRA_OP_THREADS):
+        configure_tf_threads(num_threads)
+
+    def __init__(self, path=MODEL_PATHS['savedmodel'], num_threads=INTRA_OP_THREADS):
+        super().__init__(path)
+        configure_tf_threads(num_threads)
+        import tensorflow as tf
+        self._tf = tf
+        self._loaded = tf.saved_model.load(path)
+        self._signature = self._loaded.signatures['serving_default']
+        _, inputs = self._signature.structured_input_signature
+        self._input_name, spec = next(iter(inputs.items()))
+        self.capabilities.update(runtime='tensorflow', dynamic_batch=spec.shape[0] is None, threads=num_threads,
+                                 input_shape=tuple(spec.shape[1:]))
+
+    def predict(self, batch):
+        outputs = self._signature(**{self._input_name: self._tf.constant(batch, dtype=self._tf.float32)})
+        return next(iter(outputs.values())).numpy()
+
+    def close(self):
+        self._loaded = self._signature = None
+
+
+class TFLiteBackend(InferenceBackend):
+    """TFLite interpreter; uses the standalone tflite_runtime package when installed"""
+
+    name = 'tflite'
+
+    @classmethod
+    def initialize_runtime(cls, num_threads=INTRA_OP_THREADS):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+            return Interpreter, 'tflite_runtime'
+        except ImportError:
+            import tensorflow as tf
+            return tf.lite.Interpreter, 'tensorflow.lite'
+
+    def __init__(self, path=MODEL_PATHS['tflite'], num_threads=INTRA_OP_THREADS):
+        super().__init__(path)
+        Interpreter, runtime = self.initialize_runtime(num_threads)
+        self._interpreter = Interpreter(model_path=path, num_threads=num_threads)
+        self._interpreter.allocate_tensors()
+        self._input = self._interpreter.get_input_details()[0]
+        self._output = self._interpreter.get_output_details()[0]
+        self._batch_size = int(self._input['shape'][0])
+        self._lock = threading.Lock()  # an interpreter must not be invoked concurrently
+        self.capabilities.update(runtime=runtime, dynamic_batch=int(self._input['shape_signature'][0]) == -1,
+                                 threads=num_threads, input_shape=tuple(int(d) for d in self._input['shape'][1:]))
+
+    def predict(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        with self._lock:
+            # Resizing reallocates tensors, so only do it when the batch size changes
+            if len(batch) != self._batch_size:
+                self._interpreter.resize_tensor_input(self._input['index'], batch.shape)
+                self._interpreter.allocate_tensors()
+                self._batch_size = len(batch)
+            self._interpreter.set_tensor(self._input['index'], batch)
+            self._interpreter.invoke()
+            return self._interpreter.get_tensor(self._output['index']).copy()
+
+    def close(self):
+        with self._lock:
+            self._interpreter = None
+
+
+class OnnxBackend(InferenceBackend):
+    """ONNX Runtime session on the CPU execution provider"""
+
+    name = 'onnx'
+
+    @classmethod
+    def initialize_runtime(cls, num_threads=INTRA_OP_THREADS):
+        import onnxruntime
+        return onnxruntime
+
+    def __init__(self, path=MODEL_PATHS['onnx'], num_threads=INTRA_OP_THREADS):
+        super().__init__(path)
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = num_threads
+        options.inter_op_num_threads = 1
+        self._session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        model_input = self._session.get_inputs()[0]
+        self._input_name = model_input.name
+        self.capabilities.update(runtime='onnxruntime', dynamic_batch=not isinstance(model_input.shape[0], int),
+                                 threads=num_threads, input_shape=tuple(model_input.shape[1:]))
+
+    def predict(self, batch):
+        return self._session.run(None, {self._input_name: np.asarray(batch, dtype=np.float32)})[0]
+
+    def close(self):
+        self._session = None
+
+
+BACKENDS = {
+    'keras': KerasBackend,
+    'savedmodel': SavedModelBackend,
+    'tflite': TFLiteBackend,
+    'onnx': OnnxBackend
+}
+
+
+def load_backend(name=INFERENCE_BACKEND, path=None, bundle_dir=MODEL_BUNDLE_DIR, **kwargs):
+    """Load the configured backend from a model bundle, or from an explicit artifact path
+
+    Backends loaded from a bundle carry its metadata as .bundle and report
+    the bundle version in their capabilities.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{name}', expected one of {sorted(BACKENDS)}")
+    bundle = None
+    if path is None:
+        bundle = read_bundle(bundle_dir)
+        path = artifact_path(bundle_dir, name)
+        exported = bundle['artifacts'].get(name)
+        if name != 'keras' and exported and exported['source_version'] != bundle['version']:
+            print(f"Warning: {name} artifact was exported from model {exported['source_version']}, "
+                  f"bundle is {bundle['version']}")
+
+    backend = BACKENDS[name](path, **kwargs)
+    backend.bundle = bundle
+    if bundle is not None:
+        backend.capabilities['model_version'] = bundle['version']
+    return backend
+
+
+def export_artifacts(keras_path=MODEL_PATHS['keras'], backends=('savedmodel', 'tflite', 'onnx'), paths=None):
+    """Convert the Keras model into the artifacts the other backends load
+
+    Returns {backend: path} for every artifact written. ONNX export needs
+    tf2onnx and is skipped with a message when it is not installed.
+    """
+    import tensorflow as tf
+    paths = {**MODEL_PATHS, **(paths or {})}
+    model = tf.keras.models.load_model(keras_path)
+    written = {}
+
+    model.export(paths['savedmodel'])
+    if 'savedmodel' in backends:
+        written['savedmodel'] = paths['savedmodel']
+
+    if 'tflite' in backends:
+        converter = tf.lite.TFLiteConverter.from_saved_model(paths['savedmodel'])
+        with open(paths['tflite'], 'wb') as f:
+            f.write(converter.convert())
+        written['tflite'] = paths['tflite']
+
+    if 'onnx' in backends:
+        try:
+            import tf2onnx
+            tf2onnx.convert.from_keras(model, output_path=paths['onnx'])
+            written['onnx'] = paths['onnx']
+        except ImportError:
+            print("tf2onnx is not installed; skipping ONNX export")
+    return written
+
+
+if __name__ == "__main__":
+    written = export_artifacts()
+    record_artifacts(MODEL_BUNDLE_DIR, written)
+    for backend, path in written.items():
+        print(f"Exported {backend} model to {path}")
@@ -0,0 +1,140 @@
+"""
+Shared in-process inference executor
+
+Streamlit runs every session in its own thread. Instead of each one calling
+the model concurrently (and oversubscribing TensorFlow's thread pools), all
+sessions submit batches to one executor thread, which coalesces whatever is
+queued into a single forward pass and hands results back through futures.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+# Executor configuration
+MAX_BATCH_SIZE = 32  # images per coalesced forward pass
+MAX_WAIT_MS = 5  # how long the first request waits for others to join its batch
+INTRA_OP_THREADS = os.cpu_count() or 1  # threads used inside one op (matmul, conv)
+INTER_OP_THREADS = 1  # independent ops run concurrently; one executor thread needs no more
+
+_STOP = object()
+
+
+def configure_tf_threads(intra_op_threads=INTRA_OP_THREADS, inter_op_threads=INTER_OP_THREADS):
+    """Set TensorFlow's thread pool sizes; must run before TensorFlow executes anything"""
+    import tensorflow as tf
+    if (tf.config.threading.get_intra_op_parallelism_threads() == intra_op_threads
+            and tf.config.threading.get_inter_op_parallelism_threads() == inter_op_threads):
+        return True
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+        tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+        return True
+    except RuntimeError as e:
+        print(f"Could not configure TensorFlow threads: {e}")
+        return False
+
+
+class InferenceExecutor:
+    """Single worker thread that batches predictions submitted from any thread"""
+
+    def __init__(self, predict_fn, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.stats = {'requests': 0, 'images': 0, 'batches': 0, 'errors': 0}
+        self._queue = queue.Queue()
+        self._closed = False
+        self._carry = None  # request that did not fit in the previous batch
+        self._thread = threading.Thread(target=self._run, name='inference-executor', daemon=True)
+        self._thread.start()
+
+    def submit(self, batch, method=None):
+        """Queue a (N, H, W, C) batch; returns a Future resolving to (N, num_classes) predictions
+
+        With a method name the future resolves to what that model method returns
+        instead, e.g. (predictions, activation maps) for 'explain' or embeddings
+        for 'embed'; requests are only batched with others for the same method.
+        """
+        if self._closed:
+            raise RuntimeError("Inference executor is closed")
+        future = Future()
+        self._queue.put((np.asarray(batch), future, method))
+        return future
+
+    def predict(self, batch, timeout=None):
+        """Submit a batch and wait for its predictions"""
+        return self.submit(batch).result(timeout)
+
+    def swap(self, predict_fn):
+        """Serve later batches with predict_fn; returns the one it replaces
+
+        The worker reads predict_fn once per batch, so a batch already running
+        finishes on the old model and the next one uses the new model.
+        """
+        previous, self.predict_fn = self.predict_fn, predict_fn
+        return previous
+
+    def close(self):
+        """Finish queued work and stop the worker thread"""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def _collect(self, first):
+        """Gather queued requests behind the first one, up to max_batch_size images"""
+        pending = [first]
+        size = len(first[0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            if size + len(item[0]) > self.max_batch_size or item[2] != first[2]:
+                self._carry = item
+                break
+            pending.append(item)
+            size += len(item[0])
+        return pending
+
+    def _run(self):
+        while True:
+            item = self._carry if self._carry is not None else self._queue.get()
+            self._carry = None
+            if item is _STOP:
+                return
+            method = item[2]
+            pending = [(batch, future) for batch, future, _ in self._collect(item)
+                       if future.set_running_or_notify_cancel()]
+            if not pending:
+                continue
+
+            predict_fn = self.predict_fn
+            try:
+                batch = np.concatenate([batch for batch, _ in pending]) if len(pending) > 1 else pending[0][0]
+                outputs = predict_fn(batch) if method is None else getattr(predict_fn, method)(batch)
+            except Exception as e:
+                self.stats['errors'] += 1
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+
+            self.stats['requests'] += len(pending)
+            self.stats['images'] += len(batch)
+            self.stats['batches'] += 1
+            offset = 0
+            for request, future in pending:
+                future.served_by = predict_fn  # lets callers match results to the model version
+                part = slice(offset, offset + len(request))
+                future.set_result(tuple(output[part] for output in outputs) if isinstance(outputs, tuple)
+                                  else outputs[part])
+                offset += len(request)
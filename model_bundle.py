@@ -0,0 +1,189 @@
+"""
+Versioned, self-describing model bundles
+
+A bundle is a directory holding the model weights next to a bundle.json that
+records everything needed to use them: class order, input spec, pixel
+normalization and a SHA-256 content hash over the weights and that metadata.
+The hash doubles as the model version for caches and logs. Reading a bundle
+only parses JSON, so callers get the metadata without importing TensorFlow.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+
+# Bundle configuration
+MODELS_DIR = 'models'
+MODEL_BUNDLE_DIR = 'models/mango_disease'
+FAST_MODEL_BUNDLE_DIR = 'models/mango_disease_fast'
+DEFAULT_CROP = 'mango'
+FULL_ROLE = 'full'  # the reference model for a crop
+FAST_ROLE = 'fast'  # small first-stage model of a cascade
+BUNDLE_FILE = 'bundle.json'
+BUNDLE_FORMAT = 1
+WEIGHTS_FILE = 'model.h5'
+STAGING_SUFFIX = '.staging'  # sibling directory new weights are written to before they are published
+ARTIFACT_FILES = {
+    'keras': WEIGHTS_FILE,
+    'savedmodel': 'savedmodel',
+    'tflite': 'model.tflite',
+    'onnx': 'model.onnx'
+}
+DEFAULT_INPUT_SIZE = (224, 224)  # (height, width)
+DEFAULT_NORMALIZATION = {'scale': 1.0 / 255, 'offset': 0.0}  # model input = pixel * scale + offset
+
+# Class order of models trained before bundles existed (flow_from_directory sorts folders)
+LEGACY_MODEL_PATH = 'models/mango_disease_model.h5'
+LEGACY_CLASS_MAPPING_PATH = 'models/class_mapping.json'
+LEGACY_CLASS_NAMES = ['Anthracnose', 'Bacterial Canker', 'Cutting Weevil',
+                      'Die Back', 'Gall Midge', 'Healthy', 'Powdery Mildew',
+                      'Sooty Mould']
+
+
+def _hashed_fields(metadata):
+    return {key: metadata[key] for key in ('class_names', 'input', 'normalization', 'weights')}
+
+
+def compute_content_hash(bundle_dir, metadata):
+    """SHA-256 over the weights file and the metadata that changes how it is used"""
+    digest = hashlib.sha256(json.dumps(_hashed_fields(metadata), sort_keys=True).encode('utf-8'))
+    with open(os.path.join(bundle_dir, metadata['weights']), 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def describe_bundle(bundle_dir, class_names, input_size=DEFAULT_INPUT_SIZE, normalization=DEFAULT_NORMALIZATION,
+                    weights=WEIGHTS_FILE, crop=DEFAULT_CROP, role=FULL_ROLE):
+    """Bundle metadata for the weights saved in bundle_dir, without writing bundle.json"""
+    height, width = input_size
+    metadata = {
+        'format': BUNDLE_FORMAT,
+        'crop': crop,
+        'role': role,
+        'class_names': list(class_names),
+        'input': {'height': height, 'width': width, 'channels': 3, 'color_mode': 'RGB',
+                  'dtype': 'float32', 'layout': 'NHWC'},
+        'normalization': dict(normalization),
+        'weights': weights,
+        'artifacts': {},
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    }
+    metadata['content_hash'] = compute_content_hash(bundle_dir, metadata)
+    metadata['version'] = metadata['content_hash'][:12]
+    return metadata
+
+
+def write_bundle(bundle_dir, class_names, input_size=DEFAULT_INPUT_SIZE, normalization=DEFAULT_NORMALIZATION,
+                 weights=WEIGHTS_FILE, crop=DEFAULT_CROP, role=FULL_ROLE):
+    """Describe the weights already saved in bundle_dir and write bundle.json"""
+    metadata = describe_bundle(bundle_dir, class_names, input_size, normalization, weights, crop, role)
+    _write_metadata(bundle_dir, metadata)
+    return metadata
+
+
+def staging_dir(bundle_dir):
+    """Where training writes a bundle's weights until they are published"""
+    return bundle_dir.rstrip('/\\') + STAGING_SUFFIX
+
+
+def publish_bundle(bundle_dir, class_names, **options):
+    """Move weights finished in staging_dir(bundle_dir) into the live bundle, bundle.json last
+
+    Both steps are renames, so the live bundle never holds weights of an
+    unfinished run; a watcher polling between them sees a hash mismatch
+    and retries.
+    """
+    staging = staging_dir(bundle_dir)
+    metadata = describe_bundle(staging, class_names, **options)
+    os.makedirs(bundle_dir, exist_ok=True)
+    os.replace(os.path.join(staging, metadata['weights']), os.path.join(bundle_dir, metadata['weights']))
+    _write_metadata(bundle_dir, metadata)
+    shutil.rmtree(staging, ignore_errors=True)
+    return metadata
+
+
+def _write_metadata(bundle_dir, metadata):
+    # Write-then-rename so a reader never sees a half-written bundle.json
+    path = os.path.join(bundle_dir, BUNDLE_FILE)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2, ensure_ascii=False)
+    os.replace(path + '.tmp', path)
+
+
+def read_bundle(bundle_dir=MODEL_BUNDLE_DIR):
+    """Read bundle metadata (JSON only, no TensorFlow)"""
+    with open(os.path.join(bundle_dir, BUNDLE_FILE), encoding='utf-8') as f:
+        metadata = json.load(f)
+    if metadata.get('format') != BUNDLE_FORMAT:
+        raise ValueError(f"Unsupported model bundle format: {metadata.get('format')}")
+    return metadata
+
+
+def verify_bundle(bundle_dir=MODEL_BUNDLE_DIR):
+    """Check that the weights and metadata still match the recorded content hash"""
+    metadata = read_bundle(bundle_dir)
+    return compute_content_hash(bundle_dir, metadata) == metadata['content_hash']
+
+
+def artifact_path(bundle_dir, backend):
+    """Path of the file a backend loads from this bundle"""
+    return os.path.join(bundle_dir, ARTIFACT_FILES[backend])
+
+
+def annotate_bundle(bundle_dir, **fields):
+    """Add metadata that does not change the model (e.g. calibration) without changing its version"""
+    metadata = read_bundle(bundle_dir)
+    protected = set(_hashed_fields(metadata)) | {'format', 'content_hash', 'version'}
+    if protected & set(fields):
+        raise ValueError(f"Cannot annotate hashed bundle fields: {sorted(protected & set(fields))}")
+    metadata.update(fields)
+    _write_metadata(bundle_dir, metadata)
+    return metadata
+
+
+def record_artifacts(bundle_dir, backends):
+    """Note which derived artifacts were exported from the current weights"""
+    metadata = read_bundle(bundle_dir)
+    for backend in backends:
+        metadata['artifacts'][backend] = {'file': ARTIFACT_FILES[backend], 'source_version': metadata['version']}
+    _write_metadata(bundle_dir, metadata)
+    return metadata
+
+
+def bundle_crop(metadata):
+    """Crop a bundle serves (bundles written before crops were recorded are mango)"""
+    return metadata.get('crop', DEFAULT_CROP)
+
+
+def bundle_role(metadata):
+    """Whether a bundle is a crop's full model or a cascade's fast first stage"""
+    return metadata.get('role', FULL_ROLE)
+
+
+def model_input_size(metadata):
+    """(width, height) expected by the model, in PIL's order for resizing"""
+    return metadata['input']['width'], metadata['input']['height']
+
+
+def bundle_from_legacy_model(model_path=LEGACY_MODEL_PATH, bundle_dir=MODEL_BUNDLE_DIR,
+                             class_mapping_path=LEGACY_CLASS_MAPPING_PATH):
+    """Wrap a pre-bundle .h5 model, taking its class order from class_mapping.json if present"""
+    class_names = LEGACY_CLASS_NAMES
+    if os.path.exists(class_mapping_path):
+        with open(class_mapping_path, encoding='utf-8') as f:
+            class_names = json.load(f)['class_names']
+    os.makedirs(bundle_dir, exist_ok=True)
+    shutil.copyfile(model_path, os.path.join(bundle_dir, WEIGHTS_FILE))
+    return write_bundle(bundle_dir, class_names)
+
+
+if __name__ == "__main__":
+    if not os.path.exists(os.path.join(MODEL_BUNDLE_DIR, BUNDLE_FILE)) and os.path.exists(LEGACY_MODEL_PATH):
+        bundle_from_legacy_model()
+        print(f"Created bundle from {LEGACY_MODEL_PATH}")
+    bundle = read_bundle()
+    print(f"Model bundle {MODEL_BUNDLE_DIR}: version {bundle['version']}, "
+          f"{len(bundle['class_names'])} classes, hash {'OK' if verify_bundle() else 'MISMATCH'}")
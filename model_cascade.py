@@ -0,0 +1,242 @@
+"""
+Confidence-gated model cascade
+
+A small fast model classifies every image first. Its answer is accepted when
+its top probability clears that class's accept threshold; otherwise the image
+escalates to the crop's full model. Serious diseases get two extra guards: a
+stricter accept threshold, and a watch threshold that escalates any image the
+fast model gives even a modest probability of that disease, so a confident
+but wrong "Healthy" cannot hide a canker.
+
+Thresholds are calibrated on the validation set from both models'
+probabilities (see calibrate_thresholds) and stored in the fast model's
+bundle, so tuning them never changes a model version.
+"""
+
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+from model_bundle import FAST_ROLE, FULL_ROLE
+
+# Cascade configuration
+DEFAULT_ACCEPT_THRESHOLD = 0.90  # fast-model confidence needed to skip the full model
+SERIOUS_CLASSES = ('Bacterial Canker', 'Die Back')  # recall matters more than latency here
+SERIOUS_ACCEPT_THRESHOLD = 0.98
+DEFAULT_WATCH_THRESHOLD = 0.10  # escalate if a serious class gets at least this probability
+TARGET_PRECISION = 0.98  # calibration: accepted fast answers must be this accurate per class
+SERIOUS_TARGET_PRECISION = 1.0
+MIN_WATCH_THRESHOLD = 0.01
+NEVER_ACCEPT = 1.01  # above any probability: always escalate this class
+
+
+def default_thresholds(class_names):
+    """Uncalibrated thresholds: strict for serious diseases, DEFAULT_ACCEPT_THRESHOLD otherwise"""
+    accept = {name: SERIOUS_ACCEPT_THRESHOLD if name in SERIOUS_CLASSES else DEFAULT_ACCEPT_THRESHOLD
+              for name in class_names}
+    watch = {name: DEFAULT_WATCH_THRESHOLD for name in class_names if name in SERIOUS_CLASSES}
+    return {'accept': accept, 'watch': watch}
+
+
+def escalation_mask(fast_probs, class_names, thresholds):
+    """True for images the full model must classify"""
+    fast_probs = np.asarray(fast_probs)
+    accept = np.array([thresholds['accept'].get(name, DEFAULT_ACCEPT_THRESHOLD) for name in class_names])
+    predicted = fast_probs.argmax(axis=1)
+    escalate = fast_probs.max(axis=1) < accept[predicted]
+    for name, threshold in thresholds['watch'].items():
+        if name in class_names:
+            index = class_names.index(name)
+            escalate |= (fast_probs[:, index] >= threshold) & (predicted != index)
+    return escalate
+
+
+def calibrate_thresholds(fast_probs, labels, class_names, target_precision=TARGET_PRECISION,
+                         serious_target_precision=SERIOUS_TARGET_PRECISION):
+    """Per-class thresholds from validation probabilities of the fast model
+
+    A class's accept threshold is the lowest confidence at which the fast
+    model's answers for that class still reach the target precision. A
+    serious class's watch threshold is set just below the probability the
+    fast model gave every image of that class it would otherwise have
+    accepted under a wrong label, so all of them escalate.
+    """
+    fast_probs, labels = np.asarray(fast_probs), np.asarray(labels)
+    predicted = fast_probs.argmax(axis=1)
+    confidence = fast_probs.max(axis=1)
+    accept = {}
+    for index, name in enumerate(class_names):
+        target = serious_target_precision if name in SERIOUS_CLASSES else target_precision
+        mine = np.flatnonzero(predicted == index)
+        order = mine[np.argsort(-confidence[mine], kind='stable')]
+        precision = np.cumsum(labels[order] == index) / np.arange(1, len(order) + 1)
+        ok = np.flatnonzero(precision >= target)
+        accept[name] = float(confidence[order[ok[-1]]]) if len(ok) else NEVER_ACCEPT
+
+    thresholds = {'accept': accept, 'watch': {}}
+    for name in SERIOUS_CLASSES:
+        if name not in class_names:
+            continue
+        index = class_names.index(name)
+        thresholds['watch'][name] = DEFAULT_WATCH_THRESHOLD
+        lost = ((labels == index) & (predicted != index)
+                & ~escalation_mask(fast_probs, class_names, thresholds))
+        if lost.any():
+            thresholds['watch'][name] = max(MIN_WATCH_THRESHOLD, float(fast_probs[lost, index].min()) * 0.9)
+    return thresholds
+
+
+def evaluate_cascade(fast_probs, full_probs, labels, class_names, thresholds, fast_ms=None, full_ms=None):
+    """Accuracy, per-class recall and routing of the cascade against the full model alone
+
+    fast_ms and full_ms are per-image latencies; when given, the report
+    includes the expected cascade latency.
+    """
+    fast_probs, full_probs, labels = np.asarray(fast_probs), np.asarray(full_probs), np.asarray(labels)
+    escalate = escalation_mask(fast_probs, class_names, thresholds)
+    full_pred = full_probs.argmax(axis=1)
+    cascade_pred = np.where(escalate, full_pred, fast_probs.argmax(axis=1))
+    report = {
+        'images': len(labels),
+        'fast_share': float(1 - escalate.mean()),
+        'accuracy': float((cascade_pred == labels).mean()),
+        'full_accuracy': float((full_pred == labels).mean()),
+        'fast_accuracy': float((fast_probs.argmax(axis=1) == labels).mean()),
+        'recall': {}
+    }
+    for index, name in enumerate(class_names):
+        mine = labels == index
+        if mine.any():
+            report['recall'][name] = {'cascade': float((cascade_pred[mine] == index).mean()),
+                                      'full': float((full_pred[mine] == index).mean()),
+                                      'escalated': float(escalate[mine].mean())}
+    if fast_ms is not None and full_ms is not None:
+        report['latency_ms'] = fast_ms + escalate.mean() * full_ms
+        report['full_latency_ms'] = full_ms
+    return report
+
+
+def compatible(fast_bundle, full_bundle):
+    """The fast model can stand in for the full one only if they read and label images the same way"""
+    return all(fast_bundle[key] == full_bundle[key] for key in ('class_names', 'input', 'normalization'))
+
+
+class ModelCascade:
+    """Route batches through a crop's fast model and escalate unsure images to its full model"""
+
+    def __init__(self, registry, thresholds=None):
+        self.registry = registry
+        self.thresholds = thresholds  # overrides the calibration stored in the fast bundle
+        self.stats = {'images': 0, 'fast': 0, 'full': 0, 'fast_ms': 0.0, 'full_ms': 0.0,
+                      'escalated_by_class': Counter()}
+        self._lock = threading.Lock()
+
+    def has_fast_model(self, crop):
+        return bool(self.registry.versions(crop, FAST_ROLE))
+
+    def predict(self, crop, batch):
+        """(predictions, class_names, stages) where stages[i] is 'fast' or 'full'"""
+        if not self.has_fast_model(crop):
+            return self._predict_full(crop, batch, len(batch))
+
+        start = time.perf_counter()
+        fast_future = self.registry.submit(crop, batch, role=FAST_ROLE)
+        fast_probs = fast_future.result()
+        fast_ms = (time.perf_counter() - start) * 1000
+        fast_bundle = fast_future.served_by.bundle
+        full_bundle = self.registry.get(crop).current.bundle
+        if not compatible(fast_bundle, full_bundle):
+            print(f"Fast model {fast_bundle['version']} does not match full model {full_bundle['version']}; "
+                  f"skipping the cascade")
+            return self._predict_full(crop, batch, len(batch))
+
+        class_names = fast_bundle['class_names']
+        thresholds = self.thresholds or fast_bundle.get('cascade') or default_thresholds(class_names)
+        escalate = escalation_mask(fast_probs, class_names, thresholds)
+        predictions = np.array(fast_probs, copy=True)
+        stages = np.where(escalate, FULL_ROLE, FAST_ROLE)
+        full_ms = 0.0
+        if escalate.any():
+            start = time.perf_counter()
+            full_future = self.registry.submit(crop, np.asarray(batch)[escalate])
+            predictions[escalate] = full_future.result()
+            full_ms = (time.perf_counter() - start) * 1000
+            if full_future.served_by.bundle['class_names'] != class_names:
+                # The full model was hot-swapped to a different class order mid-request
+                return self._predict_full(crop, batch, len(batch))
+
+        with self._lock:
+            self.stats['images'] += len(batch)
+            self.stats['fast'] += int((~escalate).sum())
+            self.stats['full'] += int(escalate.sum())
+            self.stats['fast_ms'] += fast_ms
+            self.stats['full_ms'] += full_ms
+            self.stats['escalated_by_class'].update(class_names[i] for i in fast_probs[escalate].argmax(axis=1))
+        return predictions, class_names, list(stages)
+
+    def _predict_full(self, crop, batch, count):
+        start = time.perf_counter()
+        future = self.registry.submit(crop, batch)
+        predictions = future.result()
+        with self._lock:
+            self.stats['images'] += count
+            self.stats['full'] += count
+            self.stats['full_ms'] += (time.perf_counter() - start) * 1000
+        return predictions, future.served_by.bundle['class_names'], [FULL_ROLE] * count
+
+    def routing_report(self):
+        """Share of images each stage answered and the time spent in each"""
+        with self._lock:
+            stats = dict(self.stats, escalated_by_class=dict(self.stats['escalated_by_class']))
+        images = stats['images'] or 1
+        stats['fast_share'] = stats['fast'] / images
+        stats['ms_per_image'] = (stats['fast_ms'] + stats['full_ms']) / images
+        return stats
+
+
+def print_report(report, class_names):
+    print(f"Validation images: {report['images']}")
+    print(f"Answered by fast model: {report['fast_share']:.1%}")
+    print(f"Accuracy: cascade {report['accuracy']:.2%}, full model {report['full_accuracy']:.2%}, "
+          f"fast model {report['fast_accuracy']:.2%}")
+    if 'latency_ms' in report:
+        print(f"Latency per image: cascade {report['latency_ms']:.1f} ms, "
+              f"full model {report['full_latency_ms']:.1f} ms")
+    for name in class_names:
+        if name in report['recall']:
+            recall = report['recall'][name]
+            print(f"  {name:<18} recall cascade {recall['cascade']:.2%} / full {recall['full']:.2%}, "
+                  f"escalated {recall['escalated']:.0%}")
+
+
+if __name__ == "__main__":
+    # Calibrate the fast model against the full one on the validation split and store the thresholds
+    from inference_backends import load_backend
+    from model_bundle import FAST_MODEL_BUNDLE_DIR, MODEL_BUNDLE_DIR, annotate_bundle
+    from train_model import DATASET_PATH, create_data_generators
+
+    _, val_gen = create_data_generators(DATASET_PATH)
+    class_names = list(val_gen.class_indices.keys())
+    fast, full = load_backend(bundle_dir=FAST_MODEL_BUNDLE_DIR), load_backend(bundle_dir=MODEL_BUNDLE_DIR)
+    if not compatible(fast.bundle, full.bundle) or fast.bundle['class_names'] != class_names:
+        raise SystemExit("Fast and full model bundles must share class order, input spec and normalization")
+
+    fast_probs, full_probs, timings = [], [], {'fast': 0.0, 'full': 0.0}
+    for i in range(len(val_gen)):
+        images, _ = val_gen[i]
+        for name, backend, outputs in (('fast', fast, fast_probs), ('full', full, full_probs)):
+            start = time.perf_counter()
+            outputs.append(backend.predict(images))
+            timings[name] += time.perf_counter() - start
+    fast_probs, full_probs = np.concatenate(fast_probs), np.concatenate(full_probs)
+    labels = val_gen.classes
+
+    thresholds = calibrate_thresholds(fast_probs, labels, class_names)
+    report = evaluate_cascade(fast_probs, full_probs, labels, class_names, thresholds,
+                              fast_ms=timings['fast'] * 1000 / len(labels),
+                              full_ms=timings['full'] * 1000 / len(labels))
+    print_report(report, class_names)
+    annotate_bundle(FAST_MODEL_BUNDLE_DIR, cascade=thresholds)
+    print(f"Saved thresholds to {FAST_MODEL_BUNDLE_DIR}: {thresholds}")
@@ -0,0 +1,249 @@
+"""
+Multi-model registry with memory-budgeted LRU eviction
+
+Every bundle directory under models/ is one (crop, version). Models are
+loaded lazily on first use, each behind its own inference executor and hot
+reloader. The registry records how much resident memory each load added and,
+when the total goes over the budget, closes the least recently used models.
+Concurrent first requests for the same model share a single load.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from inference_backends import BACKENDS, INFERENCE_BACKEND, load_backend
+from inference_executor import InferenceExecutor
+from model_bundle import BUNDLE_FILE, DEFAULT_CROP, FULL_ROLE, MODELS_DIR, bundle_crop, bundle_role, read_bundle
+from model_reloader import ModelReloader
+
+# Registry configuration
+MODEL_MEMORY_BUDGET_MB = int(os.environ.get('AGRILEAF_MODEL_MEMORY_MB', 1024))
+CATALOG_REFRESH_SECONDS = 30
+
+
+def resident_memory_bytes():
+    """Current resident set size of this process, or None where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def estimate_model_bytes(backend):
+    """Lower bound on a model's memory: its weights, or its artifact size on disk"""
+    model = getattr(backend, 'model', None)
+    if model is not None and hasattr(model, 'weights'):
+        return int(sum(np.prod(w.shape) * np.dtype(getattr(w.dtype, 'as_numpy_dtype', w.dtype)).itemsize
+                       for w in model.weights))
+    path = getattr(backend, 'path', None)
+    if path is None or not os.path.exists(path):
+        return 0
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+class _InFlightLoad:
+    """A model load that concurrent callers wait on"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class ModelRegistry:
+    """Lazily loaded models keyed by bundle directory, evicted LRU under a memory budget"""
+
+    def __init__(self, models_dir=MODELS_DIR, memory_budget_mb=MODEL_MEMORY_BUDGET_MB, backend=INFERENCE_BACKEND,
+                 loader=None, watch=True, on_change=None):
+        self.models_dir = models_dir
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self.backend = backend
+        self.loader = loader or (lambda bundle_dir: load_backend(backend, bundle_dir=bundle_dir))
+        self.watch = watch  # start a hot-reload watcher per loaded model
+        self.on_change = on_change  # called after a model is loaded, swapped or evicted
+        self.stats = {'hits': 0, 'loads': 0, 'coalesced': 0, 'evictions': 0}
+        self._catalog = {}
+        self._catalog_time = 0.0
+        self._entries = OrderedDict()  # bundle_dir -> ModelReloader, least recently used first
+        self._inflight = {}
+        # The runtime's own memory (hundreds of MB for TensorFlow) is shared, not a model's
+        self._runtime_ready = loader is not None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()  # one load at a time keeps memory deltas attributable
+
+    def refresh(self):
+        """Rescan models_dir for bundles; returns {bundle_dir: metadata}"""
+        catalog = {}
+        if os.path.isdir(self.models_dir):
+            for name in sorted(os.listdir(self.models_dir)):
+                bundle_dir = os.path.join(self.models_dir, name)
+                if os.path.exists(os.path.join(bundle_dir, BUNDLE_FILE)):
+                    try:
+                        catalog[bundle_dir] = read_bundle(bundle_dir)
+                    except (OSError, ValueError) as e:
+                        print(f"Skipping model bundle {bundle_dir}: {e}")
+        with self._lock:
+            self._catalog = catalog
+            self._catalog_time = time.monotonic()
+        return catalog
+
+    def _get_catalog(self):
+        if time.monotonic() - self._catalog_time > CATALOG_REFRESH_SECONDS:
+            self.refresh()
+        return self._catalog
+
+    def crops(self):
+        """Crops with at least one full model bundle"""
+        return sorted({bundle_crop(metadata) for metadata in self._get_catalog().values()
+                       if bundle_role(metadata) == FULL_ROLE})
+
+    def versions(self, crop, role=FULL_ROLE):
+        """(version, bundle_dir) pairs for a crop's models in one role, newest first"""
+        bundles = [(metadata['created_at'], bundle_dir, metadata['version'])
+                   for bundle_dir, metadata in self._get_catalog().items()
+                   if bundle_crop(metadata) == crop and bundle_role(metadata) == role]
+        return [(version, bundle_dir) for _, bundle_dir, version in sorted(bundles, reverse=True)]
+
+    def resolve(self, crop=DEFAULT_CROP, version=None, role=FULL_ROLE):
+        """Bundle directory for a crop's newest model, or for a specific version"""
+        for candidate, bundle_dir in self.versions(crop, role):
+            if version is None or candidate == version:
+                return bundle_dir
+        raise KeyError(f"No {role} model for crop '{crop}'" + (f" version {version}" if version else ""))
+
+    def get(self, crop=DEFAULT_CROP, version=None, role=FULL_ROLE):
+        """Model server (executor plus hot reloader) for a crop, loading it on first use"""
+        bundle_dir = self.resolve(crop, version, role)
+        with self._lock:
+            entry = self._entries.get(bundle_dir)
+            if entry is not None:
+                self._entries.move_to_end(bundle_dir)
+                self.stats['hits'] += 1
+                return entry
+            call = self._inflight.get(bundle_dir)
+            leader = call is None
+            if leader:
+                call = self._inflight[bundle_dir] = _InFlightLoad()
+            else:
+                self.stats['coalesced'] += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            backend = self._load_backend(bundle_dir)
+            executor = InferenceExecutor(backend)
+            entry = ModelReloader(executor, bundle_dir, loader=self._load_backend,
+                                  on_swap=lambda replaced: self._swapped(bundle_dir, replaced))
+            if self.watch:
+                entry.start()
+            with self._lock:
+                self._entries[bundle_dir] = entry
+                self.stats['loads'] += 1
+            call.result = entry
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(bundle_dir, None)
+            call.event.set()
+
+        self._notify(backend)
+        self._evict_over_budget(keep=bundle_dir)
+        return entry
+
+    def submit(self, crop, batch, version=None, role=FULL_ROLE, method=None):
+        """Queue a batch on a crop's model; returns a Future like InferenceExecutor.submit"""
+        try:
+            return self.get(crop, version, role).executor.submit(batch, method)
+        except RuntimeError:
+            # The model was evicted between lookup and submit; load it again
+            return self.get(crop, version, role).executor.submit(batch, method)
+
+    def _load_backend(self, bundle_dir):
+        with self._load_lock:
+            if not self._runtime_ready:
+                BACKENDS[self.backend].initialize_runtime()
+                self._runtime_ready = True
+            before = resident_memory_bytes()
+            backend = self.loader(bundle_dir)
+            after = resident_memory_bytes()
+        measured = after - before if before is not None and after is not None else 0
+        # Backends that know their footprint may declare it up front
+        backend.resident_bytes = max(measured, getattr(backend, 'resident_bytes', 0), estimate_model_bytes(backend))
+        print(f"Loaded model {bundle_dir} version {backend.bundle['version']} "
+              f"({backend.resident_bytes / 2 ** 20:.0f} MB)")
+        return backend
+
+    @staticmethod
+    def _release(entry):
+        # Stop the watcher, let the running batch finish, then free every version the entry holds
+        entry.stop()
+        entry.executor.close()
+        for backend in (entry.current, entry.previous):
+            if backend is not None and hasattr(backend, 'close'):
+                backend.close()
+
+    @staticmethod
+    def _entry_bytes(entry):
+        return sum(getattr(backend, 'resident_bytes', 0) for backend in (entry.current, entry.previous)
+                   if backend is not None)
+
+    def resident_bytes(self):
+        """Memory attributed to all loaded models, including versions kept for rollback"""
+        return sum(self.loaded().values())
+
+    def loaded(self):
+        """{bundle_dir: resident bytes} for loaded models, least recently used first"""
+        with self._lock:
+            return {bundle_dir: self._entry_bytes(entry) for bundle_dir, entry in self._entries.items()}
+
+    def _evict_over_budget(self, keep=None):
+        evicted = []
+        with self._lock:
+            total = sum(self._entry_bytes(entry) for entry in self._entries.values())
+            for bundle_dir in list(self._entries):
+                if total <= self.memory_budget:
+                    break
+                if bundle_dir == keep:
+                    continue
+                entry = self._entries.pop(bundle_dir)
+                total -= self._entry_bytes(entry)
+                evicted.append((bundle_dir, entry))
+                self.stats['evictions'] += 1
+            if total > self.memory_budget:
+                print(f"Loaded models use {total / 2 ** 20:.0f} MB, over the {self.memory_budget / 2 ** 20:.0f} MB budget")
+
+        # Closing waits for the model's running batch, so do it outside the lock
+        for bundle_dir, entry in evicted:
+            self._release(entry)
+            print(f"Evicted model {bundle_dir} ({self._entry_bytes(entry) / 2 ** 20:.0f} MB)")
+        if evicted:
+            self._notify(None)
+
+    def _swapped(self, bundle_dir, replaced):
+        # The swapped model now holds two versions; make room elsewhere, never by evicting it
+        self._notify(replaced)
+        self._evict_over_budget(keep=bundle_dir)
+
+    def _notify(self, backend):
+        if self.on_change is not None:
+            self.on_change(backend)
+
+    def close(self):
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            self._release(entry)
@@ -0,0 +1,121 @@
+"""
+Zero-downtime model hot reload
+
+A watcher thread polls the model bundle. When bundle.json announces a new
+version, the watcher verifies the content hash, loads the new model and warms
+it up off the inference thread, then swaps it into the executor between
+batches. The version it replaces stays loaded, so a batch already running
+finishes on it and rollback() is instant.
+
+To deploy, copy the new weights into the bundle directory and write
+bundle.json last (publish_bundle does this). The watcher skips a bundle whose
+hash does not match, e.g. one that is still being copied, and retries on
+the next poll.
+"""
+
+import threading
+
+import numpy as np
+
+from inference_backends import load_backend
+from model_bundle import MODEL_BUNDLE_DIR, read_bundle, verify_bundle
+
+# Reload configuration
+MODEL_POLL_SECONDS = 5.0
+WARMUP_BATCH_SIZES = (1,)  # batch shapes to run once before a new model takes traffic
+
+
+def warm_up(backend, batch_sizes=WARMUP_BATCH_SIZES):
+    """Run dummy batches so the first real request does not pay one-time setup costs"""
+    spec = backend.bundle['input']
+    for batch_size in batch_sizes:
+        backend.predict(np.zeros((batch_size, spec['height'], spec['width'], spec['channels']), dtype=np.float32))
+
+
+class ModelReloader:
+    """Watch a model bundle and hot-swap new versions into an inference executor"""
+
+    def __init__(self, executor, bundle_dir=MODEL_BUNDLE_DIR, loader=None, poll_interval=MODEL_POLL_SECONDS,
+                 on_swap=None):
+        self.executor = executor
+        self.bundle_dir = bundle_dir
+        self.loader = loader or (lambda directory: load_backend(bundle_dir=directory))
+        self.poll_interval = poll_interval
+        self.on_swap = on_swap  # called with the replaced model after every swap
+        self.previous = None
+        self.stats = {'reloads': 0, 'rollbacks': 0, 'failures': 0, 'last_error': None}
+        self._skip_version = None  # a version that failed to load or was rolled back
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def current(self):
+        return self.executor.predict_fn
+
+    @property
+    def version(self):
+        return self.current.bundle['version']
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name='model-reloader', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            self.check()
+
+    def check(self):
+        """Load and swap in the bundle's version if it is new; returns True if a swap happened"""
+        try:
+            version = read_bundle(self.bundle_dir)['version']
+            if version == self.version or version == self._skip_version:
+                return False
+            if not verify_bundle(self.bundle_dir):
+                self.stats['last_error'] = f"Model bundle {version} does not match its content hash yet"
+                return False
+        except (OSError, ValueError) as e:
+            # Missing or half-copied bundle: keep serving and look again next poll
+            self.stats['last_error'] = str(e)
+            return False
+
+        try:
+            backend = self.loader(self.bundle_dir)
+            warm_up(backend)
+        except Exception as e:
+            print(f"Error loading model {version}: {e}")
+            self.stats['failures'] += 1
+            self.stats['last_error'] = str(e)
+            self._skip_version = version
+            return False
+
+        self._swap(backend)
+        self.stats['reloads'] += 1
+        print(f"Swapped in model {version}")
+        return True
+
+    def rollback(self):
+        """Serve the previously loaded version again; returns False if there is none"""
+        with self._lock:
+            if self.previous is None:
+                return False
+            # Don't let the watcher reload the version we just backed out of
+            self._skip_version = self.version
+            self._swap(self.previous)
+        self.stats['rollbacks'] += 1
+        print(f"Rolled back to model {self.version}")
+        return True
+
+    def _swap(self, backend):
+        with self._lock:
+            self.previous = self.executor.swap(backend)
+        if self.on_swap is not None:
+            self.on_swap(self.previous)
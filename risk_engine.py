@@ -0,0 +1,181 @@
+"""
+Vectorized disease-risk engine over forecast time series
+
+Evaluates every DISEASE_RISK_THRESHOLDS rule for every disease, location and
+forecast step in one pass of NumPy array operations. Results stay language
+neutral; translation only happens in render_risk_timeline.
+"""
+
+import numpy as np
+
+from multilingual_support import translate_text
+from weather_alerts import DISEASE_RISK_THRESHOLDS, get_forecast_data
+
+# Engine configuration
+FORECAST_STEP_HOURS = 3
+HIGH_HUMIDITY = 80  # % relative humidity counted towards leaf-wetness hours
+RAINFALL_WINDOW_HOURS = 24
+
+# Factor order along the last axis of timeline['factors']
+RISK_FACTORS = ['Temperature favorable', 'High humidity', 'Recent rainfall']
+
+RECOMMENDATIONS = [
+    'Low risk conditions. Continue regular monitoring.',
+    'Moderate risk. Monitor plants closely and take preventive measures.',
+    'High risk conditions detected. Consider preventive fungicide application.'
+]
+
+
+def build_threshold_arrays(thresholds=DISEASE_RISK_THRESHOLDS):
+    """Convert the threshold table into per-disease arrays
+
+    Missing rules become NaN bounds, which never match, so a disease without
+    a rainfall rule can never gain the rainfall factor.
+    """
+    diseases = list(thresholds)
+    nan = np.nan
+    temp_min = np.array([thresholds[d].get('temperature_range', (nan, nan))[0] for d in diseases], dtype=np.float32)
+    temp_max = np.array([thresholds[d].get('temperature_range', (nan, nan))[1] for d in diseases], dtype=np.float32)
+    humidity_min = np.array([thresholds[d].get('humidity_min', nan) for d in diseases], dtype=np.float32)
+    rainfall_min = np.array([thresholds[d].get('rainfall_min', nan) for d in diseases], dtype=np.float32)
+    return {
+        'diseases': diseases,
+        'risk_levels': [thresholds[d].get('risk_level', 'Low') for d in diseases],
+        'temp_min': temp_min,
+        'temp_max': temp_max,
+        'humidity_min': humidity_min,
+        'rainfall_min': rainfall_min
+    }
+
+
+def consecutive_run_hours(mask, step_hours=FORECAST_STEP_HOURS):
+    """Length in hours of the run of True values ending at each step, along the last axis"""
+    mask = np.asarray(mask, dtype=bool)
+    steps = np.arange(mask.shape[-1])
+    last_break = np.where(mask, -1, steps)
+    last_break = np.maximum.accumulate(last_break, axis=-1)
+    return (steps - last_break) * mask * step_hours
+
+
+def rolling_sum(values, window_steps):
+    """Trailing sum over window_steps along the last axis, NaN treated as zero"""
+    values = np.nan_to_num(np.asarray(values, dtype=np.float64))
+    csum = np.cumsum(values, axis=-1)
+    shifted = np.zeros_like(csum)
+    if window_steps < values.shape[-1]:
+        shifted[..., window_steps:] = csum[..., :-window_steps]
+    return csum - shifted
+
+
+def evaluate_risk(temperature, humidity, rainfall, thresholds=DISEASE_RISK_THRESHOLDS,
+                  step_hours=FORECAST_STEP_HOURS):
+    """Evaluate all disease rules over (locations, steps) weather arrays
+
+    Returns a language-neutral timeline dict whose per-disease arrays are
+    shaped (diseases, locations, steps).
+    """
+    temperature = np.atleast_2d(np.asarray(temperature, dtype=np.float32))
+    humidity = np.atleast_2d(np.asarray(humidity, dtype=np.float32))
+    rainfall = np.atleast_2d(np.asarray(rainfall, dtype=np.float32))
+    rules = build_threshold_arrays(thresholds)
+
+    # Broadcast (D, 1, 1) rules against (1, L, T) weather
+    def col(values):
+        return values[:, None, None]
+
+    temp = temperature[None]
+    with np.errstate(invalid='ignore'):
+        factors = np.stack([
+            (temp >= col(rules['temp_min'])) & (temp <= col(rules['temp_max'])),
+            humidity[None] >= col(rules['humidity_min']),
+            rainfall[None] >= col(rules['rainfall_min'])
+        ], axis=-1)
+        high_humidity = humidity >= HIGH_HUMIDITY
+
+    factor_count = factors.sum(axis=-1, dtype=np.int8)
+    window_steps = max(1, RAINFALL_WINDOW_HOURS // step_hours)
+
+    return {
+        'diseases': rules['diseases'],
+        'risk_levels': rules['risk_levels'],
+        'factors': factors,
+        'factor_count': factor_count,
+        'recommendation_index': np.minimum(factor_count, 2),
+        'humid_hours': consecutive_run_hours(high_humidity, step_hours),
+        'rain_window': rolling_sum(rainfall, window_steps),
+        'step_hours': step_hours
+    }
+
+
+def forecast_to_arrays(forecasts):
+    """Stack get_forecast_data results into (locations, steps) arrays
+
+    forecasts maps location -> list of forecast entries; shorter series are
+    padded with NaN so they never trigger a rule.
+    """
+    locations = list(forecasts)
+    steps = max((len(series or []) for series in forecasts.values()), default=0)
+    shape = (len(locations), steps)
+    temperature = np.full(shape, np.nan, dtype=np.float32)
+    humidity = np.full(shape, np.nan, dtype=np.float32)
+    rainfall = np.full(shape, np.nan, dtype=np.float32)
+    times = np.full(shape, np.datetime64('NaT'), dtype='datetime64[s]')
+
+    for i, location in enumerate(locations):
+        series = forecasts[location] or []
+        n = len(series)
+        if not n:
+            continue
+        temperature[i, :n] = [item['temperature'] for item in series]
+        humidity[i, :n] = [item['humidity'] for item in series]
+        rainfall[i, :n] = [item['rainfall'] for item in series]
+        times[i, :n] = [np.datetime64(item['date'], 's') for item in series]
+
+    return locations, times, temperature, humidity, rainfall
+
+
+def get_forecast_risk_timeline(locations, days=3):
+    """Fetch forecasts for locations and evaluate the full risk timeline"""
+    forecasts = {location: get_forecast_data(location, days) for location in locations}
+    locations, times, temperature, humidity, rainfall = forecast_to_arrays(forecasts)
+    timeline = evaluate_risk(temperature, humidity, rainfall)
+    timeline['locations'] = locations
+    timeline['times'] = times
+    return timeline
+
+
+def render_risk_timeline(timeline, language_code='en'):
+    """Summarize a timeline per location and disease, translating only the final strings"""
+    translations = {}
+
+    def tr(text):
+        if text not in translations:
+            translations[text] = translate_text(text, language_code)
+        return translations[text]
+
+    factor_count = timeline['factor_count']
+    peak_step = factor_count.argmax(axis=-1)
+    peak_count = factor_count.max(axis=-1)
+    max_humid_hours = timeline['humid_hours'].max(axis=-1)
+    max_rain_window = timeline['rain_window'].max(axis=-1)
+    times = timeline.get('times')
+
+    rendered = {}
+    for l, location in enumerate(timeline.get('locations', range(factor_count.shape[1]))):
+        per_disease = {}
+        for d, disease in enumerate(timeline['diseases']):
+            step = int(peak_step[d, l])
+            count = int(peak_count[d, l])
+            per_disease[disease] = {
+                'risk_level': tr(timeline['risk_levels'][d]),
+                'peak_factors': count,
+                'peak_time': times[l, step].astype(object) if times is not None else step,
+                'risk_factors': [tr(name) for name, hit in zip(RISK_FACTORS, timeline['factors'][d, l, step]) if hit],
+                'recommendation': tr(RECOMMENDATIONS[min(count, 2)])
+            }
+        rendered[location] = {
+            'max_humid_hours': int(max_humid_hours[l]),
+            'max_rain_window': float(max_rain_window[l]),
+            'diseases': per_disease
+        }
+    return rendered
@@ -0,0 +1,140 @@
+"""
+Weather-informed prior reweighting of classifier probabilities
+
+The classifier sees only the leaf; the rules in weather_alerts say which
+diseases the current local conditions favour. Fusion reads the softmax as
+a posterior under the training class balance and changes the prior with
+Bayes' rule:
+
+    p(c | leaf, weather) ∝ p(c | leaf) * r_c(weather)
+
+r_c is 1 for classes without weather rules and rises to MAX_PRIOR_RATIO as
+more of a disease's favourable factors are met, scaled by its risk level.
+Lesions outlast the weather that caused them, so unfavourable weather never
+pushes a class below 1. Confident predictions barely move; ambiguous ones
+between a favoured and an unfavoured disease do.
+
+Priors are cached per location, and fusion is one broadcast multiply and
+renormalization, for a single probability vector or a whole batch.
+"""
+
+import time
+
+import numpy as np
+
+from geocoding import CellCache
+from weather_alerts import DISEASE_RISK_THRESHOLDS, calculate_disease_risk, get_weather_risk
+from weather_client import normalize_location
+
+# Weather fusion configuration
+MAX_PRIOR_RATIO = 2.0  # likelihood ratio when every factor of a 'Very High' risk disease is met
+RISK_LEVEL_WEIGHTS = {'Low': 0.25, 'Moderate': 0.5, 'High': 0.75, 'Very High': 1.0}
+RISK_FACTOR_KEYS = ('temperature_range', 'humidity_min', 'rainfall_min')  # the factors calculate_disease_risk checks
+PRIOR_CACHE_TTL = 1800  # seconds; weather changes slowly next to how often photos are analyzed
+
+# Conditions for the validation report: photos in the dataset carry no weather of their own
+WEATHER_SCENARIOS = {
+    'Dry and cool': {'temperature': 15.0, 'humidity': 35, 'rainfall': 0.0},
+    'Mild and dry': {'temperature': 22.0, 'humidity': 55, 'rainfall': 0.0},
+    'Warm and wet': {'temperature': 27.0, 'humidity': 85, 'rainfall': 12.0},
+}
+
+_prior_cache = CellCache(ttl=PRIOR_CACHE_TTL)
+
+
+def factor_share(risk, disease_name):
+    """Share of a disease's weather factors that calculate_disease_risk found favourable"""
+    checked = sum(key in DISEASE_RISK_THRESHOLDS[disease_name] for key in RISK_FACTOR_KEYS)
+    return min(1.0, len(risk.get('risk_factors', [])) / checked) if checked else 0.0
+
+
+def weather_priors(all_risks, class_names, max_ratio=MAX_PRIOR_RATIO):
+    """(C,) likelihood ratios from {disease: calculate_disease_risk(...)} for the model's class order"""
+    priors = np.ones(len(class_names), dtype=np.float32)
+    for i, name in enumerate(class_names):
+        if name in all_risks and name in DISEASE_RISK_THRESHOLDS:
+            # Risk levels are read from the rules, since the risk maps hold translated labels
+            weight = RISK_LEVEL_WEIGHTS.get(DISEASE_RISK_THRESHOLDS[name].get('risk_level', 'Low'), 0.0)
+            priors[i] = max_ratio ** (weight * factor_share(all_risks[name], name))
+    return priors
+
+
+def priors_from_weather(weather_data, class_names, max_ratio=MAX_PRIOR_RATIO):
+    """Likelihood ratios for one weather snapshot ({'temperature', 'humidity', 'rainfall'})"""
+    all_risks = {name: calculate_disease_risk(weather_data, name) for name in class_names
+                 if name in DISEASE_RISK_THRESHOLDS}
+    return weather_priors(all_risks, class_names, max_ratio)
+
+
+def location_priors(location, class_names):
+    """Cached likelihood ratios for a location's current weather, or None if it cannot be fetched"""
+    key = (normalize_location(location), tuple(class_names))
+    priors = _prior_cache.get(key)
+    if priors is None:
+        risk = get_weather_risk(location)
+        if risk is None:
+            return None
+        priors = weather_priors(risk['all_risks'], class_names)
+        priors.setflags(write=False)
+        _prior_cache.put(key, priors)
+    return priors
+
+
+def fuse_predictions(predictions, priors):
+    """Reweight (C,) or (N, C) probabilities by (C,) or (N, C) priors and renormalize"""
+    fused = np.multiply(predictions, priors, dtype=np.float32)
+    fused /= np.maximum(fused.sum(axis=-1, keepdims=True), np.finfo(np.float32).tiny)
+    return fused
+
+
+def evaluate_fusion(predictions, labels, class_names, scenarios=WEATHER_SCENARIOS, max_ratio=MAX_PRIOR_RATIO):
+    """Accuracy with and without weather priors under each weather scenario
+
+    Each scenario is applied to every validation image: 'accuracy' is the
+    effect when the weather says nothing about most leaves, 'favoured' the
+    recall of the diseases the weather favours, before and after.
+    """
+    predictions, labels = np.asarray(predictions, dtype=np.float32), np.asarray(labels)
+    base = predictions.argmax(axis=1)
+    report = {'images': len(labels), 'accuracy': float((base == labels).mean()), 'scenarios': {}}
+    for name, weather_data in scenarios.items():
+        priors = priors_from_weather(weather_data, class_names, max_ratio)
+        begin = time.perf_counter()
+        fused = fuse_predictions(predictions, priors)
+        elapsed = time.perf_counter() - begin
+        fused_labels = fused.argmax(axis=1)
+        favoured = {}
+        for index in np.flatnonzero(priors > 1):
+            mine = labels == index
+            if mine.any():
+                favoured[class_names[index]] = {'prior': float(priors[index]),
+                                                'recall': float((base[mine] == index).mean()),
+                                                'fused_recall': float((fused_labels[mine] == index).mean())}
+        report['scenarios'][name] = {
+            'accuracy': float((fused_labels == labels).mean()),
+            'changed_share': float((fused_labels != base).mean()),
+            'favoured': favoured,
+            'us_per_image': elapsed * 1e6 / max(len(labels), 1)
+        }
+    return report
+
+
+def print_report(report):
+    print(f"Validation images: {report['images']}, accuracy without weather: {report['accuracy']:.2%}")
+    for name, row in report['scenarios'].items():
+        print(f"{name}: accuracy {row['accuracy']:.2%}, {row['changed_share']:.1%} of predictions changed, "
+              f"{row['us_per_image']:.2f} us/image")
+        for disease, recall in row['favoured'].items():
+            print(f"    {disease:<18} prior x{recall['prior']:.2f}  recall {recall['recall']:.2%} -> "
+                  f"{recall['fused_recall']:.2%}")
+
+
+if __name__ == "__main__":
+    # Effect of each weather scenario on validation accuracy
+    from inference_backends import load_backend
+    from train_model import DATASET_PATH, create_data_generators
+
+    backend = load_backend()
+    _, val_gen = create_data_generators(DATASET_PATH)
+    predictions = np.concatenate([backend.predict(val_gen[i][0]) for i in range(len(val_gen))])
+    print_report(evaluate_fusion(predictions, val_gen.classes, list(val_gen.class_indices.keys())))
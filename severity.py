@@ -0,0 +1,118 @@
+"""
+Lesion-area severity estimation
+
+The disease information gives a typical severity per disease; how much of
+this particular leaf is affected is measured here. The already-decoded
+upload is reduced to a small working copy and white-balanced. The leaf is
+every leaf-coloured or dark pixel plus the holes inside its outline. Its
+living tissue (green to yellow) gives a reference colour, and lesions are
+leaf pixels far from that reference in Lab, so spots are found on yellowed
+leaves as well as green ones. A leaf with almost no living tissue is
+affected throughout. Everything is whole-array OpenCV/NumPy work, a few
+milliseconds per image.
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+from image_quality import gray_world, plant_colour_mask
+
+# Severity configuration
+SEVERITY_MAX_SIDE = 384  # analysis resolution; lesions of a few pixels at this size still count
+LIVING_HUE_RANGE = (17, 95)  # OpenCV hue (0-179): yellow to green
+LIVING_MIN_SATURATION, LIVING_MIN_VALUE = 45, 50
+MIN_LIVING_SHARE = 0.1  # below this share of living tissue the whole leaf is necrotic
+LESION_DISTANCE = 20  # Lab distance (OpenCV 8-bit scale) from the living tissue colour
+LIGHTNESS_WEIGHT = 0.25  # shading changes lightness; lesions change colour
+DARK_VALUE = 70  # necrotic and sooty pixels are dark but often too grey for the leaf colour mask
+MIN_LEAF_FRACTION = 0.02  # below this share of the image no leaf is measured
+# Upper bounds of affected leaf area (%) for each grade, mildest first
+SEVERITY_GRADES = ((1.0, 'None'), (5.0, 'Low'), (15.0, 'Moderate'), (35.0, 'High'), (100.0, 'Very High'))
+
+
+def _working_copy(rgb, max_side=SEVERITY_MAX_SIDE):
+    """The image itself if it is small enough, else a downscaled copy"""
+    height, width = rgb.shape[:2]
+    scale = max_side / max(height, width)
+    if scale >= 1.0:
+        return rgb
+    return cv2.resize(rgb, (max(1, round(width * scale)), max(1, round(height * scale))),
+                      interpolation=cv2.INTER_AREA)
+
+
+def segment_leaf(rgb):
+    """(leaf, lesion) uint8 masks of an RGB uint8 image, lesion being a subset of leaf"""
+    balanced = gray_world(rgb)
+    hsv = cv2.cvtColor(balanced, cv2.COLOR_RGB2HSV)
+    kernel = np.ones((5, 5), np.uint8)
+    leaf = plant_colour_mask(hsv) | cv2.inRange(hsv, (0, 0, 0), (179, 255, DARK_VALUE))
+    leaf = cv2.morphologyEx(leaf, cv2.MORPH_CLOSE, kernel)
+    # Pale mildew or holes inside the outline are leaf too: fill each outer contour
+    contours, _ = cv2.findContours(leaf, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    min_area = MIN_LEAF_FRACTION * leaf.size
+    leaf = np.zeros_like(leaf)
+    cv2.drawContours(leaf, [c for c in contours if cv2.contourArea(c) >= min_area], -1, 255, cv2.FILLED)
+    leaf = cv2.morphologyEx(leaf, cv2.MORPH_OPEN, kernel)
+
+    low, high = LIVING_HUE_RANGE
+    living = cv2.inRange(hsv, (low, LIVING_MIN_SATURATION, LIVING_MIN_VALUE), (high, 255, 255)) & leaf
+    if cv2.countNonZero(living) < MIN_LIVING_SHARE * max(1, cv2.countNonZero(leaf)):
+        lesion = leaf & cv2.bitwise_not(living)
+    else:
+        lab = cv2.cvtColor(balanced, cv2.COLOR_RGB2LAB)
+        difference = cv2.absdiff(lab, cv2.mean(lab, mask=living))
+        # Weighted squared distance, compared with the squared limit
+        weights = np.array([[LIGHTNESS_WEIGHT, 1, 1]], np.float32)
+        distance = cv2.transform(cv2.multiply(difference, difference, dtype=cv2.CV_32F), weights)
+        lesion = leaf & cv2.compare(distance, LESION_DISTANCE ** 2, cv2.CMP_GT)
+    lesion = cv2.morphologyEx(lesion, cv2.MORPH_OPEN, np.ones((3, 3), np.uint8))
+    return leaf, lesion
+
+
+def severity_grade(affected_percent):
+    """Grade name for a share of affected leaf area (%)"""
+    for upper, grade in SEVERITY_GRADES:
+        if affected_percent <= upper:
+            return grade
+    return SEVERITY_GRADES[-1][1]
+
+
+def estimate_severity(rgb):
+    """Affected leaf area of a decoded RGB image, or None if no leaf is found
+
+    Returns {'affected_percent', 'grade', 'leaf_fraction'}.
+    """
+    leaf, lesion = segment_leaf(_working_copy(np.asarray(rgb)))
+    leaf_pixels = cv2.countNonZero(leaf)
+    if leaf_pixels < MIN_LEAF_FRACTION * leaf.size:
+        return None
+    affected_percent = 100.0 * cv2.countNonZero(lesion) / leaf_pixels
+    return {
+        'affected_percent': affected_percent,
+        'grade': severity_grade(affected_percent),
+        'leaf_fraction': leaf_pixels / leaf.size
+    }
+
+
+if __name__ == "__main__":
+    # Affected area per class on the training photos, and the time per image
+    import os
+
+    from PIL import Image
+
+    from train_model import DATASET_PATH
+
+    print(f"{'class':<18} {'images':>6} {'mean %':>7} {'median %':>9} {'no leaf':>8} {'ms':>6}")
+    for class_name in sorted(os.listdir(DATASET_PATH)):
+        folder = os.path.join(DATASET_PATH, class_name)
+        results, elapsed = [], 0.0
+        for filename in sorted(os.listdir(folder)):
+            rgb = np.asarray(Image.open(os.path.join(folder, filename)).convert('RGB'))
+            begin = time.perf_counter()
+            results.append(estimate_severity(rgb))
+            elapsed += time.perf_counter() - begin
+        measured = [result['affected_percent'] for result in results if result is not None]
+        print(f"{class_name:<18} {len(results):>6} {np.mean(measured):>7.1f} {np.median(measured):>9.1f} "
+              f"{len(results) - len(measured):>8} {elapsed * 1000 / len(results):>6.2f}")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test script for gradient-free class activation maps
+"""
+
+import numpy as np
+
+from activation_maps import class_activation_maps, encode_overlay, find_cam_head
+from inference_backends import KerasBackend
+from inference_executor import InferenceExecutor
+
+IMAGE_SHAPE = (32, 32, 3)
+NUM_CLASSES = 4
+
+
+def build_model(head=('relu',)):
+    """Small model with the production head: conv, GAP, dropout, dense layers"""
+    import tensorflow as tf
+    tf.keras.utils.set_random_seed(0)
+    inputs = tf.keras.Input(IMAGE_SHAPE)
+    x = tf.keras.layers.Conv2D(6, 3, strides=2, activation='relu')(inputs)
+    x = tf.keras.layers.GlobalAveragePooling2D()(x)
+    for activation in head:
+        x = tf.keras.layers.Dropout(0.2)(x)
+        x = tf.keras.layers.Dense(16, activation=activation)(x)
+    x = tf.keras.layers.Dropout(0.2)(x)
+    outputs = tf.keras.layers.Dense(NUM_CLASSES, activation='softmax')(x)
+    return tf.keras.Model(inputs, outputs)
+
+
+def images(count=3):
+    return np.random.default_rng(7).random((count,) + IMAGE_SHAPE, dtype=np.float32)
+
+
+def test_map_decomposes_the_class_logit():
+    """The mean of the unclamped map equals the class logit minus the bias terms"""
+    features = np.random.default_rng(0).random((2, 5, 5, 6), dtype=np.float32)
+    rng = np.random.default_rng(1)
+    head = [(rng.normal(size=(6, 16)).astype(np.float32), rng.normal(size=16).astype(np.float32), True),
+            (rng.normal(size=(16, NUM_CLASSES)).astype(np.float32), np.zeros(NUM_CLASSES, np.float32), False)]
+    maps = class_activation_maps(features, head, [2, 2])
+    assert maps.shape == (2, 5, 5) and maps.min() >= 0 and maps.max() <= 1
+    for n in range(2):
+        pooled = features[n].mean(axis=(0, 1))
+        hidden = pooled @ head[0][0] + head[0][1]
+        logits = np.maximum(hidden, 0) @ head[1][0]
+        # The map's bias-free part: folding the active units back onto the features
+        mask = hidden > 0
+        weights = head[0][0] @ (head[1][0][:, 2] * mask)
+        bias_part = (head[0][1] * mask) @ head[1][0][:, 2]
+        assert np.isclose((features[n] @ weights).mean() + bias_part, logits[2], atol=1e-4)
+        # Only positive evidence is shown, scaled so the strongest location is 1
+        cam = np.maximum(features[n] @ weights, 0)
+        assert np.allclose(maps[n], cam / cam.max() if cam.max() > 0 else cam, atol=1e-5)
+
+
+def test_explain_matches_predict_in_one_pass():
+    """KerasBackend.explain returns the same predictions plus one map per image"""
+    backend = KerasBackend(model=build_model(), num_threads=1)
+    assert backend.capabilities['explain']
+    batch = images()
+    predictions, maps = backend.explain(batch)
+    assert np.allclose(predictions, backend.predict(batch), atol=1e-5)
+    assert maps.shape == (len(batch), 15, 15) and maps.dtype == np.float32
+    jpeg = encode_overlay((batch[0] * 255).astype(np.uint8), maps[0])
+    assert jpeg[:2] == b'\xff\xd8'
+
+
+def test_unsupported_heads_cannot_explain():
+    """Heads with non-linear hidden activations other than ReLU are not explained"""
+    assert find_cam_head(build_model(head=('tanh',))) is None
+    backend = KerasBackend(model=build_model(head=('tanh',)), num_threads=1)
+    assert not backend.capabilities['explain']
+    try:
+        backend.explain(images(1))
+        assert False, "explain should raise"
+    except NotImplementedError:
+        pass
+
+
+def test_executor_keeps_explain_requests_apart():
+    """Explain and plain requests are batched separately and resolve to their own result types"""
+    backend = KerasBackend(model=build_model(), num_threads=1)
+    executor = InferenceExecutor(backend, max_wait_ms=50)
+    try:
+        batch = images(2)
+        plain = executor.submit(batch)
+        explained = executor.submit(batch, method='explain')
+        again = executor.submit(batch[:1])
+        predictions, maps = explained.result(timeout=30)
+        assert maps.shape == (2, 15, 15)
+        assert np.allclose(plain.result(timeout=30), predictions, atol=1e-5)
+        assert np.allclose(again.result(timeout=30), predictions[:1], atol=1e-5)
+    finally:
+        executor.close()
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Activation Map Test Suite")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+
+    print("=" * 50)
+    print(f"{len(tests) - failures}/{len(tests)} tests passed")
+    print("=" * 50)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Test script for the scheduled alert dispatcher and the stub SMS gateway
+"""
+
+import json
+import os
+import tempfile
+
+from alert_dispatcher import (ALERT_REPEAT_HOURS, SmsGatewayStub, add_subscription, add_subscriptions, connect,
+                              run_alert_cycle)
+from multilingual_support import TRANSLATIONS
+
+NOW = 1_720_000_000.0
+HIGH_RISK = {'all_risks': {
+    'Anthracnose': {'risk_level': 'High', 'risk_factors': ['High humidity', 'Recent rainfall'],
+                    'recommendation': 'Apply copper fungicide'},
+    'Powdery Mildew': {'risk_level': 'Moderate', 'risk_factors': ['Favourable temperature'],
+                       'recommendation': 'Monitor closely'},
+}}
+LOW_RISK = {'all_risks': {'Anthracnose': {'risk_level': 'High', 'risk_factors': [], 'recommendation': ''}}}
+
+
+class FakeRisk:
+    """risk_fn for run_alert_cycle: a fixed risk map per location, recording what was asked for"""
+
+    def __init__(self, risks):
+        self.risks = risks
+        self.calls = []
+
+    def __call__(self, locations):
+        self.calls.append(sorted(locations))
+        return {'results': {loc: self.risks[loc] for loc in locations if loc in self.risks},
+                'errors': {loc: 'not found' for loc in locations if loc not in self.risks}}
+
+
+def pending(conn):
+    return conn.execute('SELECT phone, language, message FROM outbox WHERE sent_at IS NULL ORDER BY id').fetchall()
+
+
+def test_each_location_is_evaluated_once_for_all_its_subscribers():
+    """Subscribers in one location share one risk lookup and each get a message"""
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = connect(os.path.join(tmp, 'alerts.db'))
+        add_subscriptions(conn, [(f"+9100000000{i}", 'Ratnagiri', 'en', ('mango',)) for i in range(5)])
+        add_subscription(conn, '+919999999999', ' RATNAGIRI ', 'en')
+        add_subscription(conn, '+918888888888', 'Pune', 'en')
+        risk = FakeRisk({'ratnagiri': HIGH_RISK, 'pune': LOW_RISK})
+
+        stats = run_alert_cycle(conn, risk_fn=risk, now=NOW)
+        assert risk.calls == [['pune', 'ratnagiri']]
+        assert stats['locations'] == 2 and stats['alerting_locations'] == 1 and stats['messages'] == 6
+        assert {phone for phone, _, _ in pending(conn)} == {f"+9100000000{i}" for i in range(5)} | {'+919999999999'}
+        # The disease with the most risk factors is the one alerted on
+        assert all('Anthracnose' in message for _, _, message in pending(conn))
+
+
+def test_unchanged_alerts_are_not_repeated_within_the_window():
+    """The same alert waits ALERT_REPEAT_HOURS before it is sent again; a changed one goes out at once"""
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = connect(os.path.join(tmp, 'alerts.db'))
+        add_subscription(conn, '+910000000001', 'Ratnagiri')
+        risk = FakeRisk({'ratnagiri': HIGH_RISK})
+
+        assert run_alert_cycle(conn, risk_fn=risk, now=NOW)['messages'] == 1
+        repeat = run_alert_cycle(conn, risk_fn=risk, now=NOW + 3 * 3600)
+        assert repeat['messages'] == 0 and repeat['skipped_duplicates'] == 1
+        assert run_alert_cycle(conn, risk_fn=risk, now=NOW + ALERT_REPEAT_HOURS * 3600)['messages'] == 1
+
+        changed = {'all_risks': dict(HIGH_RISK['all_risks'], Anthracnose=dict(
+            HIGH_RISK['all_risks']['Anthracnose'], risk_factors=['High humidity', 'Recent rainfall', 'Warm']))}
+        risk.risks['ratnagiri'] = changed
+        assert run_alert_cycle(conn, risk_fn=risk, now=NOW + ALERT_REPEAT_HOURS * 3600 + 60)['messages'] == 1
+        assert len(pending(conn)) == 3
+
+
+def test_messages_are_rendered_in_each_subscriber_language():
+    """Each language gets its own translated message"""
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = connect(os.path.join(tmp, 'alerts.db'))
+        add_subscription(conn, '+910000000001', 'Ratnagiri', 'en')
+        add_subscription(conn, '+910000000002', 'Ratnagiri', 'hi')
+        add_subscription(conn, '+910000000003', 'Ratnagiri', 'hi')
+        run_alert_cycle(conn, risk_fn=FakeRisk({'ratnagiri': HIGH_RISK}), now=NOW)
+
+        messages = {phone: (language, message) for phone, language, message in pending(conn)}
+        assert messages['+910000000001'][0] == 'en' and '(High)' in messages['+910000000001'][1]
+        assert messages['+910000000002'][0] == 'hi'
+        assert f"({TRANSLATIONS['hi']['High']})" in messages['+910000000002'][1]
+        assert messages['+910000000002'][1] == messages['+910000000003'][1]
+        assert messages['+910000000001'][1].startswith('AgriLeaf Doctor: Ratnagiri - Anthracnose')
+
+
+def test_only_mango_subscriptions_are_alerted():
+    """Subscribers for other crops are neither looked up nor messaged"""
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = connect(os.path.join(tmp, 'alerts.db'))
+        add_subscription(conn, '+910000000001', 'Ratnagiri', crops=('Mango', 'cashew'))
+        add_subscription(conn, '+910000000002', 'Ratnagiri', crops=('cashew',))
+        add_subscription(conn, '+910000000003', 'Nashik', crops=('grape', 'mangosteen'))
+        risk = FakeRisk({'ratnagiri': HIGH_RISK, 'nashik': HIGH_RISK})
+
+        stats = run_alert_cycle(conn, risk_fn=risk, now=NOW)
+        assert risk.calls == [['ratnagiri']]
+        assert stats['messages'] == 1
+        assert [phone for phone, _, _ in pending(conn)] == ['+910000000001']
+
+
+def test_gateway_drains_the_outbox_and_retries_after_a_failure():
+    """A failed send leaves messages pending; the next drain sends each exactly once"""
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = connect(os.path.join(tmp, 'alerts.db'))
+        add_subscriptions(conn, [(f"+9100000{i:05d}", 'Ratnagiri', 'en', ('mango',)) for i in range(25)])
+        run_alert_cycle(conn, risk_fn=FakeRisk({'ratnagiri': HIGH_RISK}), now=NOW)
+
+        # The log directory does not exist, so the gateway fails before marking anything sent
+        gateway = SmsGatewayStub(conn, os.path.join(tmp, 'missing', 'sms.jsonl'))
+        try:
+            gateway.drain(batch_size=10)
+            assert False, "expected OSError"
+        except OSError:
+            pass
+        assert len(pending(conn)) == 25 and gateway.sent == 0
+
+        gateway.log_path = os.path.join(tmp, 'sms.jsonl')
+        assert gateway.drain(batch_size=10) == 25
+        assert pending(conn) == [] and gateway.drain() == 0
+        with open(gateway.log_path, 'r', encoding='utf-8') as f:
+            sent = [json.loads(line) for line in f]
+        assert sorted(item['to'] for item in sent) == [f"+9100000{i:05d}" for i in range(25)]
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Alert Dispatcher Test Suite")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+
+    print("=" * 50)
+    print(f"{len(tests) - failures}/{len(tests)} tests passed")
+    print("=" * 50)
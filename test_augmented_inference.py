@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test script for batched test-time augmentation
+"""
+
+import numpy as np
+
+from augmented_inference import VIEW_TRANSFORMS, augment_views, average_views, evaluate_tta, tta_batch
+
+SIZE = 64
+
+
+def test_views_are_flips_rotations_and_crops_of_the_input():
+    """View 0 is the input, view 1 its mirror, and rotations keep the centre in place"""
+    rng = np.random.default_rng(0)
+    images = rng.integers(0, 256, (2, SIZE, SIZE, 3), dtype=np.uint8)
+    views = augment_views(images, 4)
+    assert views.shape == (2, 4, SIZE, SIZE, 3) and views.dtype == np.uint8
+    assert (views[:, 0] == images).all()
+    assert (views[:, 1] == images[:, :, ::-1]).all()
+    # A flat image stays flat under every transform (no black borders)
+    flat = np.full((1, SIZE, SIZE, 3), 90, np.uint8)
+    assert (augment_views(flat, len(VIEW_TRANSFORMS)) == 90).all()
+    # A centred square survives a 10 degree rotation at the centre
+    square = np.zeros((1, SIZE, SIZE, 3), np.uint8)
+    square[:, 24:40, 24:40] = 255
+    assert (augment_views(square, 3)[0, 2, 30:34, 30:34] == 255).all()
+
+
+def test_all_views_are_stacked_into_one_normalized_batch():
+    """Views of each image are contiguous in the batch and averaged back per image"""
+    images = [{'model_input': np.full((SIZE, SIZE, 3), value, np.uint8)} for value in (0, 255)]
+    batch = tta_batch(images, {'scale': 1 / 255, 'offset': -0.5}, num_views=3)
+    assert batch.shape == (6, SIZE, SIZE, 3) and batch.dtype == np.float32
+    assert np.allclose(batch[:3], -0.5) and np.allclose(batch[3:], 0.5)
+    predictions = np.array([[1, 0], [0, 1], [1, 0], [0, 1], [0, 1], [0, 1]], np.float32)
+    assert np.allclose(average_views(predictions, 3), [[2 / 3, 1 / 3], [0, 1]])
+
+
+def test_report_shows_accuracy_gain_and_latency():
+    """Averaging views of a noisy model improves accuracy; the report gives both sides of the trade"""
+    rng = np.random.default_rng(1)
+    labels = rng.integers(0, 2, 200)
+    images = rng.integers(0, 256, (200, SIZE, SIZE, 3), dtype=np.uint8)
+    images[:, 16:48, 16:48] = np.where(labels[:, None, None, None] == 1, 150, 106)  # class signal in the centre
+
+    def noisy_model(batch):
+        # View-dependent noise makes any single view unreliable
+        signal = (batch[:, 24:40, 24:40].mean(axis=(1, 2, 3)) - 0.5) * 10
+        noise = np.array([np.random.default_rng(int(view.sum() * 1000) % 2 ** 32).normal(0, 1.0)
+                          for view in batch])
+        p1 = 1 / (1 + np.exp(-(signal + noise) * 3))
+        return np.stack([1 - p1, p1], axis=1)
+
+    report = evaluate_tta(noisy_model, images, labels, view_counts=(1, 8), confidence_threshold=90.0,
+                          normalization={'scale': 1 / 255, 'offset': 0.0})
+    assert set(report) == {1, 8}
+    for row in report.values():
+        assert set(row) == {'accuracy', 'gated_accuracy', 'low_confidence_share', 'low_confidence_accuracy',
+                            'ms_per_image'}
+        assert row['ms_per_image'] > 0
+    assert report[8]['accuracy'] > report[1]['accuracy']
+    assert report[8]['gated_accuracy'] >= report[1]['gated_accuracy'] == report[1]['accuracy']
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Test-Time Augmentation Test Suite")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+
+    print("=" * 50)
+    print(f"{len(tests) - failures}/{len(tests)} tests passed")
+    print("=" * 50)
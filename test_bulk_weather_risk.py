@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+End-to-end test script for the bulk weather-risk sweep against the local stub server
+"""
+
+import time
+
+import weather_alerts
+from weather_client import WeatherClient
+from weather_stub_server import StubWeatherServer
+
+
+def setup_module(module):
+    weather_alerts.set_location_resolver(None)
+    weather_alerts.set_observation_store(None)
+
+
+def run_with_stub(server, func):
+    weather_alerts.set_weather_client(WeatherClient('test-key', server.weather_url, server.forecast_url))
+    try:
+        return func()
+    finally:
+        weather_alerts.set_weather_client(None)
+
+
+def test_bulk_results_match_single_lookup():
+    """Bulk risk maps are identical to get_weather_risk for each location"""
+    locations = ['Ratnagiri', 'Pune', 'Nashik']
+    with StubWeatherServer() as server:
+        sweep = run_with_stub(server, lambda: weather_alerts.get_bulk_weather_risk(locations, rate_limit=None))
+        singles = run_with_stub(server, lambda: {loc: weather_alerts.get_weather_risk(loc) for loc in locations})
+    assert sweep['errors'] == {}
+    assert sweep['results'] == singles
+
+
+def test_partial_failures_are_reported():
+    """Unknown locations are reported without aborting the sweep"""
+    locations = ['Ratnagiri', 'Unknown', 'Pune', 'Nowhere, MH']
+    with StubWeatherServer() as server:
+        sweep = run_with_stub(server, lambda: weather_alerts.get_bulk_weather_risk(locations, rate_limit=None))
+    assert set(sweep['results']) == {'Ratnagiri', 'Pune'}
+    assert set(sweep['errors']) == {'Unknown', 'Nowhere, MH'}
+
+
+def test_equivalent_spellings_share_one_slot():
+    """Spellings that normalize to the same location are fetched once and mapped back"""
+    locations = ['Ratnagiri', 'ratnagiri, ', '  RATNAGIRI']
+    with StubWeatherServer() as server:
+        sweep = run_with_stub(server, lambda: weather_alerts.get_bulk_weather_risk(locations, rate_limit=None))
+        assert server.request_count == 1
+    assert set(sweep['results']) == set(locations)
+    assert sweep['results']['Ratnagiri'] == sweep['results']['  RATNAGIRI']
+
+
+def test_upstream_status_is_reported():
+    """A rate-limited upstream is reported with its real cause"""
+    with StubWeatherServer() as server:
+        sweep = run_with_stub(server, lambda: weather_alerts.get_bulk_weather_risk(['RateLimited'], rate_limit=None))
+    assert '429' in sweep['errors']['RateLimited']
+
+
+def test_network_errors_are_reported():
+    """A dead upstream yields per-location errors instead of an exception"""
+    with StubWeatherServer() as server:
+        weather_url, forecast_url = server.weather_url, server.forecast_url
+    weather_alerts.set_weather_client(WeatherClient('test-key', weather_url, forecast_url, timeout=(0.5, 0.5)))
+    try:
+        sweep = weather_alerts.get_bulk_weather_risk(['Ratnagiri', 'Pune'], rate_limit=None)
+    finally:
+        weather_alerts.set_weather_client(None)
+    assert sweep['results'] == {}
+    assert set(sweep['errors']) == {'Ratnagiri', 'Pune'}
+
+
+def test_sweep_runs_concurrently():
+    """A sweep with upstream latency finishes much faster than a serial loop"""
+    locations = [f"Village {i}" for i in range(16)]
+    with StubWeatherServer(latency=0.2) as server:
+        start = time.perf_counter()
+        sweep = run_with_stub(server, lambda: weather_alerts.get_bulk_weather_risk(
+            locations, max_workers=8, rate_limit=None))
+        elapsed = time.perf_counter() - start
+    assert len(sweep['results']) == 16
+    assert elapsed < 0.2 * 16 / 2
+
+
+def test_rate_limit_is_respected():
+    """Upstream calls beyond the burst are spread out by the rate limit"""
+    locations = [f"Village {i}" for i in range(10)]
+    with StubWeatherServer() as server:
+        start = time.perf_counter()
+        sweep = run_with_stub(server, lambda: weather_alerts.get_bulk_weather_risk(locations, rate_limit=5))
+        elapsed = time.perf_counter() - start
+        assert server.request_count == 10
+    assert len(sweep['results']) == 10
+    assert elapsed >= 0.8
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Bulk Weather Risk Test Suite")
+    print("=" * 50)
+    setup_module(None)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+
+    print("=" * 50)
+    print(f"{len(tests) - failures}/{len(tests)} tests passed")
+    print("=" * 50)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test script for reference-case retrieval over training-image embeddings
+"""
+
+import os
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+import embedding_index
+from embedding_index import INDEX_SUBDIR, EmbeddingIndex, build_index, normalize_rows, write_index
+
+COLOURS = {'Anthracnose': (120, 70, 40), 'Healthy': (50, 140, 60), 'Sooty Mould': (40, 40, 45)}
+
+
+class ColourBackend:
+    """Stand-in model whose embedding is the image's mean colour, centred"""
+
+    def __init__(self, version='v1'):
+        self.bundle = {'version': version, 'input': {'width': 16, 'height': 16},
+                       'normalization': {'scale': 1 / 255, 'offset': -0.5}}
+        self.embedded = 0
+
+    def embed(self, batch):
+        self.embedded += len(batch)
+        return batch.mean(axis=(1, 2))
+
+
+def write_dataset(directory, per_class=4):
+    rng = np.random.default_rng(0)
+    for class_name, colour in COLOURS.items():
+        os.makedirs(os.path.join(directory, class_name), exist_ok=True)
+        for i in range(per_class):
+            pixels = np.clip(np.array(colour) + rng.integers(-8, 9, 3), 0, 255)
+            Image.fromarray(np.full((24, 32, 3), pixels, np.uint8)).save(
+                os.path.join(directory, class_name, f'leaf_{i}.png'))
+
+
+def test_search_finds_the_image_and_its_class():
+    """An image's own embedding finds itself first, then images of the same class"""
+    with tempfile.TemporaryDirectory() as tmp:
+        dataset, bundle = os.path.join(tmp, 'dataset'), os.path.join(tmp, 'bundle')
+        write_dataset(dataset)
+        backend = ColourBackend()
+        assert build_index(backend, bundle, dataset)['embedded'] == 12
+        index = EmbeddingIndex(os.path.join(bundle, INDEX_SUBDIR), dataset)
+        assert len(index) == 12 and index.matrix.dtype == np.float16 and index.model_version == 'v1'
+        query = np.asarray(index.matrix[5], dtype=np.float32)
+        results = index.search(query, k=4)
+        assert results[0]['path'] == os.path.join(dataset, index.entries[5][0])
+        assert results[0]['similarity'] > 0.999
+        assert {result['class_name'] for result in results} == {index.entries[5][1]}
+        assert [r['similarity'] for r in results] == sorted((r['similarity'] for r in results), reverse=True)
+
+
+def test_rebuild_only_embeds_what_changed():
+    """Unchanged images keep their rows; new, changed and removed ones are handled; a new model rebuilds"""
+    with tempfile.TemporaryDirectory() as tmp:
+        dataset, bundle = os.path.join(tmp, 'dataset'), os.path.join(tmp, 'bundle')
+        write_dataset(dataset)
+        backend = ColourBackend()
+        build_index(backend, bundle, dataset)
+        assert build_index(backend, bundle, dataset) == {'kept': 12, 'embedded': 0, 'removed': 0,
+                                                         'reclustered': False, 'count': 12}
+
+        Image.fromarray(np.full((24, 32, 3), COLOURS['Healthy'], np.uint8)).save(
+            os.path.join(dataset, 'Healthy', 'leaf_new.png'))
+        os.remove(os.path.join(dataset, 'Sooty Mould', 'leaf_0.png'))
+        changed = os.path.join(dataset, 'Anthracnose', 'leaf_1.png')
+        Image.fromarray(np.full((24, 30, 3), COLOURS['Sooty Mould'], np.uint8)).save(changed)
+        os.utime(changed, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+        backend.embedded = 0
+        stats = build_index(backend, bundle, dataset)
+        assert stats['kept'] == 10 and stats['embedded'] == 2 and stats['removed'] == 1 and stats['count'] == 12
+        assert backend.embedded == 2
+        index = EmbeddingIndex(os.path.join(bundle, INDEX_SUBDIR), dataset)
+        row = [path for path, _, _, _ in index.entries].index(os.path.join('Anthracnose', 'leaf_1.png'))
+        assert index.search(np.asarray(index.matrix[row], np.float32), k=2)[1]['class_name'] == 'Sooty Mould'
+        # Only the current data file is kept
+        assert len([name for name in os.listdir(os.path.join(bundle, INDEX_SUBDIR)) if name.endswith('.f16')]) == 1
+
+        other = ColourBackend('v2')
+        assert build_index(other, bundle, dataset)['embedded'] == 12
+
+
+def test_clustered_index_is_fast_and_accurate():
+    """Above the exact-search limit, a query scores only its nearest clusters and keeps recall"""
+    rng = np.random.default_rng(0)
+    modes = normalize_rows(rng.standard_normal((200, 64)))
+    labels = rng.integers(0, len(modes), 20000)
+    embeddings = normalize_rows(modes[labels] + rng.standard_normal((len(labels), 64)).astype(np.float32) * 0.1)
+    entries = [(f'c{label % 8}/{i}.jpg', f'c{label % 8}', 1, 1) for i, label in enumerate(labels)]
+    limit = embedding_index.EXACT_SEARCH_LIMIT
+    embedding_index.EXACT_SEARCH_LIMIT = 5000
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            assert write_index(tmp, 'v1', entries, embeddings)
+            index = EmbeddingIndex(tmp, dataset_dir='')
+            assert index.centroids is not None and index.offsets[-1] == len(entries)
+            queries = normalize_rows(embeddings[:50] + rng.standard_normal((50, 64)).astype(np.float32) * 0.05)
+            truth = np.argsort(-(embeddings @ queries.T), axis=0)[:5].T
+            begin = time.perf_counter()
+            found = [{result['path'] for result in index.search(query, k=5)} for query in queries]
+            elapsed = (time.perf_counter() - begin) * 1000 / len(queries)
+            recall = np.mean([len(hits & {entries[i][0] for i in rows}) / 5 for hits, rows in zip(found, truth)])
+            assert recall >= 0.95, recall
+            assert elapsed < 10, elapsed
+            # Small changes reuse the clusters
+            assert not write_index(tmp, 'v1', entries[:-100], embeddings[:-100], embedding_index.read_manifest(tmp))
+    finally:
+        embedding_index.EXACT_SEARCH_LIMIT = limit
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Embedding Index Test Suite")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+
+    print("=" * 50)
+    print(f"{len(tests) - failures}/{len(tests)} tests passed")
+    print("=" * 50)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Test script for the field feedback store and uncertainty-ranked relabel queue
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from feedback_store import (EXPORT_PREFIX, REVIEW, FeedbackStore, entropy_scores, export_for_review, export_labeled,
+                            import_review, margin_scores, relabel_queue)
+
+CLASS_NAMES = ['Anthracnose', 'Healthy', 'Sooty Mould']
+
+
+def upload(i):
+    data = f"image {i}".encode()
+    return hashlib.sha1(data).hexdigest(), data
+
+
+def test_scores_rank_close_calls_first():
+    """Margin and entropy both put a near tie above a confident prediction, over many rows at once"""
+    probabilities = np.array([[0.98, 0.01, 0.01], [0.5, 0.45, 0.05], [0.34, 0.33, 0.33]], np.float32)
+    assert np.argsort(-margin_scores(probabilities)).tolist() == [2, 1, 0]
+    assert np.argsort(-entropy_scores(probabilities)).tolist() == [2, 1, 0]
+    assert np.isclose(entropy_scores(probabilities)[2], np.log(3), atol=1e-3)
+    many = np.random.default_rng(0).dirichlet(np.ones(8), 1_000_000).astype(np.float32)
+    begin = time.perf_counter()
+    margin_scores(many)
+    entropy_scores(many)
+    assert time.perf_counter() - begin < 2.0
+
+
+def test_uploads_labels_and_queue():
+    """Repeats are skipped, rows follow the store's class order, labeled uploads leave the queue"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = FeedbackStore(tmp)
+        margins = [0.9, 0.1, 0.5, 0.02, 0.7]
+        keys = []
+        for i, margin in enumerate(margins):
+            key, data = upload(i)
+            keys.append(key)
+            top = (1 + margin) / 2
+            assert store.add_upload(key, data, [top, 1 - top, 0.0], CLASS_NAMES, 'v1', '.PNG')
+        key, data = upload(0)
+        assert not store.add_upload(key, data, [1.0, 0.0, 0.0], CLASS_NAMES, 'v1')
+        # A newer model with another class order replaces the row used for ranking
+        assert store.add_upload(key, data, [0.0, 0.525, 0.475], ['Anthracnose', 'Sooty Mould', 'Healthy'], 'v2')
+        assert not store.add_upload('f' * 40, b'', [0.5, 0.5], ['Anthracnose', 'Healthy'], 'v3')
+
+        reopened = FeedbackStore(tmp)
+        uploads = reopened.uploads()
+        assert len(uploads['key']) == 5 and uploads['probabilities'].shape == (5, 3)
+        assert np.allclose(uploads['probabilities'][uploads['key'] == key.encode()], [[0.0, 0.475, 0.525]])
+        assert reopened.image_path(keys[1]).endswith('.png')
+
+        queue = relabel_queue(reopened, n=3)
+        assert [item['key'] for item in queue] == [keys[3], keys[0], keys[1]]
+        assert queue[1]['predicted_class'] == 'Sooty Mould'
+        reopened.add_label(keys[3], 'Healthy')
+        reopened.add_label(keys[3], 'Anthracnose', source=REVIEW)
+        assert reopened.labels() == {keys[3]: 'Anthracnose'}
+        assert [item['key'] for item in relabel_queue(reopened, n=2, strategy='entropy')] == [keys[0], keys[1]]
+        try:
+            reopened.add_label(keys[1], 'Die Back')
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+
+
+def test_review_loop_exports_into_dataset_layout():
+    """Queued uploads are filed by predicted class; moved files become labels and training images"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = FeedbackStore(os.path.join(tmp, 'feedback'))
+        review, dataset = os.path.join(tmp, 'review'), os.path.join(tmp, 'dataset')
+        keys = []
+        for i, top in enumerate([0.9, 0.52, 0.6, 0.8, 0.95, 0.7]):
+            key, data = upload(i)
+            keys.append(key)
+            store.add_upload(key, data, [top, 1 - top, 0.0], CLASS_NAMES, 'v1')
+        queue = export_for_review(store, review, n=2)
+        assert [item['key'] for item in queue] == [keys[1], keys[2]]
+        assert sorted(os.listdir(os.path.join(review, 'Anthracnose'))) == sorted([f"{keys[1]}.jpg", f"{keys[2]}.jpg"])
+
+        # The reviewer moves one image to the right class and confirms the other
+        shutil.move(os.path.join(review, 'Anthracnose', f"{keys[1]}.jpg"), os.path.join(review, 'Healthy'))
+        assert import_review(store, review) == 2
+        assert import_review(store, review) == 0
+        assert store.labels() == {keys[1]: 'Healthy', keys[2]: 'Anthracnose'}
+        assert export_labeled(store, dataset) == {'added': 2, 'moved': 0}
+        assert os.listdir(os.path.join(dataset, 'Healthy')) == [f"{EXPORT_PREFIX}{keys[1]}.jpg"]
+        with open(os.path.join(dataset, 'Healthy', f"{EXPORT_PREFIX}{keys[1]}.jpg"), 'rb') as f:
+            assert f.read() == upload(1)[1]
+
+        # A later correction moves the training copy
+        store.add_label(keys[1], 'Sooty Mould')
+        assert export_labeled(store, dataset) == {'added': 0, 'moved': 1}
+        assert os.listdir(os.path.join(dataset, 'Healthy')) == []
+        assert export_labeled(store, dataset) == {'added': 0, 'moved': 0}
+
+
+def test_partial_append_is_ignored():
+    """A row cut short by a crash stays invisible, and the next upload lines up with its own probabilities"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = FeedbackStore(tmp)
+        for i in range(3):
+            key, data = upload(i)
+            store.add_upload(key, data, [0.6, 0.4, 0.0], CLASS_NAMES, 'v1')
+        with open(os.path.join(tmp, 'uploads', 'probabilities.bin'), 'ab') as f:
+            f.write(np.zeros(3, np.float32).tobytes())
+        store = FeedbackStore(tmp)
+        assert len(store.uploads()['key']) == 3
+        store.add_upload('b' * 40, b'new', [0.1, 0.8, 0.1], CLASS_NAMES, 'v1')
+        uploads = store.uploads()
+        assert len(uploads['key']) == 4
+        rows = dict(zip(uploads['key'].tolist(), uploads['probabilities'].tolist()))
+        assert np.allclose(rows[b'b' * 40], [0.1, 0.8, 0.1])
+        assert all(np.allclose(rows[upload(i)[0].encode()], [0.6, 0.4, 0.0]) for i in range(3))
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Feedback Store Test Suite")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+
+    print("=" * 50)
+    print(f"{len(tests) - failures}/{len(tests)} tests passed")
+    print("=" * 50)
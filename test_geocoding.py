@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test script for location normalization, geocode caching and grid bucketing
+"""
+
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import weather_alerts
+from geocoding import (GeocodeCache, LocationResolver, OfflineGazetteer,
+                       normalize_location_query, snap_to_cell)
+from weather_client import RateLimiter, WeatherClient
+from weather_stub_server import StubWeatherServer
+
+PLACES = {
+    'Ratnagiri, Maharashtra': (16.9902, 73.3120),
+    'Pawas': (16.9850, 73.3250),
+    'Pune': (18.5204, 73.8567)
+}
+
+
+def test_normalize_location_query():
+    """State codes expand and the country suffix is dropped"""
+    assert normalize_location_query('ratnagiri, MH') == 'ratnagiri, maharashtra'
+    assert normalize_location_query(' Ratnagiri ,  Maharashtra, India') == 'ratnagiri, maharashtra'
+    assert normalize_location_query('Ratnagiri') == 'ratnagiri'
+
+
+def test_snap_to_cell():
+    """Nearby coordinates share a cell, distant ones do not"""
+    assert snap_to_cell(16.9902, 73.3120) == snap_to_cell(16.9850, 73.3250)
+    assert snap_to_cell(16.9902, 73.3120) != snap_to_cell(18.5204, 73.8567)
+
+
+def test_geocode_cache_persists():
+    """Each normalized query is geocoded once, even across restarts"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'geocode.json')
+        gazetteer = OfflineGazetteer(PLACES)
+        resolver = LocationResolver(gazetteer, GeocodeCache(path))
+        for location in ['Ratnagiri', 'ratnagiri, MH', 'Ratnagiri, Maharashtra', 'RATNAGIRI']:
+            assert resolver.resolve(location) is not None
+        assert resolver.resolve('Atlantis') is None
+        assert gazetteer.calls == 3
+
+        restarted = OfflineGazetteer(PLACES)
+        resolver = LocationResolver(restarted, GeocodeCache(path))
+        resolver.resolve('ratnagiri, mh')
+        resolver.resolve('Atlantis')
+        assert restarted.calls == 0
+
+
+def test_misses_expire_and_errors_are_not_cached():
+    """A miss is asked about again after its TTL; a geocoder error is never stored"""
+    class FlakyGazetteer(OfflineGazetteer):
+        def geocode(self, query):
+            if self.calls == 0:
+                self.calls += 1
+                raise TimeoutError("geocoder timed out")
+            return super().geocode(query)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'geocode.json')
+        gazetteer = FlakyGazetteer(PLACES)
+        resolver = LocationResolver(gazetteer, GeocodeCache(path))
+        try:
+            resolver.resolve('Pune')
+            assert False, "expected TimeoutError"
+        except TimeoutError:
+            pass
+        assert resolver.resolve('Pune') is not None and gazetteer.calls == 2
+
+        assert resolver.resolve('Atlantis') is None and gazetteer.calls == 3
+        assert resolver.resolve('Atlantis') is None and gazetteer.calls == 3
+        expired = LocationResolver(gazetteer, GeocodeCache(path, miss_ttl=0))
+        assert expired.resolve('Atlantis') is None and gazetteer.calls == 4
+        assert expired.resolve('Pune') is not None and gazetteer.calls == 4
+
+        # Misses written by older versions as null are looked up again
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'pawas': None}, f)
+        assert LocationResolver(gazetteer, GeocodeCache(path)).resolve('Pawas') is not None
+        assert gazetteer.calls == 5
+
+
+def test_geocoder_calls_are_rate_limited_across_threads():
+    """Concurrent lookups of different places share one request budget"""
+    gazetteer = OfflineGazetteer(PLACES)
+    resolver = LocationResolver(gazetteer, rate_limiter=RateLimiter(20, burst=1))
+    start = time.monotonic()
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(resolver.resolve, ['Ratnagiri, MH', 'Pawas', 'Pune', 'Nowhere', 'Atlantis'] * 4))
+    assert gazetteer.calls == 5
+    assert time.monotonic() - start >= 4 / 20 * 0.9
+
+
+def test_locations_in_one_cell_share_a_fetch():
+    """Spellings and nearby villages in one grid cell cost a single upstream call"""
+    locations = ['Ratnagiri', 'ratnagiri, MH', 'Ratnagiri, Maharashtra', 'Pawas', 'Pune']
+    with StubWeatherServer() as server:
+        weather_alerts.set_weather_client(WeatherClient('test-key', server.weather_url, server.forecast_url))
+        weather_alerts.set_location_resolver(LocationResolver(OfflineGazetteer(PLACES)))
+        weather_alerts.set_observation_store(None)
+        try:
+            sweep = weather_alerts.get_bulk_weather_risk(locations, rate_limit=None)
+            single = weather_alerts.get_weather_risk('Pawas')
+        finally:
+            weather_alerts.set_location_resolver(None)
+            weather_alerts.set_weather_client(None)
+        assert server.request_count == 2
+    assert sweep['errors'] == {}
+    assert sweep['results']['Ratnagiri'] == sweep['results']['Pawas'] == single
+    assert 'lat' in server.requests[0] and 'q' not in server.requests[0]
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Geocoding Test Suite")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+
+    print("=" * 50)
+    print(f"{len(tests) - failures}/{len(tests)} tests passed")
+    print("=" * 50)
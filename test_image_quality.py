@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test script for the image quality gate, using synthetic images
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+from image_quality import OK, REJECT, WARN, QualityGate, assess_image
+
+SIZE = 224
+
+
+def leaf_image(leaf_rgb=(60, 140, 50), background_rgb=(200, 215, 235), axes=(90, 45), seed=0, midrib=True):
+    """A textured leaf-shaped ellipse with a midrib on a plain, slightly noisy background"""
+    rng = np.random.default_rng(seed)
+    img = np.empty((SIZE, SIZE, 3), np.float32)
+    img[:] = background_rgb
+    mask = np.zeros((SIZE, SIZE), np.uint8)
+    cv2.ellipse(mask, (SIZE // 2, SIZE // 2), axes, 30, 0, 360, 255, -1)
+    texture = rng.normal(0, 18, (SIZE, SIZE, 1))
+    img[mask > 0] = (np.array(leaf_rgb, np.float32) + texture[mask > 0])
+    img += rng.normal(0, 3, img.shape)
+    out = np.clip(img, 0, 255).astype(np.uint8)
+    if midrib:
+        cv2.line(out, (60, 160), (164, 64), (200, 210, 150), 2)
+    return out
+
+
+def test_clear_leaves_pass():
+    """Green and dry brown leaves (even on a bluish background) are accepted"""
+    assert assess_image(leaf_image())['status'] == OK
+    brown = assess_image(leaf_image(leaf_rgb=(130, 110, 100), background_rgb=(170, 200, 235), axes=(90, 12)))
+    assert brown['status'] in (OK, WARN), brown
+    assert 'not_a_leaf' not in brown['reasons']
+
+
+def test_unusable_images_are_rejected_with_reasons():
+    """Blank, dark, overexposed, blurry, tiny and leafless images are rejected"""
+    rng = np.random.default_rng(1)
+    cases = {
+        'blank': np.full((SIZE, SIZE, 3), 128, np.uint8),
+        'too_dark': (leaf_image() * 0.1).astype(np.uint8),
+        'too_bright': np.clip(leaf_image().astype(np.int16) + 150, 0, 255).astype(np.uint8),
+        'blurry': cv2.GaussianBlur(leaf_image(), (0, 0), 8),
+        'not_a_leaf': np.clip(rng.normal(128, 40, (SIZE, SIZE, 1)), 0, 255).astype(np.uint8).repeat(3, axis=2),
+    }
+    for reason, img in cases.items():
+        report = assess_image(img)
+        assert report['status'] == REJECT, (reason, report)
+        assert reason in report['reasons'], (reason, report)
+
+    small = assess_image(leaf_image(), image_size=(40, 30))
+    assert small['status'] == REJECT and 'too_small' in small['reasons']
+
+
+def test_fruit_skin_and_other_subjects_are_rejected():
+    """Warm-coloured subjects that are not leaves are turned away on light, grey, bluish and dark backgrounds"""
+    subjects = {'skin': (224, 172, 140), 'ripe mango': (250, 180, 40), 'red shirt': (200, 30, 40),
+                'brick': (150, 70, 50), 'orange cloth': (240, 130, 30)}
+    for name, colour in subjects.items():
+        for background in ((235, 235, 235), (120, 120, 120), (200, 215, 235), (60, 60, 70)):
+            report = assess_image(leaf_image(leaf_rgb=colour, background_rgb=background, axes=(100, 70), midrib=False))
+            assert report['status'] == REJECT and 'not_a_leaf' in report['reasons'], (name, background, report)
+    # Filling the whole frame does not make a colour a leaf either
+    shirt = np.clip(np.random.default_rng(2).normal(0, 10, (SIZE, SIZE, 1)) + (200, 30, 40), 0, 255).astype(np.uint8)
+    assert 'not_a_leaf' in assess_image(shirt)['reasons']
+
+
+def test_diseased_dry_and_close_up_leaves_are_kept():
+    """Brown lesions on green, a dried orange-brown leaf and a frame-filling leaf all pass"""
+    spotted = leaf_image()
+    for x, y in ((90, 120), (130, 100), (115, 125)):
+        cv2.circle(spotted, (x, y), 9, (150, 80, 30), -1)
+    assert assess_image(spotted)['status'] == OK
+    dried = assess_image(leaf_image(leaf_rgb=(130, 77, 38), background_rgb=(235, 235, 235)))
+    assert dried['status'] == OK, dried
+    close_up = np.clip(np.random.default_rng(3).normal(0, 18, (SIZE, SIZE, 1)) + (60, 140, 50), 0, 255)
+    assert assess_image(close_up.astype(np.uint8))['metrics']['leaf_ratio'] > 0.9
+
+
+def test_borderline_images_are_flagged():
+    """Low resolution and mild blur warn instead of rejecting"""
+    assert assess_image(leaf_image(), image_size=(150, 120))['reasons'] == ['low_resolution']
+    soft = assess_image(cv2.GaussianBlur(leaf_image(), (0, 0), 1.6))
+    assert soft['status'] == WARN and soft['reasons'] == ['slightly_blurry'], soft
+
+
+def test_gate_counts_outcomes_and_is_fast():
+    """The gate keeps per-outcome and per-reason counters and takes a few milliseconds"""
+    gate = QualityGate()
+    good = {'model_input': leaf_image(), 'size': (320, 240)}
+    blank = {'model_input': np.zeros((SIZE, SIZE, 3), np.uint8), 'size': (320, 240)}
+    start = time.perf_counter()
+    for processed in (good, good, blank):
+        gate.check(processed)
+    elapsed_ms = (time.perf_counter() - start) * 1000 / 3
+    assert gate.stats['checked'] == 3 and gate.stats[OK] == 2 and gate.stats[REJECT] == 1
+    assert gate.stats['reasons'] == {'blank': 1}
+    assert elapsed_ms < 50, elapsed_ms
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Image Quality Gate Test Suite")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+
+    print("=" * 50)
+    print(f"{len(tests) - failures}/{len(tests)} tests passed")
+    print("=" * 50)
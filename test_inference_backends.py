@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Conformance test: every inference backend agrees with Keras on a fixed image set
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+from inference_backends import BACKENDS, export_artifacts, load_backend
+from model_bundle import write_bundle
+
+TOLERANCE = 1e-4
+IMAGE_SHAPE = (32, 32, 3)  # small stand-in for the 224x224 model keeps conversion fast
+NUM_CLASSES = 8
+
+
+def build_artifacts(directory):
+    """Save a small model with the production head and export it for every backend"""
+    import tensorflow as tf
+    inputs = tf.keras.Input(IMAGE_SHAPE)
+    x = tf.keras.layers.Conv2D(8, 3, activation='relu')(inputs)
+    x = tf.keras.layers.GlobalAveragePooling2D()(x)
+    x = tf.keras.layers.Dense(128, activation='relu')(x)
+    outputs = tf.keras.layers.Dense(NUM_CLASSES, activation='softmax')(x)
+    tf.keras.Model(inputs, outputs).save(os.path.join(directory, 'model.h5'))
+
+    paths = {
+        'keras': os.path.join(directory, 'model.h5'),
+        'savedmodel': os.path.join(directory, 'savedmodel'),
+        'tflite': os.path.join(directory, 'model.tflite'),
+        'onnx': os.path.join(directory, 'model.onnx')
+    }
+    written = export_artifacts(paths['keras'], paths=paths)
+    return {name: path for name, path in paths.items() if name == 'keras' or name in written}
+
+
+def fixed_images():
+    return np.random.default_rng(42).random((5,) + IMAGE_SHAPE, dtype=np.float32)
+
+
+def test_backends_agree_on_fixed_images():
+    """All available backends return the same probabilities as Keras, for any batch size"""
+    images = fixed_images()
+    with tempfile.TemporaryDirectory() as tmp:
+        artifacts = build_artifacts(tmp)
+        reference = load_backend('keras', artifacts['keras']).predict(images)
+        assert reference.shape == (len(images), NUM_CLASSES)
+
+        checked = []
+        for name, path in artifacts.items():
+            try:
+                backend = load_backend(name, path, num_threads=1)
+            except ImportError as e:
+                print(f"Skipping {name} backend: {e}")
+                continue
+            for batch in (images, images[:1], images):
+                probabilities = backend.predict(batch)
+                assert probabilities.shape == (len(batch), NUM_CLASSES), name
+                assert np.allclose(probabilities, reference[:len(batch)], atol=TOLERANCE), name
+            checked.append(name)
+        assert {'keras', 'savedmodel', 'tflite'} <= set(checked)
+
+
+def test_capabilities_are_reported():
+    """Backends describe their runtime, batching and input shape"""
+    with tempfile.TemporaryDirectory() as tmp:
+        artifacts = build_artifacts(tmp)
+        for name in ('keras', 'savedmodel', 'tflite'):
+            capabilities = load_backend(name, artifacts[name], num_threads=1).capabilities
+            assert capabilities['backend'] == name
+            assert capabilities['input_shape'] == IMAGE_SHAPE
+            assert {'runtime', 'dynamic_batch', 'threads'} <= set(capabilities)
+
+
+def test_bundle_version_is_reported():
+    """Backends loaded from a bundle carry its metadata and version"""
+    with tempfile.TemporaryDirectory() as tmp:
+        build_artifacts(tmp)
+        bundle = write_bundle(tmp, [f"class {i}" for i in range(NUM_CLASSES)], IMAGE_SHAPE[:2])
+        backend = load_backend('keras', bundle_dir=tmp)
+        assert backend.bundle['class_names'] == bundle['class_names']
+        assert backend.capabilities['model_version'] == bundle['version']
+
+
+def test_unknown_backend_is_rejected():
+    """A typo in the configured backend fails loudly"""
+    try:
+        load_backend('tensorrt')
+        assert False, "expected ValueError"
+    except ValueError as e:
+        assert all(name in str(e) for name in BACKENDS)
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Inference Backend Conformance Suite")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+
+    print("=" * 50)
+    print(f"{len(tests) - failures}/{len(tests)} tests passed")
+    print("=" * 50)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared inference executor
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from inference_executor import InferenceExecutor
+
+
+class FakeModel:
+    """Returns each image's mean as its 'probability' and records batch sizes"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batch_sizes = []
+        self.threads = set()
+
+    def __call__(self, batch):
+        self.batch_sizes.append(len(batch))
+        self.threads.add(threading.get_ident())
+        time.sleep(self.delay)
+        return batch.reshape(len(batch), -1).mean(axis=1, keepdims=True)
+
+
+def images(value, count=1):
+    return np.full((count, 4, 4, 3), value, dtype=np.float32)
+
+
+def test_results_are_routed_to_each_caller():
+    """Every request gets back exactly its own rows"""
+    model = FakeModel()
+    executor = InferenceExecutor(model)
+    try:
+        assert executor.predict(images(2.0, 3)).ravel().tolist() == [2.0, 2.0, 2.0]
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(lambda i: executor.predict(images(float(i), 1 + i % 3)), range(40)))
+        for i, result in enumerate(results):
+            assert result.shape == (1 + i % 3, 1)
+            assert np.all(result == float(i))
+    finally:
+        executor.close()
+
+
+def test_concurrent_requests_are_coalesced():
+    """Requests queued while the model is busy share one forward pass, on one thread"""
+    model = FakeModel(delay=0.05)
+    executor = InferenceExecutor(model, max_batch_size=8)
+    try:
+        with ThreadPoolExecutor(16) as pool:
+            list(pool.map(lambda i: executor.predict(images(float(i))), range(16)))
+    finally:
+        executor.close()
+    assert sum(model.batch_sizes) == 16
+    assert len(model.batch_sizes) < 16
+    assert max(model.batch_sizes) <= 8
+    assert len(model.threads) == 1
+    assert executor.stats['requests'] == 16
+
+
+def test_model_errors_reach_every_waiting_caller():
+    """A failing forward pass raises in each caller and the executor keeps serving"""
+    calls = []
+
+    def flaky(batch):
+        calls.append(len(batch))
+        if len(calls) == 1:
+            raise ValueError("bad batch")
+        return batch.reshape(len(batch), -1).mean(axis=1, keepdims=True)
+
+    executor = InferenceExecutor(flaky)
+    try:
+        try:
+            executor.predict(images(1.0))
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+        assert executor.predict(images(3.0))[0, 0] == 3.0
+        assert executor.stats['errors'] == 1
+    finally:
+        executor.close()
+
+
+def test_requests_for_other_methods_are_batched_apart():
+    """A named method runs on its own batches; predictions and embeddings never share a call"""
+    class EmbeddingModel(FakeModel):
+        def embed(self, batch):
+            self.batch_sizes.append(-len(batch))
+            return np.repeat(batch.reshape(len(batch), -1).mean(axis=1, keepdims=True), 3, axis=1)
+
+    model = EmbeddingModel(delay=0.02)
+    executor = InferenceExecutor(model)
+    try:
+        with ThreadPoolExecutor(8) as pool:
+            futures = [pool.submit(executor.submit, images(float(i)), 'embed' if i % 2 else None) for i in range(16)]
+            results = [future.result().result() for future in futures]
+    finally:
+        executor.close()
+    for i, result in enumerate(results):
+        assert result.shape == ((1, 3) if i % 2 else (1, 1)) and np.all(result == float(i))
+    assert sum(size for size in model.batch_sizes if size < 0) == -8
+    assert sum(size for size in model.batch_sizes if size > 0) == 8
+
+
+def test_submit_after_close_fails():
+    """A closed executor rejects new work"""
+    executor = InferenceExecutor(FakeModel())
+    executor.close()
+    try:
+        executor.submit(images(1.0))
+        assert False, "expected RuntimeError"
+    except RuntimeError:
+        pass
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Inference Executor Test Suite")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+
+    print("=" * 50)
+    print(f"{len(tests) - failures}/{len(tests)} tests passed")
+    print("=" * 50)
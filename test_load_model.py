@@ -1,7 +1,7 @@
-import tensorflow as tf
+from inference_backends import load_backend
 
 try:
-    model = tf.keras.models.load_model('models/mango_disease_model.h5')
-    print("Model loaded successfully.")
+    backend = load_backend()
+    print(f"Model loaded successfully: {backend.capabilities}")
 except Exception as e:
     print(f"Error loading model: {e}")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test script for versioned model bundles
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from model_bundle import (BUNDLE_FILE, WEIGHTS_FILE, bundle_from_legacy_model, model_input_size, publish_bundle,
+                          read_bundle, staging_dir, verify_bundle, write_bundle)
+
+CLASSES = ['Anthracnose', 'Healthy']
+
+
+def make_bundle(directory, weights=b'weights-v1', class_names=CLASSES):
+    with open(os.path.join(directory, WEIGHTS_FILE), 'wb') as f:
+        f.write(weights)
+    return write_bundle(directory, class_names, input_size=(240, 320))
+
+
+def test_bundle_round_trip():
+    """Metadata written with the weights reads back unchanged and verifies"""
+    with tempfile.TemporaryDirectory() as tmp:
+        written = make_bundle(tmp)
+        bundle = read_bundle(tmp)
+        assert bundle == written
+        assert bundle['class_names'] == CLASSES
+        assert model_input_size(bundle) == (320, 240)
+        assert bundle['version'] == bundle['content_hash'][:12]
+        assert verify_bundle(tmp)
+
+
+def test_version_tracks_weights_and_metadata():
+    """Same content gives the same version; new weights or class order give a new one"""
+    with tempfile.TemporaryDirectory() as a, tempfile.TemporaryDirectory() as b, \
+            tempfile.TemporaryDirectory() as c, tempfile.TemporaryDirectory() as d:
+        assert make_bundle(a)['version'] == make_bundle(b)['version']
+        assert make_bundle(c, weights=b'weights-v2')['version'] != make_bundle(a)['version']
+        assert make_bundle(d, class_names=CLASSES[::-1])['version'] != make_bundle(a)['version']
+
+
+def test_tampered_weights_fail_verification():
+    """Replacing the weights without rewriting bundle.json is detected"""
+    with tempfile.TemporaryDirectory() as tmp:
+        make_bundle(tmp)
+        with open(os.path.join(tmp, WEIGHTS_FILE), 'ab') as f:
+            f.write(b'!')
+        assert not verify_bundle(tmp)
+
+
+def test_staged_weights_are_published_with_their_metadata():
+    """Checkpoints in the staging directory leave the live bundle alone until publish"""
+    with tempfile.TemporaryDirectory() as tmp:
+        live = os.path.join(tmp, 'mango_disease')
+        os.makedirs(live)
+        old = make_bundle(live)
+        staging = staging_dir(live)
+        os.makedirs(staging)
+        for epoch in range(3):
+            with open(os.path.join(staging, WEIGHTS_FILE), 'wb') as f:
+                f.write(f"checkpoint {epoch}".encode())
+            assert read_bundle(live) == old and verify_bundle(live)
+
+        new = publish_bundle(live, CLASSES, input_size=(240, 320))
+        assert new['version'] != old['version']
+        assert read_bundle(live) == new and verify_bundle(live)
+        with open(os.path.join(live, WEIGHTS_FILE), 'rb') as f:
+            assert f.read() == b'checkpoint 2'
+        assert not os.path.exists(staging)
+
+
+def test_reading_metadata_does_not_import_tensorflow():
+    """Loaders get class names and input spec without TensorFlow"""
+    with tempfile.TemporaryDirectory() as tmp:
+        make_bundle(tmp)
+        code = ("import sys, model_bundle; b = model_bundle.read_bundle(sys.argv[1]); "
+                "print('tensorflow' in sys.modules, b['class_names'][0])")
+        output = subprocess.run([sys.executable, '-c', code, tmp], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.split()
+        assert output == ['False', 'Anthracnose']
+
+
+def test_legacy_model_uses_saved_class_mapping():
+    """Pre-bundle models are wrapped with the class order from class_mapping.json"""
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = os.path.join(tmp, 'legacy.h5')
+        mapping = os.path.join(tmp, 'class_mapping.json')
+        with open(legacy, 'wb') as f:
+            f.write(b'legacy-weights')
+        with open(mapping, 'w') as f:
+            json.dump({'class_names': ['Healthy', 'Sooty Mould']}, f)
+        bundle = bundle_from_legacy_model(legacy, os.path.join(tmp, 'bundle'), mapping)
+        assert bundle['class_names'] == ['Healthy', 'Sooty Mould']
+        assert os.path.exists(os.path.join(tmp, 'bundle', BUNDLE_FILE))
+        assert verify_bundle(os.path.join(tmp, 'bundle'))
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Model Bundle Test Suite")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+
+    print("=" * 50)
+    print(f"{len(tests) - failures}/{len(tests)} tests passed")
+    print("=" * 50)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Test script for the confidence-gated model cascade
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+from model_bundle import FAST_ROLE, WEIGHTS_FILE, read_bundle, write_bundle
+from model_cascade import (ModelCascade, calibrate_thresholds, default_thresholds, escalation_mask,
+                           evaluate_cascade)
+from model_registry import ModelRegistry
+
+CLASS_NAMES = ['Bacterial Canker', 'Die Back', 'Healthy', 'Sooty Mould']
+
+
+class TableBackend:
+    """Returns the probabilities stored for each image, keyed by the image's first pixel"""
+
+    def __init__(self, bundle_dir, table):
+        self.bundle = read_bundle(bundle_dir)
+        self.path = bundle_dir
+        self.resident_bytes = 1
+        self.table = table
+        self.seen = []
+
+    def predict(self, batch):
+        keys = [int(image[0, 0, 0]) for image in batch]
+        self.seen.extend(keys)
+        return np.array([self.table[key] for key in keys], dtype=np.float32)
+
+    __call__ = predict
+
+
+def add_bundle(models_dir, name, role, class_names=CLASS_NAMES):
+    bundle_dir = os.path.join(models_dir, name)
+    os.makedirs(bundle_dir)
+    with open(os.path.join(bundle_dir, WEIGHTS_FILE), 'wb') as f:
+        f.write(name.encode())
+    return write_bundle(bundle_dir, class_names, crop='mango', role=role)
+
+
+def images(*keys):
+    batch = np.zeros((len(keys), 2, 2, 3), np.float32)
+    batch[:, 0, 0, 0] = keys
+    return batch
+
+
+def test_confident_fast_answers_skip_the_full_model():
+    """Only unsure images, or ones that might be a serious disease, reach the full model"""
+    fast_table = {
+        0: [0.00, 0.00, 0.99, 0.01],  # confident Healthy: accepted
+        1: [0.00, 0.00, 0.60, 0.40],  # unsure: escalates
+        2: [0.15, 0.00, 0.85, 0.00],  # some canker probability: escalates despite "Healthy"
+        3: [0.00, 0.00, 0.05, 0.95],  # confident Sooty Mould: accepted
+    }
+    full_table = {key: [0.0, 0.0, 0.0, 1.0] for key in fast_table}
+    with tempfile.TemporaryDirectory() as tmp:
+        add_bundle(tmp, 'mango', 'full')
+        add_bundle(tmp, 'mango_fast', FAST_ROLE)
+        backends = {}
+
+        def loader(bundle_dir):
+            table = fast_table if bundle_dir.endswith('_fast') else full_table
+            backends[os.path.basename(bundle_dir)] = TableBackend(bundle_dir, table)
+            return backends[os.path.basename(bundle_dir)]
+
+        registry = ModelRegistry(tmp, loader=loader, watch=False)
+        registry.refresh()
+        try:
+            assert registry.crops() == ['mango']
+            cascade = ModelCascade(registry)
+            predictions, class_names, stages = cascade.predict('mango', images(0, 1, 2, 3))
+            assert class_names == CLASS_NAMES
+            assert stages == ['fast', 'full', 'full', 'fast']
+            assert sorted(backends['mango'].seen) == [1, 2]
+            assert np.allclose(predictions[0], fast_table[0]) and np.allclose(predictions[1], full_table[1])
+            report = cascade.routing_report()
+            assert report['fast'] == 2 and report['full'] == 2 and report['fast_share'] == 0.5
+            assert report['escalated_by_class'] == {'Healthy': 2}
+        finally:
+            registry.close()
+
+
+def test_crops_without_fast_model_use_full_model():
+    """No fast bundle, or one with a different class order, means every image goes to the full model"""
+    with tempfile.TemporaryDirectory() as tmp:
+        add_bundle(tmp, 'mango', 'full')
+        table = {0: [0.0, 0.0, 1.0, 0.0]}
+        registry = ModelRegistry(tmp, loader=lambda bundle_dir: TableBackend(bundle_dir, table), watch=False)
+        registry.refresh()
+        try:
+            cascade = ModelCascade(registry)
+            assert cascade.predict('mango', images(0))[2] == ['full']
+            add_bundle(tmp, 'mango_fast', FAST_ROLE, class_names=CLASS_NAMES[::-1])
+            registry.refresh()
+            assert cascade.predict('mango', images(0))[2] == ['full']
+            assert cascade.routing_report()['fast'] == 0
+        finally:
+            registry.close()
+
+
+def test_calibration_meets_precision_and_protects_serious_recall():
+    """Calibrated thresholds keep accepted answers precise and never let a canker pass as Healthy"""
+    rng = np.random.default_rng(0)
+    labels = rng.integers(0, len(CLASS_NAMES), 400)
+    fast_probs = rng.dirichlet(np.ones(len(CLASS_NAMES)) * 0.3, 400)
+    # Make the fast model right most of the time, confidently so
+    right = rng.random(400) < 0.8
+    fast_probs[right] = 0.01
+    fast_probs[right, labels[right]] = 0.97
+    # A canker the fast model confidently calls Healthy, with a little canker probability
+    labels[0] = 0
+    fast_probs[0] = [0.01, 0.0, 0.99, 0.0]
+
+    thresholds = calibrate_thresholds(fast_probs, labels, CLASS_NAMES)
+    escalate = escalation_mask(fast_probs, CLASS_NAMES, thresholds)
+    accepted = ~escalate
+    predicted = fast_probs.argmax(axis=1)
+    assert escalate[0]
+    assert thresholds['watch']['Bacterial Canker'] <= 0.01
+    for index, name in enumerate(CLASS_NAMES):
+        mine = accepted & (predicted == index)
+        if mine.any():
+            target = 1.0 if name in ('Bacterial Canker', 'Die Back') else 0.98
+            assert (labels[mine] == index).mean() >= target, name
+    # Serious classes lose no recall to the fast stage
+    serious = np.isin(labels, [0, 1])
+    assert not (accepted & serious & (predicted != labels)).any()
+
+
+def test_report_compares_cascade_with_full_model():
+    """The report gives routing share, accuracy of both paths and expected latency"""
+    labels = np.array([2, 2, 3, 0])
+    fast_probs = np.array([[0, 0, 0.99, 0.01], [0, 0, 0.5, 0.5], [0, 0, 0.01, 0.99], [0.5, 0, 0.5, 0]])
+    full_probs = np.eye(4)[labels]
+    report = evaluate_cascade(fast_probs, full_probs, labels, CLASS_NAMES, default_thresholds(CLASS_NAMES),
+                              fast_ms=2.0, full_ms=20.0)
+    assert report['fast_share'] == 0.5
+    assert report['accuracy'] == report['full_accuracy'] == 1.0
+    assert report['latency_ms'] == 12.0
+    assert report['recall']['Bacterial Canker'] == {'cascade': 1.0, 'full': 1.0, 'escalated': 1.0}
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Model Cascade Test Suite")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+
+    print("=" * 50)
+    print(f"{len(tests) - failures}/{len(tests)} tests passed")
+    print("=" * 50)
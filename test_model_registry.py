@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Test script for the multi-model registry
+"""
+
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from model_bundle import WEIGHTS_FILE, read_bundle, write_bundle
+from model_registry import ModelRegistry
+
+MB = 1024 * 1024
+
+
+class FakeBackend:
+    """Stands in for a loaded model of a given size"""
+
+    def __init__(self, bundle_dir, size_mb, load_seconds=0.0):
+        time.sleep(load_seconds)
+        self.bundle = read_bundle(bundle_dir)
+        self.path = bundle_dir
+        self.resident_bytes = size_mb * MB
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+    def predict(self, batch):
+        return np.zeros((len(batch), len(self.bundle['class_names'])), dtype=np.float32)
+
+    __call__ = predict
+
+
+def add_bundle(models_dir, name, crop, weights):
+    bundle_dir = os.path.join(models_dir, name)
+    os.makedirs(bundle_dir)
+    with open(os.path.join(bundle_dir, WEIGHTS_FILE), 'wb') as f:
+        f.write(weights)
+    return write_bundle(bundle_dir, ['Healthy', 'Sick'], crop=crop)
+
+
+def make_registry(models_dir, budget_mb, sizes, loads, load_seconds=0.0):
+    def loader(bundle_dir):
+        loads.append(bundle_dir)
+        return FakeBackend(bundle_dir, sizes[os.path.basename(bundle_dir)], load_seconds)
+    registry = ModelRegistry(models_dir, memory_budget_mb=budget_mb, loader=loader, watch=False)
+    registry.refresh()
+    return registry
+
+
+def test_models_load_lazily_by_crop_and_version():
+    """Nothing loads until asked; a crop resolves to its newest version unless one is pinned"""
+    with tempfile.TemporaryDirectory() as tmp:
+        old = add_bundle(tmp, 'mango_v1', 'mango', b'v1')
+        time.sleep(1.1)  # created_at has one-second resolution
+        new = add_bundle(tmp, 'mango_v2', 'mango', b'v2')
+        add_bundle(tmp, 'grape', 'grape', b'g1')
+        loads = []
+        registry = make_registry(tmp, 1000, {'mango_v1': 10, 'mango_v2': 10, 'grape': 10}, loads)
+        try:
+            assert registry.crops() == ['grape', 'mango']
+            assert loads == []
+            assert registry.get('mango').version == new['version']
+            assert registry.get('mango', old['version']).version == old['version']
+            assert registry.get('mango') is registry.get('mango')
+            assert len(loads) == 2
+            result = registry.submit('grape', np.zeros((3, 4, 4, 3), np.float32)).result(5)
+            assert result.shape == (3, 2)
+        finally:
+            registry.close()
+
+
+def test_least_recently_used_model_is_evicted_over_budget():
+    """Loading past the memory budget closes the least recently used model"""
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ('a', 'b', 'c'):
+            add_bundle(tmp, name, name, name.encode())
+        loads = []
+        registry = make_registry(tmp, 250, {'a': 100, 'b': 100, 'c': 100}, loads)
+        try:
+            first = registry.get('a')
+            evicted = registry.get('b').current
+            registry.get('a')  # 'b' is now least recently used
+            registry.get('c')
+            assert list(registry.loaded()) == [os.path.join(tmp, 'a'), os.path.join(tmp, 'c')]
+            assert registry.resident_bytes() == 200 * MB
+            assert registry.stats['evictions'] == 1
+            assert registry.get('a') is first
+            # The evicted model's backend is released, not just its executor
+            assert evicted.closed and not first.current.closed
+
+            # Asking for the evicted model again reloads it and evicts the next LRU ('c')
+            registry.get('b')
+            assert len(loads) == 4
+            assert list(registry.loaded()) == [os.path.join(tmp, 'a'), os.path.join(tmp, 'b')]
+        finally:
+            registry.close()
+        assert first.current.closed
+
+
+def test_concurrent_first_requests_share_one_load():
+    """Many sessions asking for an unloaded model trigger a single load"""
+    with tempfile.TemporaryDirectory() as tmp:
+        add_bundle(tmp, 'mango', 'mango', b'm')
+        loads = []
+        registry = make_registry(tmp, 1000, {'mango': 50}, loads, load_seconds=0.2)
+        try:
+            with ThreadPoolExecutor(16) as pool:
+                entries = list(pool.map(lambda _: registry.get('mango'), range(16)))
+            assert len(loads) == 1
+            assert all(entry is entries[0] for entry in entries)
+            assert registry.stats['coalesced'] + registry.stats['hits'] == 15
+        finally:
+            registry.close()
+
+
+def test_submit_survives_eviction_race():
+    """A request for a model evicted after lookup is served by a fresh load"""
+    with tempfile.TemporaryDirectory() as tmp:
+        add_bundle(tmp, 'mango', 'mango', b'm')
+        loads = []
+        registry = make_registry(tmp, 1000, {'mango': 50}, loads)
+        try:
+            registry.get('mango').executor.close()  # as if evicted by another thread
+            with registry._lock:
+                registry._entries.clear()
+            assert registry.submit('mango', np.zeros((1, 4, 4, 3), np.float32)).result(5).shape == (1, 2)
+            assert len(loads) == 2
+        finally:
+            registry.close()
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Model Registry Test Suite")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+
+    print("=" * 50)
+    print(f"{len(tests) - failures}/{len(tests)} tests passed")
+    print("=" * 50)
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Test script for model hot reload and rollback
+"""
+
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+from inference_executor import InferenceExecutor
+from model_bundle import WEIGHTS_FILE, read_bundle, write_bundle
+from model_reloader import ModelReloader
+
+
+class FakeBackend:
+    """Predicts a constant per version; can block mid-batch to simulate a slow forward pass"""
+
+    def __init__(self, bundle, value, gate=None):
+        self.bundle = bundle
+        self.value = value
+        self.gate = gate
+        self.started = threading.Event()
+
+    def predict(self, batch):
+        self.started.set()
+        if self.gate is not None:
+            self.gate.wait(5)
+        return np.full((len(batch), 2), self.value, dtype=np.float32)
+
+    __call__ = predict
+
+
+def deploy(directory, weights):
+    with open(os.path.join(directory, WEIGHTS_FILE), 'wb') as f:
+        f.write(weights)
+    return write_bundle(directory, ['Healthy', 'Sick'], input_size=(4, 4))
+
+
+def image():
+    return np.zeros((1, 4, 4, 3), dtype=np.float32)
+
+
+def make_reloader(directory, initial, loader):
+    executor = InferenceExecutor(initial)
+    return executor, ModelReloader(executor, directory, loader=loader)
+
+
+def test_new_version_is_swapped_in():
+    """A newly deployed bundle is loaded, warmed up and served"""
+    with tempfile.TemporaryDirectory() as tmp:
+        executor, reloader = make_reloader(tmp, FakeBackend(deploy(tmp, b'v1'), 1.0),
+                                           lambda directory: FakeBackend(read_bundle(directory), 2.0))
+        try:
+            assert not reloader.check()
+            deploy(tmp, b'v2')
+            assert reloader.check()
+            assert reloader.version == read_bundle(tmp)['version']
+            assert executor.predict(image())[0, 0] == 2.0
+            assert reloader.previous.value == 1.0
+        finally:
+            executor.close()
+
+
+def test_in_flight_batch_finishes_on_old_model():
+    """A swap during a running batch does not change that batch's model"""
+    with tempfile.TemporaryDirectory() as tmp:
+        gate = threading.Event()
+        old = FakeBackend(deploy(tmp, b'v1'), 1.0, gate=gate)
+        executor, reloader = make_reloader(tmp, old, lambda directory: FakeBackend(read_bundle(directory), 2.0))
+        try:
+            in_flight = executor.submit(image())
+            assert old.started.wait(5)
+            deploy(tmp, b'v2')
+            assert reloader.check()
+            gate.set()
+            assert in_flight.result(5)[0, 0] == 1.0
+            assert in_flight.served_by is old
+            later = executor.submit(image())
+            assert later.result(5)[0, 0] == 2.0
+            assert later.served_by.bundle['version'] == reloader.version
+        finally:
+            gate.set()
+            executor.close()
+
+
+def test_rollback_is_instant_and_sticks():
+    """Rolling back restores the old model without reloading the bad version on the next poll"""
+    with tempfile.TemporaryDirectory() as tmp:
+        loads = []
+
+        def loader(directory):
+            loads.append(directory)
+            return FakeBackend(read_bundle(directory), 2.0)
+
+        first = deploy(tmp, b'v1')
+        executor, reloader = make_reloader(tmp, FakeBackend(first, 1.0), loader)
+        try:
+            deploy(tmp, b'v2')
+            assert reloader.check()
+            assert reloader.rollback()
+            assert reloader.version == first['version']
+            assert executor.predict(image())[0, 0] == 1.0
+            assert not reloader.check()
+            assert len(loads) == 1
+        finally:
+            executor.close()
+
+
+def test_failed_or_partial_deploys_keep_serving():
+    """Broken bundles are skipped and the current model keeps serving"""
+    with tempfile.TemporaryDirectory() as tmp:
+        def loader(directory):
+            raise RuntimeError("corrupt weights")
+
+        first = deploy(tmp, b'v1')
+        executor, reloader = make_reloader(tmp, FakeBackend(first, 1.0), loader)
+        try:
+            deploy(tmp, b'v2')
+            with open(os.path.join(tmp, WEIGHTS_FILE), 'ab') as f:
+                f.write(b'still copying')
+            assert not reloader.check()
+            assert reloader.stats['failures'] == 0
+
+            deploy(tmp, b'v3')
+            assert not reloader.check()
+            assert reloader.stats['failures'] == 1
+            assert not reloader.check()
+            assert reloader.stats['failures'] == 1
+            assert reloader.version == first['version']
+            assert executor.predict(image())[0, 0] == 1.0
+        finally:
+            executor.close()
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Model Reloader Test Suite")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+
+    print("=" * 50)
+    print(f"{len(tests) - failures}/{len(tests)} tests passed")
+    print("=" * 50)
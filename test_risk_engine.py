@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test script for the vectorized disease-risk engine
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from risk_engine import (consecutive_run_hours, evaluate_risk, forecast_to_arrays,
+                         render_risk_timeline, rolling_sum, RISK_FACTORS)
+from weather_alerts import DISEASE_RISK_THRESHOLDS, calculate_disease_risk
+
+
+def test_matches_scalar_calculation():
+    """Factor counts agree with calculate_disease_risk for every snapshot"""
+    rng = np.random.default_rng(0)
+    temperature = rng.uniform(15, 40, size=(4, 50)).round(1)
+    humidity = rng.uniform(30, 100, size=(4, 50)).round()
+    rainfall = rng.uniform(0, 20, size=(4, 50)).round(1)
+    timeline = evaluate_risk(temperature, humidity, rainfall)
+
+    for d, disease in enumerate(timeline['diseases']):
+        for l in range(4):
+            for t in range(50):
+                weather = {'temperature': temperature[l, t], 'humidity': humidity[l, t], 'rainfall': rainfall[l, t]}
+                expected = calculate_disease_risk(weather, disease)
+                assert len(expected['risk_factors']) == timeline['factor_count'][d, l, t]
+                hits = [name for name, hit in zip(RISK_FACTORS, timeline['factors'][d, l, t]) if hit]
+                assert hits == expected['risk_factors']
+
+
+def test_consecutive_run_hours():
+    """High-humidity runs reset on every break"""
+    mask = np.array([[1, 1, 0, 1, 1, 1, 0]], dtype=bool)
+    assert consecutive_run_hours(mask, 3).tolist() == [[3, 6, 0, 3, 6, 9, 0]]
+
+
+def test_rolling_sum():
+    """Rainfall windows sum the trailing steps"""
+    values = np.array([[1, 2, 3, 4, np.nan]])
+    assert rolling_sum(values, 2).tolist() == [[1, 3, 5, 7, 4]]
+
+
+def test_forecast_padding_and_render():
+    """Uneven forecasts are padded and rendered per location and disease"""
+    start = datetime(2024, 7, 1)
+    wet = [{'date': start + timedelta(hours=3 * i), 'temperature': 25, 'humidity': 90, 'rainfall': 12}
+           for i in range(8)]
+    dry = [{'date': start, 'temperature': 40, 'humidity': 20, 'rainfall': 0}]
+    locations, times, temperature, humidity, rainfall = forecast_to_arrays({'Ratnagiri': wet, 'Jalna': dry})
+    assert temperature.shape == (2, 8)
+    assert np.isnan(temperature[1, 1:]).all()
+
+    timeline = evaluate_risk(temperature, humidity, rainfall)
+    timeline['locations'] = locations
+    timeline['times'] = times
+    rendered = render_risk_timeline(timeline)
+    assert rendered['Ratnagiri']['max_humid_hours'] == 24
+    assert rendered['Ratnagiri']['diseases']['Bacterial Canker']['peak_factors'] == 3
+    assert rendered['Jalna']['diseases']['Anthracnose']['peak_factors'] == 0
+    assert set(rendered['Ratnagiri']['diseases']) == set(DISEASE_RISK_THRESHOLDS)
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Risk Engine Test Suite")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+
+    print("=" * 50)
+    print(f"{len(tests) - failures}/{len(tests)} tests passed")
+    print("=" * 50)
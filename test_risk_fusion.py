@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test script for weather-informed prior reweighting of predictions
+"""
+
+import time
+
+import numpy as np
+
+import risk_fusion
+from risk_fusion import (MAX_PRIOR_RATIO, WEATHER_SCENARIOS, evaluate_fusion, fuse_predictions, location_priors,
+                         priors_from_weather)
+
+CLASS_NAMES = ['Anthracnose', 'Bacterial Canker', 'Cutting Weevil', 'Die Back', 'Gall Midge', 'Healthy',
+               'Powdery Mildew', 'Sooty Mould']
+
+
+def test_priors_follow_the_weather_rules():
+    """Warm, wet weather favours Anthracnose and Bacterial Canker; dry, cool weather favours nothing"""
+    wet = priors_from_weather(WEATHER_SCENARIOS['Warm and wet'], CLASS_NAMES)
+    assert wet.shape == (len(CLASS_NAMES),) and wet.dtype == np.float32
+    assert np.isclose(wet[1], MAX_PRIOR_RATIO)  # every factor met for a 'Very High' risk disease
+    assert 1 < wet[0] < wet[1]
+    assert (wet[[3, 4, 5, 7]] == 1).all()  # classes without weather rules keep their prior
+    assert (priors_from_weather(WEATHER_SCENARIOS['Dry and cool'], CLASS_NAMES) == 1).all()
+    mild = priors_from_weather(WEATHER_SCENARIOS['Mild and dry'], CLASS_NAMES)
+    assert mild[6] > mild[0] > 1 and mild[1] == 1
+
+
+def test_fusion_moves_ambiguous_predictions_only():
+    """A close call tips towards the favoured disease; a confident one stays; batches match singles"""
+    priors = priors_from_weather(WEATHER_SCENARIOS['Warm and wet'], CLASS_NAMES)
+    ambiguous = np.zeros(len(CLASS_NAMES), np.float32)
+    ambiguous[[1, 7]] = 0.45, 0.55
+    confident = np.zeros(len(CLASS_NAMES), np.float32)
+    confident[[1, 7]] = 0.05, 0.95
+    assert fuse_predictions(ambiguous, priors).argmax() == 1
+    assert fuse_predictions(confident, priors).argmax() == 7
+    batch = np.stack([ambiguous, confident])
+    fused = fuse_predictions(batch, priors)
+    assert np.allclose(fused.sum(axis=1), 1) and fused.dtype == np.float32
+    assert np.allclose(fused[0], fuse_predictions(ambiguous, priors))
+    # One prior row per image, e.g. leaves from different fields
+    per_image = fuse_predictions(batch, np.stack([priors, np.ones_like(priors)]))
+    assert np.allclose(per_image[1], confident)
+    assert (batch[0] == ambiguous).all()
+
+
+def test_location_priors_are_cached():
+    """Weather is looked up once per location; fusing with cached priors takes microseconds"""
+    calls = []
+
+    def fake_weather_risk(location, language_code='en'):
+        calls.append(location)
+        if location == 'Nowhere':
+            return None
+        weather = WEATHER_SCENARIOS['Warm and wet']
+        return {'all_risks': {name: risk_fusion.calculate_disease_risk(weather, name)
+                              for name in risk_fusion.DISEASE_RISK_THRESHOLDS}}
+
+    original = risk_fusion.get_weather_risk
+    risk_fusion.get_weather_risk = fake_weather_risk
+    risk_fusion._prior_cache = risk_fusion.CellCache()
+    try:
+        first = location_priors('Lucknow, UP', CLASS_NAMES)
+        assert np.allclose(first, priors_from_weather(WEATHER_SCENARIOS['Warm and wet'], CLASS_NAMES))
+        probabilities = np.full(len(CLASS_NAMES), 1 / len(CLASS_NAMES), np.float32)
+        begin = time.perf_counter()
+        for _ in range(1000):
+            fuse_predictions(probabilities, location_priors(' lucknow, up ', CLASS_NAMES))
+        elapsed = (time.perf_counter() - begin) * 1000
+        assert calls == ['Lucknow, UP']
+        assert elapsed < 100, elapsed  # under 100 us per lookup and fusion
+        # Failed lookups are retried rather than remembered
+        assert location_priors('Nowhere', CLASS_NAMES) is None
+        assert location_priors('Nowhere', CLASS_NAMES) is None
+        assert calls.count('Nowhere') == 2
+    finally:
+        risk_fusion.get_weather_risk = original
+        risk_fusion._prior_cache = risk_fusion.CellCache(ttl=risk_fusion.PRIOR_CACHE_TTL)
+
+
+def test_report_shows_the_effect_on_accuracy():
+    """The report gives overall accuracy and the favoured diseases' recall for each scenario"""
+    rng = np.random.default_rng(0)
+    labels = rng.integers(0, len(CLASS_NAMES), 400)
+    logits = rng.normal(0, 1, (400, len(CLASS_NAMES)))
+    logits[np.arange(400), labels] += 1.5
+    # The model confuses canker with sooty mould
+    canker = labels == 1
+    logits[canker, 7] = logits[canker, 1] + rng.normal(0.2, 0.3, canker.sum())
+    predictions = np.exp(logits) / np.exp(logits).sum(axis=1, keepdims=True)
+    report = evaluate_fusion(predictions, labels, CLASS_NAMES)
+    assert set(report['scenarios']) == set(WEATHER_SCENARIOS)
+    dry = report['scenarios']['Dry and cool']
+    assert dry['accuracy'] == report['accuracy'] and dry['changed_share'] == 0 and dry['favoured'] == {}
+    wet = report['scenarios']['Warm and wet']
+    assert {'Anthracnose', 'Bacterial Canker'} <= set(wet['favoured']) and 'Sooty Mould' not in wet['favoured']
+    assert wet['favoured']['Bacterial Canker']['fused_recall'] > wet['favoured']['Bacterial Canker']['recall']
+    assert 0 < wet['changed_share'] < 0.5 and wet['us_per_image'] < 10
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Weather Fusion Test Suite")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+
+    print("=" * 50)
+    print(f"{len(tests) - failures}/{len(tests)} tests passed")
+    print("=" * 50)
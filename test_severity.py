@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test script for lesion-area severity estimation
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+from severity import estimate_severity, segment_leaf, severity_grade
+
+BACKGROUND = (205, 215, 230)  # pale bluish paper, as in the training photos
+LEAF_GREEN = (60, 120, 45)
+LESION_BROWN = (95, 60, 35)
+
+
+def leaf_photo(width=320, height=240, spots=(), leaf_colour=LEAF_GREEN):
+    """Textured leaf ellipse with round lesions; returns the image and the true lesion share (%)"""
+    img = np.full((height, width, 3), BACKGROUND, np.uint8)
+    leaf = np.zeros((height, width), np.uint8)
+    cv2.ellipse(leaf, (width // 2, height // 2), (int(width * 0.4), int(height * 0.3)), 0, 0, 360, 255, -1)
+    img[leaf > 0] = leaf_colour
+    lesion = np.zeros_like(leaf)
+    for x, y, radius in spots:
+        cv2.circle(lesion, (x, y), radius, 255, -1)
+    lesion &= leaf
+    img[lesion > 0] = LESION_BROWN
+    noise = np.random.default_rng(0).integers(-6, 7, (height, width, 1), dtype=np.int16)
+    img = np.clip(img.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+    return img, 100.0 * np.count_nonzero(lesion) / np.count_nonzero(leaf)
+
+
+def test_affected_area_matches_the_lesions():
+    """The measured share of lesion pixels is close to the drawn one"""
+    img, truth = leaf_photo(spots=((120, 100, 18), (200, 140, 22), (160, 120, 10)))
+    severity = estimate_severity(img)
+    assert abs(severity['affected_percent'] - truth) < 2.0, (severity, truth)
+    assert severity['grade'] == severity_grade(severity['affected_percent'])
+    leaf, lesion = segment_leaf(img)
+    assert not (lesion & ~leaf).any()
+
+
+def test_healthy_and_necrotic_leaves():
+    """A clean leaf has no affected area; a leaf browned all over is fully affected"""
+    healthy = estimate_severity(leaf_photo()[0])
+    assert healthy['affected_percent'] < 1.0 and healthy['grade'] == 'None'
+    # Yellowing is not a lesion by itself: spots are judged against the leaf's own colour
+    yellowed, truth = leaf_photo(spots=((160, 120, 20),), leaf_colour=(170, 160, 60))
+    assert abs(estimate_severity(yellowed)['affected_percent'] - truth) < 2.0
+    dead = estimate_severity(leaf_photo(leaf_colour=LESION_BROWN)[0])
+    assert dead['affected_percent'] > 95 and dead['grade'] == 'Very High'
+
+
+def test_grades_and_missing_leaf():
+    """Grades follow the configured bounds; an image without a leaf gives no estimate"""
+    assert [severity_grade(p) for p in (0, 3, 10, 20, 60)] == ['None', 'Low', 'Moderate', 'High', 'Very High']
+    assert estimate_severity(np.full((240, 320, 3), BACKGROUND, np.uint8)) is None
+
+
+def test_large_decoded_image_is_fast_and_untouched():
+    """A working-resolution image is measured in milliseconds without modifying the buffer"""
+    img, truth = leaf_photo(1280, 960, spots=((500, 400, 70), (800, 560, 90)))
+    original = img.copy()
+    estimate_severity(img)
+    begin = time.perf_counter()
+    severity = estimate_severity(img)
+    elapsed = (time.perf_counter() - begin) * 1000
+    assert abs(severity['affected_percent'] - truth) < 2.0
+    assert (img == original).all()
+    assert elapsed < 50, elapsed
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Severity Estimation Test Suite")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+
+    print("=" * 50)
+    print(f"{len(tests) - failures}/{len(tests)} tests passed")
+    print("=" * 50)
@@ -5,6 +5,7 @@ Test script to verify TensorFlow and model loading functionality
 
 import tensorflow as tf
 import os
+from inference_backends import INFERENCE_BACKEND, MODEL_PATHS, load_backend
 
 def test_tensorflow():
     """Test basic TensorFlow functionality"""
@@ -34,7 +35,7 @@ def test_model_loading():
     """Test model loading functionality"""
     print("\nTesting model loading...")
     
-    model_path = 'models/mango_disease_model.h5'
+    model_path = MODEL_PATHS[INFERENCE_BACKEND]
     
     if not os.path.exists(model_path):
         print(f"⚠️ Model file not found: {model_path}")
@@ -42,10 +43,12 @@ def test_model_loading():
         return True
     
     try:
-        model = tf.keras.models.load_model(model_path)
+        backend = load_backend(INFERENCE_BACKEND)
         print(f"✅ Model loaded successfully from {model_path}")
-        print(f"Model summary:")
-        model.summary()
+        print(f"Backend capabilities: {backend.capabilities}")
+        if hasattr(backend, 'model'):
+            print(f"Model summary:")
+            backend.model.summary()
         return True
         
     except Exception as e:
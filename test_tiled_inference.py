@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test script for tiled inference on high-resolution and multi-leaf photos
+"""
+
+import io
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from tiled_inference import (MAX_TILES, TILE_SOURCE_MAX_SIDE, aggregate_tiles, find_leaf_regions, load_tiles,
+                             plan_tiles, tile_batch)
+
+CLASS_NAMES = ['Anthracnose', 'Healthy', 'Sooty Mould']
+
+
+def branch_photo(width=4000, height=3000, leaves=((800, 700), (2600, 900), (1500, 2200)), axes=(350, 140)):
+    """Pale background with textured green leaf ellipses"""
+    rng = np.random.default_rng(0)
+    img = np.full((height, width, 3), (205, 215, 230), np.uint8)
+    for i, (x, y) in enumerate(leaves):
+        cv2.ellipse(img, (x, y), axes, 20 * i, 0, 360, (55, 130, 45), -1)
+    noise = rng.integers(-12, 13, (height, width, 1), dtype=np.int16)
+    return np.clip(img.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+
+def test_one_tile_per_leaf():
+    """Each separate leaf becomes one square tile that contains it"""
+    img = branch_photo(2000, 1500, leaves=((400, 350), (1300, 450), (750, 1100)), axes=(175, 70))
+    regions = find_leaf_regions(img)
+    assert len(regions) == 3, regions
+    tiles = plan_tiles(img.shape, regions)
+    assert len(tiles) == 3
+    for (x, y, w, h), (rx, ry, rw, rh) in zip(tiles, regions):
+        assert w == h and 0 <= x and 0 <= y and x + w <= 2000 and y + h <= 1500
+        assert x <= rx and y <= ry and x + w >= rx + rw and y + h >= ry + rh
+
+
+def test_sliding_window_fallback_covers_the_image():
+    """Without leaf regions, windows tile the whole image edge to edge"""
+    tiles = plan_tiles((1000, 1200, 3), [])
+    assert len(tiles) == 9
+    assert min(x for x, _, _, _ in tiles) == 0 and max(x + w for x, _, w, _ in tiles) == 1200
+    assert min(y for _, y, _, _ in tiles) == 0 and max(y + h for _, y, _, h in tiles) == 1000
+    # Images smaller than a window get one tile of the whole short side
+    assert plan_tiles((300, 400, 3), []) == [(50, 0, 300, 300)]
+
+
+def test_tiles_are_resized_into_one_batch():
+    """tile_batch fills a preallocated uint8 batch from views of the image"""
+    img = np.zeros((600, 800, 3), np.uint8)
+    img[:, 400:] = 200
+    batch = tile_batch(img, [(0, 0, 400, 400), (400, 100, 400, 400)], (32, 32))
+    assert batch.shape == (2, 32, 32, 3) and batch.dtype == np.uint8
+    assert (batch[0] == 0).all() and (batch[1] == 200).all()
+
+
+def test_large_photo_memory_is_bounded():
+    """A 4000x3000 photo is decoded at capped resolution and gives at most MAX_TILES tiles"""
+    buffer = io.BytesIO()
+    Image.fromarray(branch_photo()).save(buffer, format='JPEG', quality=85)
+    image, boxes, batch, skipped = load_tiles(buffer.getvalue(), (224, 224))
+    assert max(image.shape[:2]) <= TILE_SOURCE_MAX_SIDE
+    assert len(boxes) == 3 and batch.shape == (3, 224, 224, 3) and skipped == 0
+    many = plan_tiles((2048, 2048, 3), [(x, y, 60, 60) for x in range(0, 2000, 200) for y in range(0, 2000, 200)])
+    assert len(many) == MAX_TILES
+
+
+def test_tiles_covering_the_most_leaf_are_kept():
+    """Beyond the batch cap, windows holding no leaf make way for whole leaves, and the rest are counted"""
+    img = branch_photo(2000, 2000, leaves=(), axes=(0, 0))
+    # A long diagonal twig is the largest region; most sliding windows over its box are background
+    cv2.line(img, (100, 100), (1300, 1300), (55, 130, 45), 60)
+    leaves = [(1750, 200), (1750, 550), (1750, 900), (1750, 1250), (1750, 1700), (1300, 1750), (900, 1750),
+              (500, 1750)]
+    for x, y in leaves:
+        cv2.circle(img, (x, y), 100, (55, 130, 45), -1)
+    buffer = io.BytesIO()
+    Image.fromarray(img).save(buffer, format='PNG')
+    _, boxes, batch, skipped = load_tiles(buffer.getvalue(), (64, 64), max_tiles=16)
+    assert len(boxes) == 16 and len(batch) == 16 and skipped > 0
+    assert all(any(bx <= x < bx + w and by <= y < by + h for bx, by, w, h in boxes) for x, y in leaves)
+    assert all(any(bx <= p < bx + w and by <= p < by + h for bx, by, w, h in boxes) for p in (150, 700, 1250))
+
+
+def test_one_diseased_region_decides_the_verdict():
+    """A confidently diseased tile makes the image diseased even if most tiles are healthy"""
+    boxes = [(0, 0, 10, 10), (10, 0, 10, 10), (20, 0, 10, 10)]
+    predictions = np.array([[0.05, 0.9, 0.05], [0.1, 0.85, 0.05], [0.8, 0.15, 0.05]])
+    verdict = aggregate_tiles(predictions, boxes, CLASS_NAMES)
+    assert verdict['predicted_class'] == 'Anthracnose' and round(verdict['confidence']) == 80
+    assert verdict['diseased_regions'] == 1
+    assert [region['predicted_class'] for region in verdict['regions']] == ['Healthy', 'Healthy', 'Anthracnose']
+
+    unsure = np.array([[0.05, 0.9, 0.05], [0.45, 0.5, 0.05]])
+    verdict = aggregate_tiles(unsure, boxes[:2], CLASS_NAMES)
+    assert verdict['predicted_class'] == 'Healthy' and verdict['diseased_regions'] == 0
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Tiled Inference Test Suite")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+
+    print("=" * 50)
+    print(f"{len(tests) - failures}/{len(tests)} tests passed")
+    print("=" * 50)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test script for video scanning with frame sampling and temporal smoothing
+"""
+
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from video_scanner import FrameReader, build_timeline, scan_video, smooth_predictions
+
+FPS = 30
+SIZE = (32, 32)
+CLASS_NAMES = ['Healthy', 'Sooty Mould']
+
+
+def write_video(path, seconds, frame_fn, size=(320, 240)):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), FPS, size)
+    for index in range(int(seconds * FPS)):
+        writer.write(frame_fn(index / FPS, size))
+    writer.release()
+
+
+def walking_frame(t, size):
+    """Leaves passing by: green for the first half of the row, dark for the second (BGR)"""
+    width, height = size
+    frame = np.full((height, width, 3), (230, 215, 205), np.uint8)
+    colour = (50, 140, 60) if t < 3 else (30, 40, 45)
+    for i in range(6):
+        x = int((i * 90 - t * 200) % (width + 100)) - 50
+        cv2.ellipse(frame, (x, height // 2 + (i % 3 - 1) * 60), (40, 18), 20 * i, 0, 360, colour, -1)
+    return frame
+
+
+def colour_model(batch):
+    """Stand-in classifier: frames with dark leaves are sooty, others healthy"""
+    dark_share = (batch.mean(axis=3) < 0.3).mean(axis=(1, 2))
+    p_sooty = 1 / (1 + np.exp(-(dark_share - 0.05) * 100))
+    return np.stack([1 - p_sooty, p_sooty], axis=1), CLASS_NAMES
+
+
+def test_near_identical_frames_are_skipped():
+    """A still scene is sampled once per gap; a moving one at every checked frame that changed"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'still.avi')
+        write_video(path, 6, lambda t, size: walking_frame(0 if t < 3 else t, size))
+        reader = FrameReader(path, SIZE).start()
+        timestamps = []
+        while (item := reader.frames.get()) is not None:
+            timestamps.append(item[0])
+            assert item[1].shape == SIZE[::-1] + (3,) and item[1].dtype == np.uint8
+        reader.stop()
+        assert reader.stats['frames'] == 6 * FPS and reader.stats['checked'] == 60
+        still = [t for t in timestamps if t < 3]
+        assert len(still) == 2  # first frame and one re-check after MAX_SAMPLE_GAP
+        assert len(timestamps) - len(still) > 20
+
+
+def test_smoothing_removes_single_frame_flicker():
+    """One outlier frame does not flip the smoothed class; a lasting change does"""
+    predictions = np.array([[0.9, 0.1]] * 10 + [[0.1, 0.9]] + [[0.9, 0.1]] * 10 + [[0.2, 0.8]] * 10)
+    smoothed = smooth_predictions(predictions)
+    labels = smoothed.argmax(axis=1)
+    assert (labels[:21] == 0).all() and (labels[-5:] == 1).all()
+    timeline = build_timeline(np.arange(31) * 0.5, smoothed, CLASS_NAMES, end_time=16.0)
+    assert [segment['predicted_class'] for segment in timeline] == CLASS_NAMES
+    assert timeline[0]['start'] == 0 and timeline[-1]['end'] == 16.0
+    assert timeline[0]['end'] == timeline[1]['start']
+    assert sum(segment['frames'] for segment in timeline) == 31
+
+
+def test_short_segments_are_merged():
+    """A run shorter than the minimum is absorbed by the segment before it"""
+    smoothed = np.array([[0.9, 0.1]] * 4 + [[0.4, 0.6]] + [[0.9, 0.1]] * 4, np.float32)
+    timeline = build_timeline(np.arange(9) * 0.5, smoothed, CLASS_NAMES, min_seconds=1.0)
+    assert len(timeline) == 1 and timeline[0]['predicted_class'] == 'Healthy' and timeline[0]['frames'] == 9
+
+
+def test_scan_gives_a_timeline_faster_than_real_time():
+    """A walk past healthy then sooty leaves becomes two segments split near the change"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'walk.avi')
+        write_video(path, 6, walking_frame)
+        scan = scan_video(path, colour_model, SIZE, {'scale': 1 / 255, 'offset': 0.0})
+    timeline = scan['timeline']
+    assert [segment['predicted_class'] for segment in timeline] == CLASS_NAMES, timeline
+    assert 2.9 <= timeline[1]['start'] <= 3.8
+    assert timeline[-1]['end'] == 6.0
+    assert scan['stats']['realtime_factor'] > 1
+    assert len(scan['timestamps']) == len(scan['smoothed']) == scan['stats']['classified']
+
+
+def test_queue_is_bounded_and_batches_grow_when_the_model_lags():
+    """A slow classifier makes the file reader wait; frames are batched instead of piling up"""
+    batch_sizes = []
+
+    def slow_model(batch):
+        batch_sizes.append(len(batch))
+        time.sleep(0.05)
+        return colour_model(batch)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'walk.avi')
+        write_video(path, 4, walking_frame)
+        scan = scan_video(path, slow_model, SIZE, batch_size=8)
+        assert scan['stats']['dropped'] == 0 and scan['stats']['classified'] == scan['stats']['sampled']
+        assert max(batch_sizes) > 1
+
+        # A live source never waits: the oldest frames are dropped instead
+        reader = FrameReader(path, SIZE, live=True, queue_size=2).start()
+        time.sleep(1.0)
+        assert reader.frames.qsize() <= 2 and reader.stats['dropped'] > 0
+        reader.stop()
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Video Scanner Test Suite")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+
+    print("=" * 50)
+    print(f"{len(tests) - failures}/{len(tests)} tests passed")
+    print("=" * 50)
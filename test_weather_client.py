@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Test script for the pooled weather client against the local stub server
+"""
+
+import tempfile
+import threading
+
+import requests
+
+from weather_client import WeatherClient, normalize_location
+from weather_stub_server import StubWeatherServer
+import weather_alerts
+
+
+def make_client(server, **kwargs):
+    return WeatherClient('test-key', server.weather_url, server.forecast_url, **kwargs)
+
+
+def test_normalize_location():
+    """Equivalent spellings normalize to the same key"""
+    assert normalize_location('  Ratnagiri ,MH ') == normalize_location('ratnagiri, mh')
+    assert normalize_location('Mumbai') == 'mumbai'
+
+
+def test_ttl_cache_hits():
+    """Repeated lookups within the TTL are served from memory"""
+    with StubWeatherServer() as server:
+        client = make_client(server)
+        first = client.get_current('Ratnagiri')
+        second = client.get_current('ratnagiri')
+        assert first == second
+        assert server.request_count == 1
+        assert client.stats['hits'] == 1
+        client.close()
+
+
+def test_ttl_expiry():
+    """Expired entries trigger a new upstream call"""
+    with StubWeatherServer() as server:
+        client = make_client(server, weather_ttl=0)
+        client.get_current('Pune')
+        client.get_current('Pune')
+        assert server.request_count == 2
+        client.close()
+
+
+def test_disk_cache_survives_restart():
+    """A second client with the same cache directory does not hit upstream"""
+    with StubWeatherServer() as server, tempfile.TemporaryDirectory() as cache_dir:
+        make_client(server, cache_dir=cache_dir).get_forecast('Nashik')
+        client = make_client(server, cache_dir=cache_dir)
+        data = client.get_forecast('Nashik')
+        assert data['list']
+        assert server.request_count == 1
+        assert client.stats['disk_hits'] == 1
+
+
+def test_single_flight_coalescing():
+    """Concurrent lookups for one location share a single upstream call"""
+    with StubWeatherServer(latency=0.2) as server:
+        client = make_client(server)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(client.get_current('Dapoli')))
+                   for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(results) == 20
+        assert all(result == results[0] for result in results)
+        assert server.request_count == 1
+        client.close()
+
+
+def test_unknown_location_not_cached():
+    """Failed lookups return None and are retried next time"""
+    with StubWeatherServer() as server:
+        client = make_client(server)
+        assert client.get_current('Nowhere') is None
+        assert client.get_current('Nowhere') is None
+        assert server.request_count == 2
+        client.close()
+
+
+def test_upstream_errors_raise():
+    """Rate limiting and bad keys raise instead of looking like an unknown city"""
+    with StubWeatherServer() as server:
+        client = make_client(server)
+        for location in ['RateLimited', 'BadKey']:
+            try:
+                client.get_current(location)
+            except requests.HTTPError:
+                pass
+            else:
+                raise AssertionError(f"{location} did not raise")
+        client.close()
+
+
+def test_cache_is_bounded():
+    """The in-memory cache evicts least recently used entries beyond its cap"""
+    with StubWeatherServer() as server:
+        client = make_client(server, max_entries=3)
+        for location in ['A', 'B', 'C', 'D']:
+            client.get_current(location)
+        assert len(client._cache) == 3
+        client.get_current('B')
+        assert server.request_count == 4
+        client.get_current('A')
+        assert server.request_count == 5
+        client.close()
+
+
+def test_set_weather_client_closes_previous():
+    """Swapping the shared client closes the old pooled session"""
+    with StubWeatherServer() as server:
+        old = make_client(server)
+        closed = []
+        old.close = lambda: closed.append(True)
+        weather_alerts.set_weather_client(old)
+        weather_alerts.set_weather_client(None)
+        assert closed == [True]
+
+
+def test_weather_alerts_uses_shared_client():
+    """get_weather_risk goes through the configured shared client"""
+    with StubWeatherServer() as server:
+        weather_alerts.set_location_resolver(None)
+        weather_alerts.set_observation_store(None)
+        weather_alerts.set_weather_client(make_client(server))
+        try:
+            risk = weather_alerts.get_weather_risk('Ratnagiri')
+            forecast = weather_alerts.get_forecast_data('Ratnagiri', days=1)
+            assert risk is not None and 'all_risks' in risk
+            assert len(forecast) == 8
+            weather_alerts.get_weather_risk('Ratnagiri')
+            assert server.request_count == 2
+        finally:
+            weather_alerts.set_weather_client(None)
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Weather Client Test Suite")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+
+    print("=" * 50)
+    print(f"{len(tests) - failures}/{len(tests)} tests passed")
+    print("=" * 50)
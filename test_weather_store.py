@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test script for the append-only weather observation store and threshold backtest
+"""
+
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+import weather_alerts
+from weather_client import WeatherClient
+from weather_store import FORECAST, WeatherStore, backtest_thresholds
+from weather_stub_server import StubWeatherServer
+
+START = datetime(2024, 6, 25, tzinfo=timezone.utc)
+
+
+def hourly(hours, temperature, humidity, rainfall):
+    return [{'timestamp': START + timedelta(hours=h), 'temperature': temperature,
+             'humidity': humidity, 'rainfall': rainfall} for h in range(hours)]
+
+
+def test_append_and_range_query_across_months():
+    """Rows spanning a month boundary come back sorted and filtered"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = WeatherStore(tmp)
+        store.append('q:ratnagiri', hourly(24 * 10, 25, 85, 6))
+        store.append('q:pune', hourly(24, 30, 40, 0))
+
+        everything = store.query('q:ratnagiri')
+        assert len(everything['timestamp']) == 240
+        assert np.all(np.diff(everything['timestamp']) > 0)
+
+        july = store.query('q:ratnagiri', start=datetime(2024, 7, 1, tzinfo=timezone.utc))
+        assert len(july['timestamp']) == 240 - 6 * 24
+        assert len(store.query('q:pune')['timestamp']) == 24
+        assert len(store.query('q:unknown')['timestamp']) == 0
+
+
+def test_torn_append_is_ignored():
+    """A partially written row is not visible to readers"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = WeatherStore(tmp)
+        store.append('q:ratnagiri', hourly(3, 25, 85, 6))
+        with open(f"{tmp}/2024-06/temperature.bin", 'ab') as f:
+            f.write(np.float32(1).tobytes())
+        assert len(store.query('q:ratnagiri')['timestamp']) == 3
+
+
+def test_append_after_torn_append_stays_aligned():
+    """The next append drops the torn tail, so every column lines up again"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = WeatherStore(tmp)
+        store.append('q:ratnagiri', hourly(3, 25, 85, 6))
+        with open(f"{tmp}/2024-06/temperature.bin", 'ab') as f:
+            f.write(np.float32(99).tobytes())
+        with open(f"{tmp}/2024-06/humidity.bin", 'ab') as f:
+            f.write(b'\x00\x01')
+        store.append('q:pune', hourly(2, 30, 40, 0))
+        pune = store.query('q:pune')
+        assert pune['temperature'].tolist() == [30, 30] and pune['humidity'].tolist() == [40, 40]
+        assert store.query('q:ratnagiri')['temperature'].tolist() == [25, 25, 25]
+
+
+def test_backtest_precision_and_recall():
+    """Alerts before a recorded outbreak count as hits, others as false alarms"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = WeatherStore(tmp)
+        store.append('q:ratnagiri', hourly(48, 25, 85, 6))
+        store.append('q:jalna', hourly(48, 25, 85, 6))
+        outbreaks = [{'location': 'q:ratnagiri', 'disease': 'Anthracnose', 'date': START + timedelta(days=3)}]
+        report = backtest_thresholds(store, outbreaks)
+        assert report['Anthracnose']['alerts'] == 96
+        assert report['Anthracnose']['precision'] == 0.5
+        assert report['Anthracnose']['recall'] == 1.0
+
+
+def test_fetches_are_recorded_once():
+    """Repeated fetches of a cached reading append a single observation"""
+    with StubWeatherServer() as server, tempfile.TemporaryDirectory() as tmp:
+        store = WeatherStore(tmp)
+        weather_alerts.set_location_resolver(None)
+        weather_alerts.set_observation_store(store)
+        weather_alerts.set_weather_client(WeatherClient('test-key', server.weather_url, server.forecast_url))
+        try:
+            for _ in range(3):
+                weather_alerts.get_weather_risk('Ratnagiri')
+                weather_alerts.get_forecast_data('Ratnagiri')
+        finally:
+            weather_alerts.set_observation_store(None)
+            weather_alerts.set_weather_client(None)
+        assert len(store.query('q:ratnagiri')['timestamp']) == 1
+        assert len(store.query('q:ratnagiri', kind=FORECAST)['timestamp']) == 24
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Weather Store Test Suite")
+    print("=" * 50)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+
+    print("=" * 50)
+    print(f"{len(tests) - failures}/{len(tests)} tests passed")
+    print("=" * 50)
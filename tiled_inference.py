@@ -0,0 +1,171 @@
+"""
+Tiled inference for high-resolution and multi-leaf photos
+
+Squashing a whole phone photo to the model input loses small lesions. In
+tiled mode the photo is decoded at a higher (but capped) resolution, leaf
+regions are found by colour segmentation on a small copy, and each region,
+or a sliding window over it when it is large, becomes one tile. When there
+are more tiles than fit in a batch, the ones covering the most leaf are kept
+and the rest are counted as skipped. Tiles are array views of the decoded image, resized straight into a preallocated
+batch that goes through the model in one pass. Tile predictions are then
+combined into an image-level verdict with one box per tile.
+"""
+
+import cv2
+import numpy as np
+
+from image_pipeline import decode_image
+from image_quality import leaf_mask
+
+# Tiling configuration
+TILE_SOURCE_MAX_SIDE = 2048  # decode resolution for tiling; bounds memory for any photo size
+SEGMENT_MAX_SIDE = 512  # resolution the leaf mask is computed at
+MIN_REGION_FRACTION = 0.003  # ignore leaf blobs smaller than this share of the image
+REGION_MARGIN = 0.1  # context added around a region on each side
+MAX_TILE_SIDE = 768  # regions larger than this are covered by sliding windows
+WINDOW_SIDE = 512
+WINDOW_STRIDE = 384
+MAX_TILES = 24  # caps batch memory: 24 x 224 x 224 x 3 floats is about 14 MB
+TILE_DISEASE_THRESHOLD = 0.6  # a tile must be this sure before it makes the image diseased
+HEALTHY_CLASS = 'Healthy'
+
+
+def segment_leaves(image):
+    """Leaf mask of a downscaled copy of the image, and the scale it was computed at"""
+    height, width = image.shape[:2]
+    scale = min(1.0, SEGMENT_MAX_SIDE / max(height, width))
+    small = cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))),
+                       interpolation=cv2.INTER_AREA) if scale < 1.0 else image
+    mask = leaf_mask(small)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, np.ones((3, 3), np.uint8))
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, np.ones((9, 9), np.uint8))
+    return mask, scale
+
+
+def find_leaf_regions(image, min_fraction=MIN_REGION_FRACTION, segmentation=None):
+    """Bounding boxes (x, y, w, h) of leaf-coloured blobs, largest first"""
+    mask, scale = segmentation if segmentation is not None else segment_leaves(image)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+    min_area = min_fraction * mask.size
+    regions = [stats[i] for i in range(1, count) if stats[i, cv2.CC_STAT_AREA] >= min_area]
+    regions.sort(key=lambda stat: -stat[cv2.CC_STAT_AREA])
+    return [tuple(int(round(value / scale)) for value in stat[:4]) for stat in regions]
+
+
+def _windows(x, y, w, h, side=WINDOW_SIDE, stride=WINDOW_STRIDE):
+    """Evenly spaced square windows covering a box, at most stride apart"""
+    def starts(origin, length):
+        if length <= side:
+            return [origin + (length - side) // 2]
+        count = -(-(length - side) // stride) + 1
+        return [origin + round(i * (length - side) / (count - 1)) for i in range(count)]
+    return [(wx, wy, side, side) for wy in starts(y, h) for wx in starts(x, w)]
+
+
+def _clamp(box, width, height):
+    """Shift a square box inside the image, shrinking it only if the image is smaller"""
+    x, y, w, h = box
+    side = min(w, h, width, height)
+    x = min(max(0, x + (w - side) // 2), width - side)
+    y = min(max(0, y + (h - side) // 2), height - side)
+    return x, y, side, side
+
+
+def plan_tiles(image_shape, regions, max_tiles=MAX_TILES):
+    """Square tiles for each region (sliding windows over large ones, or over the whole image)"""
+    height, width = image_shape[:2]
+    boxes = []
+    for x, y, w, h in regions:
+        margin = int(max(w, h) * REGION_MARGIN)
+        side = max(w, h) + 2 * margin
+        if side <= MAX_TILE_SIDE:
+            boxes.append((x + w // 2 - side // 2, y + h // 2 - side // 2, side, side))
+        else:
+            boxes.extend(_windows(x - margin, y - margin, w + 2 * margin, h + 2 * margin))
+    if not boxes:
+        boxes = _windows(0, 0, width, height)
+    tiles = []
+    for box in boxes:
+        box = _clamp(box, width, height)
+        if box not in tiles:
+            tiles.append(box)
+    return tiles[:max_tiles]
+
+
+def select_tiles(tiles, segmentation, max_tiles=MAX_TILES):
+    """The max_tiles tiles covering the most leaf, in their planned order, and how many were skipped"""
+    if len(tiles) <= max_tiles:
+        return tiles, 0
+    mask, scale = segmentation
+    # Leaf pixels inside each box from one integral image of the small mask
+    integral = cv2.integral((mask > 0).astype(np.uint8))
+    limit_y, limit_x = mask.shape
+    areas = []
+    for x, y, w, h in tiles:
+        x0, y0 = min(int(x * scale), limit_x), min(int(y * scale), limit_y)
+        x1, y1 = min(int(round((x + w) * scale)), limit_x), min(int(round((y + h) * scale)), limit_y)
+        areas.append(integral[y1, x1] - integral[y0, x1] - integral[y1, x0] + integral[y0, x0])
+    keep = np.sort(np.argsort(-np.asarray(areas), kind='stable')[:max_tiles])
+    return [tiles[i] for i in keep], len(tiles) - max_tiles
+
+
+def tile_batch(image, boxes, input_size):
+    """(N, H, W, 3) uint8 model inputs; input_size is (width, height) as for PIL"""
+    width, height = input_size
+    batch = np.empty((len(boxes), height, width, 3), dtype=np.uint8)
+    for i, (x, y, w, h) in enumerate(boxes):
+        # Slicing is a view; resize writes straight into the batch
+        cv2.resize(image[y:y + h, x:x + w], (width, height), dst=batch[i], interpolation=cv2.INTER_AREA)
+    return batch
+
+
+def load_tiles(data, input_size, max_tiles=MAX_TILES):
+    """Decode upload bytes at tiling resolution; returns (image, boxes, uint8 batch, skipped tile count)"""
+    image = np.asarray(decode_image(data, TILE_SOURCE_MAX_SIDE))
+    segmentation = segment_leaves(image)
+    tiles = plan_tiles(image.shape, find_leaf_regions(image, segmentation=segmentation), max_tiles=None)
+    boxes, skipped = select_tiles(tiles, segmentation, max_tiles)
+    return image, boxes, tile_batch(image, boxes, input_size), skipped
+
+
+def aggregate_tiles(predictions, boxes, class_names, threshold=TILE_DISEASE_THRESHOLD):
+    """Image-level verdict from tile predictions
+
+    The image is diseased if any tile is confidently diseased; the verdict
+    is the most confident such tile's class. Otherwise it is the class with
+    the highest mean probability across tiles.
+    """
+    predictions = np.asarray(predictions)
+    regions = [{'box': box, 'predicted_class': class_names[int(np.argmax(probabilities))],
+                'confidence': float(np.max(probabilities) * 100)}
+               for box, probabilities in zip(boxes, predictions)]
+    mean_probabilities = predictions.mean(axis=0)
+    diseased = [region for region in regions
+                if region['predicted_class'] != HEALTHY_CLASS and region['confidence'] >= threshold * 100]
+    if diseased:
+        worst = max(diseased, key=lambda region: region['confidence'])
+        predicted_class, confidence = worst['predicted_class'], worst['confidence']
+    else:
+        index = int(np.argmax(mean_probabilities))
+        predicted_class, confidence = class_names[index], float(mean_probabilities[index] * 100)
+    return {
+        'predicted_class': predicted_class,
+        'confidence': confidence,
+        'probabilities': mean_probabilities,
+        'regions': regions,
+        'diseased_regions': len(diseased)
+    }
+
+
+def draw_regions(image, regions, max_side=768):
+    """Downscaled copy of the image with a labelled box per tile (red: diseased, green: healthy)"""
+    height, width = image.shape[:2]
+    scale = min(1.0, max_side / max(height, width))
+    canvas = cv2.resize(image, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+    for region in regions:
+        x, y, w, h = (int(value * scale) for value in region['box'])
+        color = (40, 180, 60) if region['predicted_class'] == HEALTHY_CLASS else (220, 40, 40)
+        cv2.rectangle(canvas, (x, y), (x + w - 1, y + h - 1), color, 2)
+        label = f"{region['predicted_class']} {region['confidence']:.0f}%"
+        cv2.putText(canvas, label, (x + 4, y + 16), cv2.FONT_HERSHEY_SIMPLEX, 0.45, color, 1, cv2.LINE_AA)
+    return canvas
@@ -1,29 +1,39 @@
 import tensorflow as tf
 from tensorflow.keras.preprocessing.image import ImageDataGenerator
 from tensorflow.keras.applications import MobileNetV2
-from tensorflow.keras.layers import Dense, GlobalAveragePooling2D, Dropout
+from tensorflow.keras.layers import Dense, GlobalAveragePooling2D, Dropout, Input, Resizing
 from tensorflow.keras.models import Model
 from tensorflow.keras.optimizers import Adam
 import os
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
 from sklearn.metrics import classification_report, confusion_matrix
 import seaborn as sns
+from model_bundle import (DEFAULT_INPUT_SIZE, DEFAULT_NORMALIZATION, FAST_MODEL_BUNDLE_DIR, FAST_ROLE,
+                          MODEL_BUNDLE_DIR, WEIGHTS_FILE, publish_bundle, staging_dir)
 
 # Configuration
-IMG_SIZE = (224, 224)
+IMG_SIZE = DEFAULT_INPUT_SIZE
 BATCH_SIZE = 32
 EPOCHS = 50
 LEARNING_RATE = 0.0001
 DATASET_PATH = 'dataset/archive'  # Fixed path to actual dataset
-MODEL_SAVE_PATH = 'models/mango_disease_model.h5'
+# Checkpoints and the final model go to a staging directory; the live bundle only changes on publish
+MODEL_SAVE_PATH = os.path.join(staging_dir(MODEL_BUNDLE_DIR), WEIGHTS_FILE)
+
+# Fast cascade model: a slim MobileNetV2 that downsamples the same input internally
+FAST_IMG_SIZE = (96, 96)
+FAST_ALPHA = 0.35
+FAST_EPOCHS = 20
+FAST_MODEL_SAVE_PATH = os.path.join(staging_dir(FAST_MODEL_BUNDLE_DIR), WEIGHTS_FILE)
 
 def create_data_generators(dataset_path):
     """Create data generators for training and validation"""
     
     # Data augmentation for training
     train_datagen = ImageDataGenerator(
-        rescale=1./255,
+        rescale=DEFAULT_NORMALIZATION['scale'],
         rotation_range=20,
         width_shift_range=0.2,
         height_shift_range=0.2,
@@ -36,7 +46,7 @@ def create_data_generators(dataset_path):
     
     # Only rescaling for validation
     val_datagen = ImageDataGenerator(
-        rescale=1./255,
+        rescale=DEFAULT_NORMALIZATION['scale'],
         validation_split=0.2
     )
     
@@ -69,7 +79,7 @@ def build_model(num_classes):
     base_model = MobileNetV2(
         weights='imagenet',
         include_top=False,
-        input_shape=(224, 224, 3)
+        input_shape=IMG_SIZE + (3,)
     )
     
     # Freeze base model layers initially
@@ -88,6 +98,52 @@ def build_model(num_classes):
     
     return model, base_model
 
+def build_fast_model(num_classes):
+    """Build the small first-stage model of the cascade
+    
+    It takes the same input as the full model and resizes inside the graph,
+    so both stages share one preprocessed batch.
+    """
+    inputs = Input(shape=IMG_SIZE + (3,))
+    x = Resizing(*FAST_IMG_SIZE)(inputs)
+    base_model = MobileNetV2(
+        weights='imagenet',
+        include_top=False,
+        input_shape=FAST_IMG_SIZE + (3,),
+        alpha=FAST_ALPHA
+    )
+    x = base_model(x)
+    x = GlobalAveragePooling2D()(x)
+    x = Dropout(0.2)(x)
+    predictions = Dense(num_classes, activation='softmax')(x)
+    return Model(inputs=inputs, outputs=predictions)
+
+def train_fast_model():
+    """Train the fast cascade model end to end and save it as a 'fast' bundle"""
+    train_gen, val_gen = create_data_generators(DATASET_PATH)
+    class_names = list(train_gen.class_indices.keys())
+    
+    model = build_fast_model(len(class_names))
+    model.compile(
+        optimizer=Adam(learning_rate=LEARNING_RATE * 10),
+        loss='categorical_crossentropy',
+        metrics=['accuracy']
+    )
+    model.fit(
+        train_gen,
+        epochs=FAST_EPOCHS,
+        validation_data=val_gen,
+        callbacks=[tf.keras.callbacks.EarlyStopping(monitor='val_loss', patience=5, restore_best_weights=True)]
+    )
+    
+    os.makedirs(staging_dir(FAST_MODEL_BUNDLE_DIR), exist_ok=True)
+    model.save(FAST_MODEL_SAVE_PATH)
+    bundle = publish_bundle(FAST_MODEL_BUNDLE_DIR, class_names, input_size=IMG_SIZE,
+                            normalization=DEFAULT_NORMALIZATION, role=FAST_ROLE)
+    print(f"Fast model saved to {FAST_MODEL_BUNDLE_DIR} (bundle version {bundle['version']})")
+    print("Run 'python model_cascade.py' to calibrate its thresholds against the full model")
+    return model, class_names
+
 def unfreeze_base_model(model, base_model, unfreeze_at):
     """Unfreeze layers for fine-tuning"""
     base_model.trainable = True
@@ -195,7 +251,8 @@ def train_model():
     
     # Save final model
     model.save(MODEL_SAVE_PATH)
-    print(f"Model saved to {MODEL_SAVE_PATH}")
+    bundle = publish_bundle(MODEL_BUNDLE_DIR, class_names, input_size=IMG_SIZE, normalization=DEFAULT_NORMALIZATION)
+    print(f"Model saved to {MODEL_BUNDLE_DIR} (bundle version {bundle['version']})")
     
     return model, history, class_names
 
@@ -273,8 +330,8 @@ def main():
         print("└── Sooty Mould/")
         return
     
-    # Create models directory
-    os.makedirs('models', exist_ok=True)
+    # Create the staging directory checkpoints are written to
+    os.makedirs(staging_dir(MODEL_BUNDLE_DIR), exist_ok=True)
     
     # Train model
     model, history, class_names = train_model()
@@ -289,9 +346,12 @@ def main():
     plot_training_history(history)
     
     print("Training completed successfully!")
-    print(f"Model saved as: {MODEL_SAVE_PATH}")
+    print(f"Model bundle saved in: {MODEL_BUNDLE_DIR}")
     print(f"Confusion matrix saved as: confusion_matrix.png")
     print(f"Training history saved as: training_history.png")
 
 if __name__ == "__main__":
-    main()
+    if sys.argv[1:] == ['--fast']:
+        train_fast_model()
+    else:
+        main()
@@ -0,0 +1,248 @@
+"""
+Video and camera-stream scanning
+
+Walking a row of trees while filming replaces photographing each leaf. A
+reader thread decodes frames with OpenCV, looks at a few per second and
+keeps only those that differ from the last kept frame (mean absolute
+difference of small grey thumbnails), resized straight to the model input.
+Kept frames wait in a bounded queue; the classifier takes whatever has
+queued up as one batch, so batches grow when it falls behind. Per-frame
+probabilities are smoothed with an exponential moving average and turned
+into a timeline of segments, one per stretch with the same disease.
+
+For files the reader waits when the queue is full; for live streams it
+drops the oldest frame instead, so memory stays bounded either way.
+"""
+
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from image_pipeline import normalize_batch
+from model_bundle import DEFAULT_INPUT_SIZE, DEFAULT_NORMALIZATION
+
+# Video scanning configuration
+CHECK_FPS = 10  # frames per second compared; the rest are grabbed without being converted
+DIFF_WIDTH = 64  # thumbnail width for frame differencing
+SAMPLE_DIFF_THRESHOLD = 6.0  # mean grey-level change since the last kept frame
+MAX_SAMPLE_GAP = 2.0  # seconds; a still scene is still re-checked this often
+FRAME_QUEUE_SIZE = 32  # kept frames waiting for the classifier (about 5 MB at 224x224)
+SCAN_BATCH_SIZE = 16
+SMOOTHING_ALPHA = 0.3  # weight of the newest frame in the moving average
+MIN_SEGMENT_SECONDS = 1.0  # shorter runs are merged into the previous segment
+VIDEO_TYPES = ['mp4', 'mov', 'avi', 'mkv']
+
+_END = None
+
+
+class FrameReader:
+    """Thread that decodes a video source and queues (timestamp, RGB model input) for changed frames"""
+
+    def __init__(self, source, input_size=DEFAULT_INPUT_SIZE[::-1], live=None, queue_size=FRAME_QUEUE_SIZE,
+                 diff_threshold=SAMPLE_DIFF_THRESHOLD):
+        self.capture = cv2.VideoCapture(source)
+        if not self.capture.isOpened():
+            raise ValueError(f"Cannot open video source {source!r}")
+        # Camera indices and network streams run in real time; files can wait for the classifier
+        self.live = (isinstance(source, int) or '://' in str(source)) if live is None else live
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 30.0
+        self.frame_count = int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        self.duration = self.frame_count / self.fps if self.frame_count > 0 and not self.live else None
+        self.input_size = tuple(input_size)
+        self.diff_threshold = diff_threshold
+        self.frames = queue.Queue(maxsize=queue_size)
+        self.stats = {'frames': 0, 'checked': 0, 'sampled': 0, 'dropped': 0}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='frame-reader', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop reading; frames already queued are discarded"""
+        self._stop.set()
+        while True:
+            try:
+                self.frames.get_nowait()
+            except queue.Empty:
+                break
+        self._thread.join(timeout=5)
+
+    def _put(self, item):
+        if self.live and item is not _END:
+            while True:
+                try:
+                    self.frames.put_nowait(item)
+                    return
+                except queue.Full:
+                    # Fresh frames matter more than old ones in a live stream
+                    try:
+                        self.frames.get_nowait()
+                        self.stats['dropped'] += 1
+                    except queue.Empty:
+                        pass
+        while not self._stop.is_set():
+            try:
+                self.frames.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _run(self):
+        step = max(1, round(self.fps / CHECK_FPS))
+        started = time.monotonic()
+        last_thumb, last_time = None, None
+        try:
+            while not self._stop.is_set() and self.capture.grab():
+                index = self.stats['frames']
+                self.stats['frames'] += 1
+                if index % step:
+                    continue
+                ok, frame = self.capture.retrieve()
+                if not ok:
+                    continue
+                self.stats['checked'] += 1
+                timestamp = time.monotonic() - started if self.live else index / self.fps
+                height, width = frame.shape[:2]
+                thumb = cv2.cvtColor(cv2.resize(frame, (DIFF_WIDTH, max(1, DIFF_WIDTH * height // width)),
+                                                interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+                # Compared with the last kept frame, so a slow pan adds up until it counts
+                if (last_thumb is not None and timestamp - last_time < MAX_SAMPLE_GAP
+                        and cv2.absdiff(thumb, last_thumb).mean() < self.diff_threshold):
+                    continue
+                last_thumb, last_time = thumb, timestamp
+                model_input = cv2.cvtColor(cv2.resize(frame, self.input_size, interpolation=cv2.INTER_AREA),
+                                           cv2.COLOR_BGR2RGB)
+                self.stats['sampled'] += 1
+                self._put((timestamp, model_input))
+        except Exception as e:
+            print(f"Error reading video: {e}")
+        finally:
+            self.capture.release()
+            self._put(_END)
+
+
+def smooth_predictions(predictions, alpha=SMOOTHING_ALPHA):
+    """Exponential moving average of (N, C) per-frame probabilities"""
+    predictions = np.asarray(predictions, dtype=np.float32)
+    smoothed = np.empty_like(predictions)
+    state = predictions[0] if len(predictions) else None
+    for i, probabilities in enumerate(predictions):
+        state = alpha * probabilities + (1 - alpha) * state
+        smoothed[i] = state
+    return smoothed
+
+
+def build_timeline(timestamps, smoothed, class_names, end_time=None, min_seconds=MIN_SEGMENT_SECONDS):
+    """Segments {'start', 'end', 'predicted_class', 'confidence', 'frames'} of constant smoothed class"""
+    if len(timestamps) == 0:
+        return []
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    labels = np.argmax(smoothed, axis=1)
+    end_time = max(end_time or 0.0, timestamps[-1])
+    # Run boundaries: a segment starts wherever the class changes
+    starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+    ends = np.r_[starts[1:], len(labels)]
+    segments = []
+    for first, last in zip(starts, ends):
+        end = timestamps[last] if last < len(labels) else end_time
+        segment = {'start': float(timestamps[first]), 'end': float(end), 'label': int(labels[first]),
+                   'first': int(first), 'last': int(last)}
+        if segments and (segment['end'] - segment['start'] < min_seconds or segments[-1]['label'] == segment['label']):
+            # A brief blip is absorbed by the segment before it
+            segments[-1].update(end=segment['end'], last=segment['last'])
+        else:
+            segments.append(segment)
+    timeline = []
+    for segment in segments:
+        rows = smoothed[segment['first']:segment['last'], segment['label']]
+        timeline.append({
+            'start': segment['start'],
+            'end': segment['end'],
+            'predicted_class': class_names[segment['label']],
+            'confidence': float(rows.mean() * 100),
+            'frames': segment['last'] - segment['first']
+        })
+    return timeline
+
+
+def scan_video(source, predict_fn, input_size=DEFAULT_INPUT_SIZE[::-1], normalization=DEFAULT_NORMALIZATION,
+               batch_size=SCAN_BATCH_SIZE, live=None, max_seconds=None, on_progress=None):
+    """Sample, classify and smooth a video file or stream
+
+    predict_fn takes a normalized batch and returns (predictions, class_names).
+    on_progress(seconds, duration) is called after each batch. Returns
+    {'timeline', 'timestamps', 'smoothed', 'class_names', 'stats'}.
+    """
+    reader = FrameReader(source, input_size, live).start()
+    timestamps, predictions, class_names = [], [], None
+    batches = 0
+    begin = time.perf_counter()
+    try:
+        finished = False
+        while not finished:
+            item = reader.frames.get()
+            if item is _END:
+                break
+            batch = [item]
+            # Take what has queued up without waiting: batches grow only when the model lags
+            while len(batch) < batch_size:
+                try:
+                    item = reader.frames.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _END:
+                    finished = True
+                    break
+                batch.append(item)
+            probabilities, names = predict_fn(normalize_batch(np.stack([frame for _, frame in batch]), normalization))
+            batches += 1
+            if class_names is None:
+                class_names = list(names)
+            if list(names) == class_names:
+                # A model swapped in mid-scan with another class order would garble the timeline
+                timestamps.extend(timestamp for timestamp, _ in batch)
+                predictions.extend(probabilities)
+            if on_progress is not None:
+                on_progress(batch[-1][0], reader.duration)
+            if max_seconds is not None and batch[-1][0] >= max_seconds:
+                break
+    finally:
+        reader.stop()
+    elapsed = time.perf_counter() - begin
+    smoothed = smooth_predictions(predictions)
+    video_seconds = reader.stats['frames'] / reader.fps if not reader.live else elapsed
+    stats = dict(reader.stats, classified=len(timestamps), batches=batches, video_seconds=video_seconds,
+                 elapsed_seconds=elapsed, realtime_factor=video_seconds / elapsed if elapsed > 0 else None)
+    return {
+        'timeline': build_timeline(timestamps, smoothed, class_names or [], video_seconds),
+        'timestamps': np.asarray(timestamps, dtype=np.float32),
+        'smoothed': smoothed,
+        'class_names': class_names or [],
+        'stats': stats
+    }
+
+
+if __name__ == "__main__":
+    # Scan a video file or camera index with the fast model where there is one
+    import sys
+
+    from model_bundle import DEFAULT_CROP, model_input_size
+    from model_cascade import ModelCascade
+    from model_registry import ModelRegistry
+
+    source = sys.argv[1] if len(sys.argv) > 1 else 0
+    source = int(source) if str(source).isdigit() else source
+    registry = ModelRegistry()
+    cascade = ModelCascade(registry)
+    bundle = registry.get(DEFAULT_CROP).current.bundle
+    scan = scan_video(source, lambda batch: cascade.predict(DEFAULT_CROP, batch)[:2],
+                      model_input_size(bundle), bundle['normalization'])
+    for segment in scan['timeline']:
+        print(f"{segment['start']:7.1f}-{segment['end']:7.1f}s  {segment['predicted_class']:<18} "
+              f"{segment['confidence']:5.1f}%  {segment['frames']} frames")
+    print(scan['stats'])
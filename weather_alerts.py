@@ -1,12 +1,33 @@
-import requests
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from multilingual_support import translate_text
+from geocoding import CellCache, create_default_resolver
+from weather_client import RateLimiter, WeatherClient, normalize_location
 
 # Weather API configuration
 WEATHER_API_KEY = "b3aafc373eeb6b4d9445318a5ceafd3a"  # Replace with actual API key
 WEATHER_API_URL = "http://api.openweathermap.org/data/2.5/weather"
 FORECAST_API_URL = "http://api.openweathermap.org/data/2.5/forecast"
+WEATHER_CACHE_DIR = None  # Set to a directory (e.g. 'cache/weather') to persist responses across restarts
+
+# Bulk sweep configuration (free OpenWeatherMap tier allows 60 calls/minute)
+BULK_MAX_WORKERS = 8
+BULK_RATE_LIMIT = 1.0  # upstream calls per second
+
+# Geocode free-text locations and share weather/risk results per grid cell
+USE_GEOCODING = True
+
+# Append every fetched observation and forecast to the local weather store
+RECORD_WEATHER_HISTORY = True
+
+_weather_client = None
+_weather_client_lock = threading.Lock()
+_UNSET = object()
+_location_resolver = _UNSET
+_cell_risk_cache = CellCache()
+_observation_store = _UNSET
 
 # Disease risk thresholds based on weather conditions
 DISEASE_RISK_THRESHOLDS = {
@@ -35,26 +56,128 @@ DISEASE_RISK_THRESHOLDS = {
     }
 }
 
+def get_weather_client():
+    """Get the shared pooled weather client, creating it on first use"""
+    global _weather_client
+    if _weather_client is None:
+        with _weather_client_lock:
+            if _weather_client is None:
+                _weather_client = WeatherClient(
+                    WEATHER_API_KEY,
+                    WEATHER_API_URL,
+                    FORECAST_API_URL,
+                    cache_dir=WEATHER_CACHE_DIR
+                )
+    return _weather_client
+
+def set_weather_client(client):
+    """Replace the shared weather client (e.g. to point at a local stub server)"""
+    global _weather_client
+    with _weather_client_lock:
+        previous, _weather_client = _weather_client, client
+    if previous is not None and previous is not client:
+        previous.close()
+
+def get_location_resolver():
+    """Get the shared location resolver, or None when lookups use free-text queries"""
+    global _location_resolver
+    if _location_resolver is _UNSET:
+        with _weather_client_lock:
+            if _location_resolver is _UNSET:
+                _location_resolver = create_default_resolver() if USE_GEOCODING else None
+    return _location_resolver
+
+def set_location_resolver(resolver):
+    """Replace the shared location resolver (None disables geocoding)"""
+    global _location_resolver
+    with _weather_client_lock:
+        _location_resolver = resolver
+
+def get_observation_store():
+    """Get the shared weather history store, or None when recording is disabled"""
+    global _observation_store
+    if _observation_store is _UNSET:
+        with _weather_client_lock:
+            if _observation_store is _UNSET:
+                _observation_store = None
+                if RECORD_WEATHER_HISTORY:
+                    try:
+                        from weather_store import WeatherStore
+                        _observation_store = WeatherStore()
+                    except Exception as e:
+                        print(f"Error opening weather store: {e}")
+    return _observation_store
+
+def set_observation_store(store):
+    """Replace the shared weather history store (None disables recording)"""
+    global _observation_store
+    with _weather_client_lock:
+        _observation_store = store
+
+def location_store_key(key):
+    """Get the weather store key for a resolved location key"""
+    kind, value = key
+    if kind == 'cell':
+        return f"cell:{value[0]}:{value[1]}"
+    return f"q:{value}"
+
+def _record(key, weather_data=None, timestamp=None, forecast=None):
+    store = get_observation_store()
+    if store is None:
+        return
+    try:
+        if weather_data is not None:
+            store.append_observation(location_store_key(key), weather_data, timestamp)
+        if forecast:
+            store.append_forecast(location_store_key(key), forecast)
+    except Exception as e:
+        print(f"Error recording weather history: {e}")
+
+def resolve_location_target(location):
+    """Get the cache key and query target for a location
+    
+    Geocoded locations resolve to their grid cell, so every location in the
+    cell shares one fetch; anything else falls back to the normalized text.
+    """
+    resolver = get_location_resolver()
+    if resolver is not None:
+        try:
+            place = resolver.resolve(location)
+        except Exception as e:
+            print(f"Error geocoding location: {e}")
+            place = None
+        if place:
+            return ('cell', place['cell']), place['center']
+    return ('q', normalize_location(location)), None
+
+def _fetch_current(location, rate_limiter=None):
+    key, center = resolve_location_target(location)
+    client = get_weather_client()
+    if center is not None:
+        data = client.get_current_by_coords(center[0], center[1], rate_limiter=rate_limiter)
+    else:
+        data = client.get_current(location, rate_limiter=rate_limiter)
+    if data:
+        _record(key, parse_weather_data(data), timestamp=data.get('dt'))
+    return key, data
+
+def parse_weather_data(data):
+    """Extract the fields used for risk assessment from a current-weather payload"""
+    return {
+        'temperature': data['main']['temp'],
+        'humidity': data['main']['humidity'],
+        'weather_description': data['weather'][0]['description'],
+        'rainfall': data.get('rain', {}).get('1h', 0),
+        'wind_speed': data['wind']['speed']
+    }
+
 def get_weather_data(location):
     """Get current weather data for a location"""
     try:
-        params = {
-            'q': location,
-            'appid': WEATHER_API_KEY,
-            'units': 'metric'
-        }
-        
-        response = requests.get(WEATHER_API_URL, params=params)
-        data = response.json()
+        _, data = _fetch_current(location)
         
-        if response.status_code == 200:
-            return {
-                'temperature': data['main']['temp'],
-                'humidity': data['main']['humidity'],
-                'weather_description': data['weather'][0]['description'],
-                'rainfall': data.get('rain', {}).get('1h', 0),
-                'wind_speed': data['wind']['speed']
-            }
+        if data:
+            return parse_weather_data(data)
         else:
             return None
     except Exception as e:
@@ -109,43 +232,99 @@ def calculate_disease_risk(weather_data, disease_name, language_code='en'):
         'risk_factors': risk_factors
     }
 
+def assess_weather_risk(weather_data, language_code='en'):
+    """Combine per-disease risks for one weather snapshot"""
+    # Get risk for common diseases
+    risks = {}
+    for disease in ['Anthracnose', 'Bacterial Canker', 'Powdery Mildew', 'Cutting Weevil']:
+        risks[disease] = calculate_disease_risk(weather_data, disease, language_code)
+    
+    # Find highest risk
+    highest_risk = max(risks.items(), key=lambda x: len(x[1].get('risk_factors', [])))
+    
+    return {
+        'temperature': weather_data['temperature'],
+        'humidity': weather_data['humidity'],
+        'rainfall': weather_data['rainfall'],
+        'risk_level': highest_risk[1]['risk_level'],
+        'recommendation': highest_risk[1]['recommendation'],
+        'all_risks': risks
+    }
+
 def get_weather_risk(location, language_code='en'):
     """Get weather-based disease risk for a location"""
-    weather_data = get_weather_data(location)
+    try:
+        key, data = _fetch_current(location)
+    except Exception as e:
+        print(f"Error fetching weather data: {e}")
+        return None
     
-    if weather_data:
-        # Get risk for common diseases
-        risks = {}
-        for disease in ['Anthracnose', 'Bacterial Canker', 'Powdery Mildew', 'Cutting Weevil']:
-            risks[disease] = calculate_disease_risk(weather_data, disease, language_code)
-        
-        # Find highest risk
-        highest_risk = max(risks.items(), key=lambda x: len(x[1].get('risk_factors', [])))
-        
-        return {
-            'temperature': weather_data['temperature'],
-            'humidity': weather_data['humidity'],
-            'rainfall': weather_data['rainfall'],
-            'risk_level': highest_risk[1]['risk_level'],
-            'recommendation': highest_risk[1]['recommendation'],
-            'all_risks': risks
-        }
+    if data:
+        return _cell_risk(key, data, language_code)
     
     return None
 
+def _cell_risk(key, data, language_code):
+    # Risk maps are shared by every location in a grid cell
+    if key[0] != 'cell':
+        return assess_weather_risk(parse_weather_data(data), language_code)
+    cached = _cell_risk_cache.get((key, language_code))
+    if cached is None:
+        cached = assess_weather_risk(parse_weather_data(data), language_code)
+        _cell_risk_cache.put((key, language_code), cached)
+    return cached
+
+def get_bulk_weather_risk(locations, language_code='en', max_workers=BULK_MAX_WORKERS, rate_limit=BULK_RATE_LIMIT):
+    """Get weather-based disease risk for many locations concurrently
+    
+    Returns a dict with per-location risk maps under 'results' and the reason
+    for every location that could not be assessed under 'errors', both keyed
+    by the caller's location strings. Spellings that normalize to the same
+    location, and locations in the same grid cell, are fetched once.
+    """
+    rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+    
+    # Group the caller's strings by normalized location
+    groups = {}
+    for location in locations:
+        groups.setdefault(normalize_location(location), []).append(location)
+    
+    def evaluate(location):
+        try:
+            key, data = _fetch_current(location, rate_limiter)
+            if not data:
+                return None, 'Location not found'
+            return _cell_risk(key, data, language_code), None
+        except Exception as e:
+            return None, f"{type(e).__name__}: {e}"
+    
+    results = {}
+    errors = {}
+    representatives = [names[0] for names in groups.values()]
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(representatives) or 1))) as pool:
+        for names, (risk, error) in zip(groups.values(), pool.map(evaluate, representatives)):
+            for name in names:
+                if error is None:
+                    results[name] = risk
+                else:
+                    errors[name] = error
+    
+    return {
+        'results': results,
+        'errors': errors
+    }
+
 def get_forecast_data(location, days=3):
     """Get weather forecast for disease risk prediction"""
     try:
-        params = {
-            'q': location,
-            'appid': WEATHER_API_KEY,
-            'units': 'metric'
-        }
-        
-        response = requests.get(FORECAST_API_URL, params=params)
-        data = response.json()
+        key, center = resolve_location_target(location)
+        client = get_weather_client()
+        if center is not None:
+            data = client.get_forecast_by_coords(center[0], center[1])
+        else:
+            data = client.get_forecast(location)
         
-        if response.status_code == 200:
+        if data:
             forecast = []
             for item in data['list'][:days*8]:  # 8 forecasts per day
                 forecast.append({
@@ -155,6 +334,7 @@ def get_forecast_data(location, days=3):
                     'rainfall': item.get('rain', {}).get('3h', 0),
                     'weather': item['weather'][0]['description']
                 })
+            _record(key, forecast=forecast)
             return forecast
         else:
             return None
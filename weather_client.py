@@ -0,0 +1,229 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Client configuration
+CONNECT_TIMEOUT = 3.05  # seconds
+READ_TIMEOUT = 10  # seconds
+POOL_SIZE = 16
+WEATHER_CACHE_TTL = 600  # current conditions change slowly, 10 minutes is enough
+FORECAST_CACHE_TTL = 1800  # OpenWeatherMap refreshes 3-hourly forecasts roughly every 30 minutes
+CACHE_MAX_ENTRIES = 2048  # in-memory entries kept before least recently used ones are evicted
+
+
+def normalize_location(location):
+    """Normalize a free-text location so equivalent queries share one cache entry"""
+    parts = [' '.join(part.split()) for part in str(location).lower().split(',')]
+    return ', '.join(part for part in parts if part)
+
+
+class RateLimiter:
+    """Thread-safe token bucket limiting upstream calls per second"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class _InFlightCall:
+    """A single upstream call that concurrent callers wait on"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class WeatherClient:
+    """Pooled OpenWeatherMap client with TTL caching and single-flight coalescing"""
+
+    def __init__(self, api_key, weather_url, forecast_url,
+                 weather_ttl=WEATHER_CACHE_TTL, forecast_ttl=FORECAST_CACHE_TTL,
+                 cache_dir=None, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), pool_size=POOL_SIZE,
+                 max_entries=CACHE_MAX_ENTRIES):
+        self.api_key = api_key
+        self.weather_url = weather_url
+        self.forecast_url = forecast_url
+        self.weather_ttl = weather_ttl
+        self.forecast_ttl = forecast_ttl
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self.max_entries = max_entries
+
+        # One session keeps TCP/TLS connections alive across Streamlit reruns
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'coalesced': 0, 'upstream_calls': 0}
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def get_current(self, location, rate_limiter=None):
+        """Get the raw current-weather payload for a location"""
+        return self._get(self.weather_url, {'q': location}, self.weather_ttl, rate_limiter)
+
+    def get_forecast(self, location, rate_limiter=None):
+        """Get the raw 3-hourly forecast payload for a location"""
+        return self._get(self.forecast_url, {'q': location}, self.forecast_ttl, rate_limiter)
+
+    def get_current_by_coords(self, lat, lon, rate_limiter=None):
+        """Get the raw current-weather payload for a coordinate pair"""
+        return self._get(self.weather_url, {'lat': lat, 'lon': lon}, self.weather_ttl, rate_limiter)
+
+    def get_forecast_by_coords(self, lat, lon, rate_limiter=None):
+        """Get the raw 3-hourly forecast payload for a coordinate pair"""
+        return self._get(self.forecast_url, {'lat': lat, 'lon': lon}, self.forecast_ttl, rate_limiter)
+
+    def clear_cache(self):
+        """Drop all in-memory cache entries"""
+        with self._lock:
+            self._cache.clear()
+
+    def close(self):
+        """Close pooled connections"""
+        self.session.close()
+
+    def _cache_key(self, url, query):
+        parts = [url]
+        for name in sorted(query):
+            value = query[name]
+            if name == 'q':
+                value = normalize_location(value)
+            elif isinstance(value, float):
+                value = f"{value:.4f}"
+            parts.append(f"{name}={value}")
+        return '|'.join(parts)
+
+    def _get(self, url, query, ttl, rate_limiter=None):
+        key = self._cache_key(url, query)
+
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry and entry[0] > time.time():
+                self._cache.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry[1]
+            if entry:
+                del self._cache[key]
+
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = _InFlightCall()
+                self._inflight[key] = call
+            else:
+                self.stats['coalesced'] += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            data = self._read_disk(key)
+            if data is not None:
+                with self._lock:
+                    self.stats['disk_hits'] += 1
+            else:
+                with self._lock:
+                    self.stats['misses'] += 1
+                data = self._fetch(url, query, rate_limiter)
+                if data is not None:
+                    self._write_disk(key, data, ttl)
+
+            if data is not None:
+                with self._lock:
+                    self._store(key, data, ttl)
+            call.result = data
+            return data
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            call.event.set()
+
+    def _store(self, key, data, ttl):
+        # Caller holds self._lock
+        now = time.time()
+        self._cache[key] = (now + ttl, data)
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.max_entries:
+            for expired in [k for k, (expires_at, _) in self._cache.items() if expires_at <= now]:
+                del self._cache[expired]
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def _fetch(self, url, query, rate_limiter=None):
+        params = dict(query)
+        params.update({'appid': self.api_key, 'units': 'metric'})
+
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        with self._lock:
+            self.stats['upstream_calls'] += 1
+        response = self.session.get(url, params=params, timeout=self.timeout)
+
+        # Only an unknown location is a normal miss; bad keys, rate limiting
+        # and server errors surface as requests.HTTPError with the real cause
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._disk_path(key), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('expires_at', 0) <= time.time():
+            return None
+        return entry.get('data')
+
+    def _write_disk(self, key, data, ttl):
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'expires_at': time.time() + ttl, 'data': data}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error writing weather cache: {e}")
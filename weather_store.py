@@ -0,0 +1,255 @@
+"""
+Append-only columnar store of weather observations and forecasts
+
+Each month is a partition directory holding one raw binary file per column.
+Appends are plain file appends and reads are memory-mapped, so ingest is
+cheap enough to run on every fetch and range queries only touch the months
+they cover.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from risk_engine import evaluate_risk
+from weather_alerts import DISEASE_RISK_THRESHOLDS
+
+# Store configuration
+WEATHER_STORE_PATH = 'data/weather_store'
+OBSERVATION = 0
+FORECAST = 1
+
+COLUMNS = {
+    'location_id': np.int32,
+    'timestamp': np.int64,  # valid time, epoch seconds
+    'issued_at': np.int64,  # fetch time, epoch seconds
+    'kind': np.int8,
+    'temperature': np.float32,
+    'humidity': np.float32,
+    'rainfall': np.float32,
+    'wind_speed': np.float32
+}
+
+
+def _month_key(timestamp):
+    return datetime.fromtimestamp(int(timestamp), tz=timezone.utc).strftime('%Y-%m')
+
+
+def _complete_rows(partition):
+    """Number of rows present in every column file of a partition"""
+    sizes = []
+    for name, dtype in COLUMNS.items():
+        file_path = os.path.join(partition, f"{name}.bin")
+        sizes.append(os.path.getsize(file_path) // np.dtype(dtype).itemsize if os.path.exists(file_path) else 0)
+    return min(sizes)
+
+
+def _to_epoch(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(value)
+
+
+class WeatherStore:
+    """Month-partitioned columnar store with location/time range queries"""
+
+    def __init__(self, path=WEATHER_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self._locations_path = os.path.join(path, 'locations.json')
+        self._locations = {}
+        if os.path.exists(self._locations_path):
+            with open(self._locations_path, 'r', encoding='utf-8') as f:
+                self._locations = json.load(f)
+        self._last_seen = {}
+
+    def location_id(self, location, create=True):
+        """Get the integer id for a location key, registering it if needed"""
+        with self._lock:
+            if location not in self._locations and create:
+                self._locations[location] = len(self._locations)
+                tmp_path = f"{self._locations_path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self._locations, f, ensure_ascii=False)
+                os.replace(tmp_path, self._locations_path)
+            return self._locations.get(location)
+
+    def locations(self):
+        """Get all registered location keys"""
+        with self._lock:
+            return list(self._locations)
+
+    def append(self, location, records, kind=OBSERVATION, issued_at=None):
+        """Append weather records (dicts with timestamp/temperature/humidity/rainfall)"""
+        if not records:
+            return 0
+        location_id = self.location_id(location)
+        issued_at = int(issued_at if issued_at is not None else time.time())
+        n = len(records)
+
+        columns = {
+            'location_id': np.full(n, location_id, dtype=np.int32),
+            'timestamp': np.array([_to_epoch(r['timestamp']) for r in records], dtype=np.int64),
+            'issued_at': np.full(n, issued_at, dtype=np.int64),
+            'kind': np.full(n, kind, dtype=np.int8),
+            'temperature': np.array([r['temperature'] for r in records], dtype=np.float32),
+            'humidity': np.array([r['humidity'] for r in records], dtype=np.float32),
+            'rainfall': np.array([r.get('rainfall', 0) for r in records], dtype=np.float32),
+            'wind_speed': np.array([r.get('wind_speed', np.nan) for r in records], dtype=np.float32)
+        }
+
+        months = np.array([_month_key(ts) for ts in columns['timestamp']])
+        with self._lock:
+            for month in np.unique(months):
+                rows = months == month
+                partition = os.path.join(self.path, month)
+                os.makedirs(partition, exist_ok=True)
+                # Drop the tail of a torn append first, or the new rows would land out of line
+                complete = _complete_rows(partition)
+                for name, dtype in COLUMNS.items():
+                    with open(os.path.join(partition, f"{name}.bin"), 'ab') as f:
+                        f.truncate(complete * np.dtype(dtype).itemsize)
+                        f.write(columns[name][rows].tobytes())
+        return n
+
+    def append_observation(self, location, weather_data, timestamp=None):
+        """Append one current-weather reading, skipping repeats of the same reading"""
+        timestamp = int(timestamp if timestamp is not None else time.time())
+        with self._lock:
+            if self._last_seen.get(location) == timestamp:
+                return 0
+            self._last_seen[location] = timestamp
+        return self.append(location, [dict(weather_data, timestamp=timestamp)], kind=OBSERVATION)
+
+    def append_forecast(self, location, forecast):
+        """Append a get_forecast_data series, skipping a series already stored"""
+        if not forecast:
+            return 0
+        first = forecast[0]
+        signature = (_to_epoch(first['date']), len(forecast), first['temperature'], forecast[-1]['temperature'])
+        with self._lock:
+            if self._last_seen.get((location, FORECAST)) == signature:
+                return 0
+            self._last_seen[(location, FORECAST)] = signature
+        records = [dict(item, timestamp=item['date']) for item in forecast]
+        return self.append(location, records, kind=FORECAST)
+
+    def _read_partition(self, month):
+        partition = os.path.join(self.path, month)
+        if not os.path.isdir(partition):
+            return None
+        # A crash mid-append can leave columns uneven; only complete rows are visible
+        rows = _complete_rows(partition)
+        if rows == 0:
+            return None
+        return {
+            name: np.memmap(os.path.join(partition, f"{name}.bin"), dtype=dtype, mode='r', shape=(rows,))
+            for name, dtype in COLUMNS.items()
+        }
+
+    def query(self, location=None, start=None, end=None, kind=OBSERVATION):
+        """Get columns for rows matching location, [start, end] and kind, sorted by timestamp"""
+        with self._lock:
+            months = sorted(name for name in os.listdir(self.path) if os.path.isdir(os.path.join(self.path, name)))
+        start, end = _to_epoch(start), _to_epoch(end)
+        # Partition pruning: YYYY-MM names sort chronologically
+        if start is not None:
+            months = [month for month in months if month >= _month_key(start)]
+        if end is not None:
+            months = [month for month in months if month <= _month_key(end)]
+
+        location_id = None
+        if location is not None:
+            location_id = self.location_id(location, create=False)
+            if location_id is None:
+                return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+
+        parts = []
+        for month in months:
+            columns = self._read_partition(month)
+            if columns is None:
+                continue
+            mask = np.ones(len(columns['timestamp']), dtype=bool)
+            if location_id is not None:
+                mask &= columns['location_id'] == location_id
+            if kind is not None:
+                mask &= columns['kind'] == kind
+            if start is not None:
+                mask &= columns['timestamp'] >= start
+            if end is not None:
+                mask &= columns['timestamp'] <= end
+            if mask.any():
+                parts.append({name: np.asarray(values[mask]) for name, values in columns.items()})
+
+        if not parts:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+        result = {name: np.concatenate([part[name] for part in parts]) for name in COLUMNS}
+        order = np.argsort(result['timestamp'], kind='stable')
+        return {name: values[order] for name, values in result.items()}
+
+
+def backtest_thresholds(store, outbreaks, thresholds=DISEASE_RISK_THRESHOLDS, lead_days=7, min_factors=2):
+    """Replay stored observations through the risk engine and score alerts against outbreaks
+
+    outbreaks is a list of dicts with 'location', 'disease' and 'date'. An alert
+    (a step with at least min_factors risk factors) counts as a true positive
+    when an outbreak of that disease is recorded at the location within
+    lead_days after it. Returns precision/recall per disease.
+    """
+    lead = lead_days * 86400
+    diseases = list(thresholds)
+    totals = {d: {'alerts': 0, 'true_alerts': 0, 'outbreaks': 0, 'detected': 0} for d in diseases}
+
+    # One pass over the store, then split rows per location
+    history = store.query()
+    order = np.argsort(history['location_id'], kind='stable')
+    history = {name: values[order] for name, values in history.items()}
+    ids, starts = np.unique(history['location_id'], return_index=True)
+    bounds = dict(zip(ids.tolist(), zip(starts, np.append(starts[1:], len(order)))))
+
+    for location in store.locations():
+        location_id = store.location_id(location, create=False)
+        if location_id not in bounds:
+            continue
+        lo, hi = bounds[location_id]
+        times = history['timestamp'][lo:hi]
+        timeline = evaluate_risk(history['temperature'][None, lo:hi], history['humidity'][None, lo:hi],
+                                 history['rainfall'][None, lo:hi], thresholds)
+        alerts = timeline['factor_count'][:, 0, :] >= min_factors
+
+        for d, disease in enumerate(diseases):
+            events = np.sort(np.array([_to_epoch(o['date']) for o in outbreaks
+                                       if o['location'] == location and o['disease'] == disease], dtype=np.int64))
+            alert_times = times[alerts[d]]
+            totals[disease]['alerts'] += len(alert_times)
+            totals[disease]['outbreaks'] += len(events)
+            if not len(events) or not len(alert_times):
+                continue
+            # An alert is correct if the next outbreak falls within the lead window
+            nxt = np.searchsorted(events, alert_times, side='left')
+            valid = nxt < len(events)
+            hits = np.zeros(len(alert_times), dtype=bool)
+            hits[valid] = events[nxt[valid]] - alert_times[valid] <= lead
+            totals[disease]['true_alerts'] += int(hits.sum())
+            # An outbreak is detected if any alert precedes it within the lead window
+            prev = np.searchsorted(alert_times, events, side='right') - 1
+            seen = prev >= 0
+            detected = np.zeros(len(events), dtype=bool)
+            detected[seen] = events[seen] - alert_times[prev[seen]] <= lead
+            totals[disease]['detected'] += int(detected.sum())
+
+    report = {}
+    for disease, t in totals.items():
+        report[disease] = dict(
+            t,
+            precision=t['true_alerts'] / t['alerts'] if t['alerts'] else None,
+            recall=t['detected'] / t['outbreaks'] if t['outbreaks'] else None
+        )
+    return report
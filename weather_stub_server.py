@@ -0,0 +1,159 @@
+"""
+Local stand-in for the OpenWeatherMap API, used by tests and benchmarks
+"""
+
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+STUB_HOST = '127.0.0.1'
+UNKNOWN_LOCATIONS = {'unknown', 'nowhere'}
+STATUS_OVERRIDES = {'ratelimited': 429, 'badkey': 401}
+
+
+def _seed(value):
+    return int(hashlib.md5(str(value).lower().encode('utf-8')).hexdigest()[:8], 16)
+
+
+def fake_current_weather(location):
+    """Build a deterministic current-weather payload for a location"""
+    seed = _seed(location)
+    return {
+        'name': location,
+        'dt': int(time.time()) // 600 * 600,
+        'main': {
+            'temp': 18 + seed % 18,
+            'humidity': 40 + (seed // 7) % 60
+        },
+        'weather': [{'description': 'scattered clouds'}],
+        'rain': {'1h': (seed // 11) % 15},
+        'wind': {'speed': (seed // 13) % 10}
+    }
+
+
+def fake_forecast(location, steps=40):
+    """Build a deterministic 3-hourly forecast payload for a location"""
+    seed = _seed(location)
+    start = int(time.time()) // 10800 * 10800
+    items = []
+    for i in range(steps):
+        value = seed + i * 2654435761
+        items.append({
+            'dt': start + i * 10800,
+            'main': {
+                'temp': 18 + value % 18,
+                'humidity': 40 + (value // 7) % 60
+            },
+            'weather': [{'description': 'light rain' if value % 3 == 0 else 'clear sky'}],
+            'rain': {'3h': (value // 11) % 8}
+        })
+    return {'cnt': len(items), 'list': items}
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        parsed = urlparse(self.path)
+        params = {name: values[0] for name, values in parse_qs(parsed.query).items()}
+
+        with server.lock:
+            server.request_count += 1
+            server.requests.append(params)
+
+        if server.latency:
+            time.sleep(server.latency)
+
+        location = params.get('q') or f"{params.get('lat')},{params.get('lon')}"
+        name = location.split(',')[0].strip().lower()
+        if name in server.status_overrides:
+            self._reply(server.status_overrides[name], {'cod': str(server.status_overrides[name]), 'message': 'error'})
+        elif name in server.unknown_locations:
+            self._reply(404, {'cod': '404', 'message': 'city not found'})
+        elif parsed.path.endswith('/weather'):
+            self._reply(200, fake_current_weather(location))
+        elif parsed.path.endswith('/forecast'):
+            self._reply(200, fake_forecast(location))
+        else:
+            self._reply(404, {'cod': '404', 'message': 'not found'})
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubWeatherServer:
+    """Threaded fake OpenWeatherMap server with request counting and injected latency"""
+
+    def __init__(self, latency=0.0, unknown_locations=UNKNOWN_LOCATIONS, status_overrides=STATUS_OVERRIDES, port=0):
+        self._server = ThreadingHTTPServer((STUB_HOST, port), _StubHandler)
+        self._server.daemon_threads = True
+        self._server.latency = latency
+        self._server.unknown_locations = set(unknown_locations)
+        self._server.status_overrides = dict(status_overrides)
+        self._server.lock = threading.Lock()
+        self._server.request_count = 0
+        self._server.requests = []
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/data/2.5"
+
+    @property
+    def weather_url(self):
+        return f"{self.base_url}/weather"
+
+    @property
+    def forecast_url(self):
+        return f"{self.base_url}/forecast"
+
+    @property
+    def request_count(self):
+        with self._server.lock:
+            return self._server.request_count
+
+    @property
+    def requests(self):
+        with self._server.lock:
+            return list(self._server.requests)
+
+    def start(self):
+        """Serve requests on a background thread"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Shut the server down"""
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+if __name__ == "__main__":
+    server = StubWeatherServer(port=8765).start()
+    print(f"Stub OpenWeatherMap running at {server.base_url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()